@@ -43,7 +43,7 @@ st.write(
 
 st.subheader("3. 📥 Tải dữ liệu")
 st.write(
-    "Dễ dàng xuất dữ liệu giá lịch sử của nhiều mã cổ phiếu ra file Excel để phục vụ cho các nhu cầu phân tích riêng."
+    "Dễ dàng xuất dữ liệu giá lịch sử của nhiều mã cổ phiếu ra file Excel, CSV hoặc Parquet để phục vụ cho các nhu cầu phân tích riêng."
 )
 
 
@@ -0,0 +1,2 @@
+# goldenkey_project/benchmarks/__init__.py
+# Bộ benchmark chạy offline trên dữ liệu tổng hợp cho các hàm xử lý chính.
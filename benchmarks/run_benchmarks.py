@@ -0,0 +1,265 @@
+# goldenkey_project/benchmarks/run_benchmarks.py
+"""
+Chạy bộ benchmark cho các đường xử lý chính của Goldenkey trên dữ liệu tổng hợp.
+
+Ví dụ:
+    python -m benchmarks.run_benchmarks --preset quick --output bench.json
+    python -m benchmarks.run_benchmarks --symbols 10 500 --bars 250 5000 \\
+        --baseline bench.json --fail-on-regression
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+from core.covariance import COVARIANCE_METHODS
+from core.simulation import SIMULATION_METHODS, ForwardSimulator
+
+PRESETS = {
+    'quick': {'symbols': [2, 10, 50], 'bars': [250, 1250]},
+    'full': {'symbols': [1, 10, 100, 500, 2000], 'bars': [250, 1250, 5000]},
+}
+MC_TIGHTNESS_LEVELS = [0.0, 0.5, 0.9]
+FORWARD_PATHS = 20_000
+
+
+def _time_case(fn: Callable, setup: Optional[Callable], repeat: int) -> Dict[str, float]:
+    """Đo thời gian chạy `fn(setup())` nhiều lần; phần setup không được tính giờ."""
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - start)
+    return {
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+        'stdev_s': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'repeat': repeat,
+    }
+
+
+def _mc_bounds(num_assets: int, tightness: float) -> tuple:
+    """
+    Quy đổi độ chặt ràng buộc (0 = không ràng buộc, tiến tới 1 = mọi tỷ trọng
+    phải bằng 1/N) thành cặp (min_weight, max_weight).
+    """
+    equal = 1.0 / num_assets
+    min_weight = tightness * equal
+    max_weight = equal + (1.0 - tightness) * (1.0 - equal)
+    return min_weight, max_weight
+
+
+class BenchmarkRunner:
+    """Thu thập các case benchmark và kết quả đo của chúng."""
+
+    def __init__(self, repeat: int = 5, mc_iterations: int = 1000, seed: int = 0):
+        self.repeat = repeat
+        self.mc_iterations = mc_iterations
+        self.seed = seed
+        self.results: List[dict] = []
+
+    def _record(self, name: str, params: dict, fn: Callable, setup: Optional[Callable] = None, repeat: Optional[int] = None):
+        entry = {'name': name, 'params': params}
+        try:
+            entry.update(_time_case(fn, setup, repeat or self.repeat))
+            entry['status'] = 'ok'
+        except Exception as e:
+            entry['status'] = 'error'
+            entry['error'] = f"{type(e).__name__}: {e}"
+        self.results.append(entry)
+        _print_entry(entry)
+
+    def _skip(self, name: str, params: dict, reason: str):
+        entry = {'name': name, 'params': params, 'status': 'skipped', 'error': reason}
+        self.results.append(entry)
+        _print_entry(entry)
+
+    # --- Các case theo từng cổ phiếu (chỉ phụ thuộc số phiên) ---
+
+    def run_stock_cases(self, n_bars: int):
+        params = {'bars': n_bars}
+        base_df = synthetic.make_ohlcv(n_bars, seed=self.seed)
+
+        def fresh_stock():
+            return synthetic.offline_stock("S0001", base_df.copy())
+
+        self._record('stock.calculate_technical_indicators', params,
+                     lambda s: s.calculate_technical_indicators(), fresh_stock)
+        self._record('stock.calculate_fibonacci_levels', params,
+                     lambda s: s.calculate_fibonacci_levels(), fresh_stock)
+
+        with_indicators = fresh_stock()
+        with_indicators.calculate_technical_indicators()
+
+        try:
+            from utils.visualization import plot_stock_chart_plotly
+        except ImportError as e:
+            self._skip('visualization.plot_stock_chart_plotly', params, str(e))
+        else:
+            self._record('visualization.plot_stock_chart_plotly', params,
+                         lambda _: plot_stock_chart_plotly(with_indicators))
+
+        try:
+            from core.analyzer import StockAIAnalyzer
+        except ImportError as e:
+            self._skip('analyzer.prompt_preparation', params, str(e))
+            return
+        # Không gọi __init__ để tránh cấu hình Gemini: chỉ đo phần chuẩn bị prompt.
+        analyzer = StockAIAnalyzer.__new__(StockAIAnalyzer)
+        report_df = synthetic.make_financial_report(seed=self.seed)
+        self._record('analyzer._prepare_technical_data', params,
+                     lambda _: analyzer._prepare_technical_data(with_indicators.price_history))
+        self._record('analyzer._format_df_for_prompt', {'periods': len(report_df)},
+                     lambda _: StockAIAnalyzer._format_df_for_prompt(report_df))
+
+    # --- Các case theo danh mục (phụ thuộc số mã và số phiên) ---
+
+    def run_portfolio_cases(self, n_symbols: int, n_bars: int):
+        params = {'symbols': n_symbols, 'bars': n_bars}
+        adj_close = synthetic.make_adj_close(n_symbols, n_bars, seed=self.seed)
+
+        for cov_method in COVARIANCE_METHODS:
+            self._record('portfolio.calculate_stats', dict(params, cov_method=cov_method),
+                         lambda p: p.calculate_stats(cov_method=cov_method),
+                         lambda: synthetic.offline_portfolio(adj_close))
+
+        portfolio = synthetic.offline_portfolio(adj_close)
+        portfolio.calculate_stats()
+
+        mc_results = pd.DataFrame()
+        if n_symbols >= 2:
+            for tightness in MC_TIGHTNESS_LEVELS:
+                min_w, max_w = _mc_bounds(n_symbols, tightness)
+                mc_params = dict(params, tightness=tightness, iterations=self.mc_iterations)
+                self._record('portfolio.run_monte_carlo', mc_params,
+                             lambda _: portfolio.run_monte_carlo(iterations=self.mc_iterations, min_weight=min_w, max_weight=max_w),
+                             repeat=max(1, self.repeat // 2))
+            np.random.seed(self.seed)
+            mc_results = portfolio.run_monte_carlo(iterations=self.mc_iterations, min_weight=0.0, max_weight=1.0)
+        else:
+            self._skip('portfolio.run_monte_carlo', params, "Cần ít nhất 2 mã.")
+
+        weights = np.full(n_symbols, 1.0 / n_symbols)
+        self._record('portfolio.calculate_cumulative_performance', params,
+                     lambda _: portfolio.calculate_cumulative_performance(weights, cash_weight=0.1, risk_free_rate=0.04))
+
+        for sim_method in SIMULATION_METHODS:
+            simulator = ForwardSimulator(portfolio, method=sim_method, horizon_days=252, n_paths=FORWARD_PATHS, seed=self.seed)
+            self._record('simulation.forward', dict(params, method=sim_method, paths=FORWARD_PATHS, horizon=252),
+                         lambda _: simulator.simulate(weights, cash_weight=0.1, risk_free_rate=0.04),
+                         repeat=max(1, self.repeat // 2))
+
+        try:
+            from utils.visualization import plot_cumulative_returns, plot_efficient_frontier
+        except ImportError as e:
+            self._skip('visualization.portfolio_builders', params, str(e))
+            return
+        performance_df = portfolio.calculate_cumulative_performance(weights, cash_weight=0.1, risk_free_rate=0.04)
+        self._record('visualization.plot_cumulative_returns', params,
+                     lambda _: plot_cumulative_returns(performance_df, title="Benchmark"))
+        if not mc_results.empty:
+            self._record('visualization.plot_efficient_frontier', dict(params, points=len(mc_results)),
+                         lambda _: plot_efficient_frontier(mc_results, portfolio.symbols))
+
+
+def _case_key(entry: dict) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(entry['params'].items()))
+    return f"{entry['name']}[{params}]"
+
+
+def _print_entry(entry: dict):
+    if entry['status'] == 'ok':
+        print(f"{_case_key(entry):<90} {entry['median_s'] * 1000:>12.3f} ms")
+    else:
+        print(f"{_case_key(entry):<90} {entry['status'].upper()}: {entry.get('error', '')}")
+
+
+def _environment() -> dict:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def compare_with_baseline(results: List[dict], baseline: List[dict], threshold: float) -> List[dict]:
+    """
+    So sánh thời gian trung vị với baseline theo từng case.
+    Trả về danh sách các dòng so sánh; `regression=True` khi chậm hơn `threshold` lần.
+    """
+    baseline_map = {_case_key(e): e for e in baseline if e.get('status') == 'ok'}
+    rows = []
+    for entry in results:
+        key = _case_key(entry)
+        old = baseline_map.get(key)
+        if entry.get('status') != 'ok' or old is None:
+            continue
+        ratio = entry['median_s'] / old['median_s'] if old['median_s'] > 0 else float('inf')
+        rows.append({'case': key, 'baseline_s': old['median_s'], 'current_s': entry['median_s'],
+                     'ratio': ratio, 'regression': ratio > threshold})
+    return rows
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark offline cho các hàm xử lý chính của Goldenkey.")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick', help="Bộ kích thước dựng sẵn.")
+    parser.add_argument('--symbols', type=int, nargs='+', help="Danh sách số mã cần đo (1 - 2000).")
+    parser.add_argument('--bars', type=int, nargs='+', help="Danh sách số phiên cần đo (250 - 5000).")
+    parser.add_argument('--repeat', type=int, default=5, help="Số lần lặp cho mỗi case.")
+    parser.add_argument('--mc-iterations', type=int, default=1000, help="Số danh mục Monte Carlo cần tìm.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', choices=['stock', 'portfolio'], help="Chỉ chạy một nhóm case.")
+    parser.add_argument('--output', help="Ghi kết quả dạng JSON ra file này.")
+    parser.add_argument('--baseline', help="File JSON kết quả cũ để so sánh.")
+    parser.add_argument('--threshold', type=float, default=1.10, help="Tỷ lệ chậm đi tối đa trước khi coi là regression.")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Trả mã lỗi 1 nếu có regression.")
+    args = parser.parse_args(argv)
+
+    sizes = PRESETS[args.preset]
+    symbol_sizes = args.symbols or sizes['symbols']
+    bar_sizes = args.bars or sizes['bars']
+
+    runner = BenchmarkRunner(repeat=args.repeat, mc_iterations=args.mc_iterations, seed=args.seed)
+    for n_bars in bar_sizes:
+        if args.only in (None, 'stock'):
+            runner.run_stock_cases(n_bars)
+        if args.only in (None, 'portfolio'):
+            for n_symbols in symbol_sizes:
+                runner.run_portfolio_cases(n_symbols, n_bars)
+
+    report = {'environment': _environment(), 'results': runner.results}
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        comparison = compare_with_baseline(runner.results, baseline, args.threshold)
+        report['comparison'] = comparison
+        print("\nSo sánh với baseline:")
+        for row in comparison:
+            flag = "  <-- REGRESSION" if row['regression'] else ""
+            print(f"{row['case']:<90} x{row['ratio']:.2f}{flag}")
+        if args.fail_on_regression and any(row['regression'] for row in comparison):
+            exit_code = 1
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nĐã ghi kết quả vào {args.output}")
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# goldenkey_project/benchmarks/synthetic.py
+"""
+Sinh dữ liệu thị trường tổng hợp (OHLCV, giá đóng cửa, lợi suất) để chạy
+benchmark hoàn toàn offline, không cần kết nối tới vnstock.
+"""
+import zlib
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from core.data_provider import DataProvider
+from core.stock import Stock
+from core.portfolio import Portfolio
+
+
+def synthetic_symbols(n_symbols: int) -> list:
+    """Tạo danh sách mã giả lập dạng 'S0001', 'S0002', ..."""
+    return [f"S{i:04d}" for i in range(1, n_symbols + 1)]
+
+
+def make_ohlcv(n_bars: int, seed: int = 0, start_price: float = 50.0, freq: str = 'B') -> pd.DataFrame:
+    """
+    Tạo một DataFrame OHLCV theo đúng cấu trúc cột mà vnstock trả về
+    (time, open, high, low, close, volume) từ một bước ngẫu nhiên log-normal.
+    """
+    rng = np.random.default_rng(seed)
+    log_returns = rng.normal(0.0003, 0.02, n_bars)
+    close = start_price * np.exp(np.cumsum(log_returns))
+    open_ = close * np.exp(rng.normal(0, 0.005, n_bars))
+    spread = np.abs(rng.normal(0, 0.01, n_bars))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.integers(100_000, 5_000_000, n_bars).astype(float)
+    return pd.DataFrame({
+        'time': pd.date_range(end='2024-12-31', periods=n_bars, freq=freq),
+        'open': open_.round(2),
+        'high': high.round(2),
+        'low': low.round(2),
+        'close': close.round(2),
+        'volume': volume,
+    })
+
+
+def make_adj_close(n_symbols: int, n_bars: int, benchmark: str = "VNINDEX", seed: int = 0) -> pd.DataFrame:
+    """
+    Tạo bảng giá đóng cửa (ngày x mã) có tương quan thông qua một nhân tố
+    thị trường chung, kèm cột benchmark — giống `Portfolio.adj_close`.
+    """
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.0003, 0.012, n_bars)
+    betas = rng.uniform(0.5, 1.5, n_symbols)
+    idio = rng.normal(0.0, 0.015, (n_bars, n_symbols))
+    asset_returns = market[:, None] * betas[None, :] + idio
+    prices = 50.0 * np.exp(np.cumsum(asset_returns, axis=0))
+    index = pd.date_range(end='2024-12-31', periods=n_bars, freq='B')
+    df = pd.DataFrame(prices, index=index, columns=synthetic_symbols(n_symbols))
+    df[benchmark] = 1000.0 * np.exp(np.cumsum(market))
+    df.index.name = 'time'
+    return df
+
+
+def make_financial_report(n_periods: int = 12, n_items: int = 30, seed: int = 0) -> pd.DataFrame:
+    """Tạo một báo cáo tài chính giả lập theo quý (có cột year/quarter)."""
+    rng = np.random.default_rng(seed)
+    years = [2024 - i // 4 for i in range(n_periods)]
+    quarters = [4 - i % 4 for i in range(n_periods)]
+    data = {'year': years, 'quarter': quarters}
+    for j in range(n_items):
+        data[f'item_{j:02d}'] = rng.normal(1e9, 2e8, n_periods).round(0)
+    return pd.DataFrame(data)
+
+
+class SyntheticProvider(DataProvider):
+    """
+    Nguồn dữ liệu tổng hợp, không cần mạng. Giá của một mã lấy từ `adj_close` (nếu có cột
+    tương ứng), từ `ohlcv` (nếu có khóa tương ứng), nếu không thì sinh bằng `make_ohlcv` với
+    seed suy ra từ mã. Khoảng ngày `start`/`end` được bỏ qua: luôn trả về toàn bộ chuỗi.
+    """
+
+    def __init__(self, adj_close: pd.DataFrame = None, ohlcv: Dict[str, pd.DataFrame] = None,
+                 n_bars: int = 750, seed: int = 0):
+        self.adj_close = adj_close
+        self.ohlcv = ohlcv or {}
+        self.n_bars = n_bars
+        self.seed = seed
+
+    def _seed(self, symbol: str) -> int:
+        return self.seed + zlib.crc32(symbol.encode('utf-8')) % 10_000
+
+    def price_history(self, symbol: str, start: str = None, end: str = None, interval: str = '1D') -> pd.DataFrame:
+        if symbol in self.ohlcv:
+            return self.ohlcv[symbol].copy()
+        if self.adj_close is not None and symbol in self.adj_close.columns:
+            close = self.adj_close[symbol].dropna()
+            return pd.DataFrame({'time': close.index, 'open': close.values, 'high': close.values,
+                                 'low': close.values, 'close': close.values, 'volume': 1_000_000.0})
+        return make_ohlcv(self.n_bars, seed=self._seed(symbol))
+
+    def financial_report(self, symbol: str, report_type: str, period: str = 'quarter') -> pd.DataFrame:
+        return make_financial_report(seed=self._seed(symbol))
+
+    def company_profile(self, symbol: str) -> pd.DataFrame:
+        return pd.DataFrame({'symbol': [symbol], 'company_name': [f"Công ty {symbol}"]})
+
+    def news(self, symbol: str, page_size: int = 10) -> pd.DataFrame:
+        return pd.DataFrame(columns=['title', 'source', 'url'])
+
+    def symbols_by_exchange(self) -> pd.DataFrame:
+        symbols = list(self.adj_close.columns) if self.adj_close is not None else list(self.ohlcv)
+        return pd.DataFrame({'symbol': symbols, 'organ_name': symbols, 'exchange': 'HOSE', 'type': 'STOCK'})
+
+    def symbols_by_industries(self) -> pd.DataFrame:
+        symbols = list(self.adj_close.columns) if self.adj_close is not None else list(self.ohlcv)
+        return pd.DataFrame({'symbol': symbols, 'icb_name3': 'Tổng hợp'})
+
+    def price_board(self, symbols: list) -> pd.DataFrame:
+        # Như bảng giá vnstock: giá khớp tính bằng đồng (giá lịch sử tính bằng nghìn đồng)
+        last = {s: self.price_history(s)['close'].iloc[-1] * 1000 for s in symbols}
+        return pd.DataFrame({'symbol': list(last), 'match_price': list(last.values())})
+
+
+def offline_stock(symbol: str, price_history: pd.DataFrame) -> Stock:
+    """Dựng một `Stock` dùng nguồn dữ liệu tổng hợp, với giá lịch sử có sẵn."""
+    stock = Stock(symbol, provider=SyntheticProvider(ohlcv={symbol: price_history}))
+    stock.price_history = price_history
+    return stock
+
+
+def offline_portfolio(adj_close: pd.DataFrame, benchmark: str = "VNINDEX") -> Portfolio:
+    """Dựng một `Portfolio` từ bảng giá có sẵn (nguồn dữ liệu tổng hợp), bỏ qua bước tải dữ liệu."""
+    portfolio = Portfolio([c for c in adj_close.columns if c != benchmark], benchmark,
+                          provider=SyntheticProvider(adj_close=adj_close))
+    portfolio.adj_close = adj_close
+    return portfolio
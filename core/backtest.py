@@ -0,0 +1,194 @@
+# goldenkey_project/core/backtest.py
+import pandas as pd
+import numpy as np
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from core.portfolio import Portfolio
+
+# Mã tần suất tái cân bằng -> tần suất kỳ của pandas
+REBALANCE_FREQUENCIES = {'monthly': 'M', 'quarterly': 'Q'}
+
+# Sau bao nhiêu lần cập nhật tăng dần thì tính lại tổng từ đầu để chặn sai số tích lũy
+_RESYNC_EVERY = 24
+
+
+class WalkForwardBacktester:
+    """
+    Kiểm định walk-forward cho một danh mục: tại mỗi ngày tái cân bằng, ước lượng lại
+    lợi suất kỳ vọng và hiệp phương sai trên cửa sổ lookback, chọn lại tỷ trọng dưới
+    cùng ràng buộc min/max và tỷ trọng tiền mặt, rồi mô phỏng đến kỳ tái cân bằng kế tiếp.
+
+    Hiệp phương sai cửa sổ trượt được cập nhật tăng dần (cộng các phiên mới, trừ các
+    phiên rời khỏi cửa sổ) thay vì tính lại từ đầu ở mỗi kỳ.
+    """
+
+    def __init__(self, portfolio: 'Portfolio', lookback_days: int = 252, rebalance: str = 'monthly',
+                 transaction_cost: float = 0.0015, min_weight: float = 0.10, max_weight: float = 0.60,
+                 cash_weight: float = 0.0, risk_free_rate: float = 0.04, n_candidates: int = 5000,
+                 objective: str = 'sharpe'):
+        """
+        Args:
+            portfolio (Portfolio): Danh mục đã gọi fetch_data() và calculate_stats().
+            lookback_days (int): Số phiên dùng để ước lượng thống kê tại mỗi kỳ.
+            rebalance (str): 'monthly' hoặc 'quarterly'.
+            transaction_cost (float): Chi phí giao dịch trên mỗi đơn vị giá trị mua/bán (0.0015 = 0.15%).
+            min_weight, max_weight (float): Ràng buộc tỷ trọng cho phần cổ phiếu.
+            cash_weight (float): Tỷ trọng tiền mặt cố định của toàn danh mục.
+            risk_free_rate (float): Lãi suất phi rủi ro năm, dùng cho tiền mặt và tỷ lệ Sharpe.
+            n_candidates (int): Số danh mục ứng viên được sinh một lần và đánh giá lại ở mỗi kỳ.
+            objective (str): 'sharpe' (Sharpe tối đa) hoặc 'return' (lợi nhuận tối đa).
+        """
+        if rebalance not in REBALANCE_FREQUENCIES:
+            raise ValueError(f"Tần suất tái cân bằng không hợp lệ: {rebalance}")
+        if objective not in ('sharpe', 'return'):
+            raise ValueError(f"Mục tiêu tối ưu không hợp lệ: {objective}")
+        self.portfolio = portfolio
+        self.lookback_days = lookback_days
+        self.rebalance = rebalance
+        self.transaction_cost = transaction_cost
+        self.min_weight = min_weight
+        self.max_weight = max_weight
+        self.cash_weight = cash_weight
+        self.risk_free_rate = risk_free_rate
+        self.n_candidates = n_candidates
+        self.objective = objective
+
+    def _rebalance_positions(self, index: pd.DatetimeIndex) -> np.ndarray:
+        """Vị trí (theo dòng) của phiên đầu tiên mỗi tháng/quý sau khi đủ dữ liệu lookback."""
+        periods = index.to_period(REBALANCE_FREQUENCIES[self.rebalance])
+        starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+        starts = starts[starts >= self.lookback_days]
+        if len(starts) == 0 or starts[0] != self.lookback_days:
+            # Kỳ đầu tiên bắt đầu ngay khi đủ dữ liệu lookback
+            starts = np.r_[self.lookback_days, starts]
+        return starts
+
+    def _window_moments(self, R: np.ndarray, positions: np.ndarray):
+        """
+        Lợi suất kỳ vọng và hiệp phương sai (năm hóa) của cửa sổ lookback trước mỗi vị trí
+        tái cân bằng. Tổng bậc 1 và bậc 2 được cập nhật tăng dần giữa các kỳ.
+        """
+        L = self.lookback_days
+        window_start = positions[0] - L
+        s1 = R[window_start:positions[0]].sum(axis=0)
+        s2 = R[window_start:positions[0]].T @ R[window_start:positions[0]]
+
+        for k, t0 in enumerate(positions):
+            new_start = t0 - L
+            if k > 0:
+                if k % _RESYNC_EVERY == 0:
+                    window = R[new_start:t0]
+                    s1 = window.sum(axis=0)
+                    s2 = window.T @ window
+                else:
+                    leaving = R[window_start:new_start]
+                    entering = R[t0 - (new_start - window_start):t0]
+                    s1 = s1 + entering.sum(axis=0) - leaving.sum(axis=0)
+                    s2 = s2 + entering.T @ entering - leaving.T @ leaving
+            window_start = new_start
+
+            mean = s1 / L
+            yield mean * 252, (s2 - np.outer(s1, mean)) / (L - 1) * 252
+
+    def run(self) -> dict:
+        """
+        Chạy kiểm định.
+
+        Returns:
+            dict: {
+                'equity': DataFrame giá trị tích lũy của danh mục và benchmark,
+                'weights': DataFrame tỷ trọng mục tiêu (toàn danh mục) tại mỗi kỳ,
+                'turnover': Series tỷ lệ giao dịch tại mỗi kỳ,
+                'stats': DataFrame các chỉ số hiệu suất và sụt giảm,
+            }
+        """
+        returns = self.portfolio.returns
+        symbols = self.portfolio.symbols
+        benchmark = self.portfolio.benchmark
+        if len(returns) <= self.lookback_days + 1:
+            raise ValueError("Không đủ dữ liệu lịch sử cho cửa sổ lookback đã chọn.")
+
+        R = returns[symbols].values
+        num_assets = len(symbols)
+        positions = self._rebalance_positions(returns.index)
+        ends = np.r_[positions[1:], len(R)]
+
+        candidates = self.portfolio.sample_weights(self.n_candidates, self.min_weight, self.max_weight)
+        if len(candidates) == 0:
+            raise ValueError("Không tìm thấy tỷ trọng nào thỏa mãn ràng buộc. Hãy nới lỏng ràng buộc.")
+
+        daily_rf = (1 + self.risk_free_rate) ** (1 / 252) - 1
+        stock_share = 1 - self.cash_weight
+
+        equity_parts = []
+        weight_rows = []
+        turnovers = []
+        value = 1.0
+        drifted = np.r_[np.zeros(num_assets), 1.0]  # Bắt đầu với 100% tiền mặt
+
+        moments = self._window_moments(R, positions)
+        for t0, t1, (mu, cov) in zip(positions, ends, moments):
+            # Đánh giá lại toàn bộ ứng viên trên thống kê mới
+            p_returns = candidates @ mu
+            if self.objective == 'sharpe':
+                p_vol = np.sqrt(np.maximum(np.einsum('ij,jk,ik->i', candidates, cov, candidates), 1e-18))
+                best = candidates[np.argmax((p_returns - self.risk_free_rate) / p_vol)]
+            else:
+                best = candidates[np.argmax(p_returns)]
+
+            target = np.r_[best * stock_share, self.cash_weight]
+            # Giá trị cổ phiếu cần mua/bán so với danh mục đã trôi tỷ trọng (tính theo tỷ lệ giá trị danh mục)
+            turnover = np.abs(target[:-1] - drifted[:-1]).sum()
+            value *= 1 - self.transaction_cost * turnover
+            turnovers.append(turnover)
+            weight_rows.append(target)
+
+            # Mô phỏng vector hóa cho cả kỳ nắm giữ
+            growth = np.cumprod(1 + R[t0:t1], axis=0)
+            cash_growth = (1 + daily_rf) ** np.arange(1, t1 - t0 + 1)
+            holdings = np.column_stack([growth * target[:-1], cash_growth * target[-1]])
+            period_values = holdings.sum(axis=1)
+            equity_parts.append(value * period_values)
+
+            value *= period_values[-1]
+            drifted = holdings[-1] / period_values[-1]
+
+        index = returns.index[positions[0]:]
+        rebalance_dates = returns.index[positions]
+        equity = pd.DataFrame({
+            'Danh mục': np.concatenate(equity_parts),
+            benchmark: (1 + returns[benchmark].iloc[positions[0]:]).cumprod().values,
+        }, index=index)
+        weights = pd.DataFrame(weight_rows, index=rebalance_dates, columns=symbols + ['Tiền mặt'])
+        turnover = pd.Series(turnovers, index=rebalance_dates, name='turnover')
+
+        stats = pd.DataFrame({col: performance_stats(equity[col], self.risk_free_rate) for col in equity.columns}).T
+        periods_per_year = 12 if self.rebalance == 'monthly' else 4
+        stats.loc['Danh mục', 'annual_turnover'] = turnover.iloc[1:].mean() * periods_per_year if len(turnover) > 1 else 0.0
+
+        return {'equity': equity, 'weights': weights, 'turnover': turnover, 'stats': stats}
+
+
+def performance_stats(equity: pd.Series, risk_free_rate: float = 0.04) -> dict:
+    """Tính CAGR, độ biến động, Sharpe, sụt giảm tối đa và thời gian sụt giảm dài nhất."""
+    values = equity.values
+    daily_returns = values[1:] / values[:-1] - 1
+    years = len(values) / 252
+    cagr = (values[-1] / values[0]) ** (1 / years) - 1 if years > 0 else np.nan
+    volatility = daily_returns.std(ddof=1) * np.sqrt(252) if len(daily_returns) > 1 else np.nan
+
+    running_max = np.maximum.accumulate(values)
+    drawdown = values / running_max - 1
+    # Số phiên liên tiếp dài nhất nằm dưới đỉnh cũ
+    underwater = drawdown < 0
+    breaks = np.flatnonzero(np.diff(np.r_[0, underwater.astype(int), 0]))
+    durations = breaks[1::2] - breaks[::2]
+
+    return {
+        'cagr': cagr,
+        'volatility': volatility,
+        'sharpe': (cagr - risk_free_rate) / volatility if volatility else np.nan,
+        'max_drawdown': drawdown.min(),
+        'max_drawdown_days': int(durations.max()) if len(durations) else 0,
+    }
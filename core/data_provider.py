@@ -0,0 +1,250 @@
+# goldenkey_project/core/data_provider.py
+"""
+Lớp trung gian cho mọi truy cập dữ liệu thị trường. Ngoài nguồn trực tiếp (vnstock) còn
+có hai chế độ phục vụ kiểm thử và đo hiệu năng:
+
+- RecordingProvider: gọi nguồn thật và ghi lại từng phản hồi (kể cả lỗi, thời gian phản hồi)
+  vào một thư mục lưu trữ.
+- ReplayProvider: phát lại các phản hồi đã ghi, không cần mạng, có thể mô phỏng độ trễ và lỗi.
+
+Chế độ được chọn qua biến môi trường GOLDENKEY_DATA_PROVIDER (live/record/replay), xem config.py.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+import vnstock
+
+from config import (DATA_ARCHIVE_DIR, DATA_PROVIDER, DEFAULT_BENCHMARK, REPLAY_FAULT_RATE, REPLAY_LATENCY,
+                    REPLAY_SEED, VN_STOCK_SOURCE)
+
+
+class DataProvider(ABC):
+    """Giao diện chung của các nguồn dữ liệu. Mọi phương thức trả về DataFrame như vnstock."""
+
+    @abstractmethod
+    def price_history(self, symbol: str, start: str, end: str, interval: str = '1D') -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def financial_report(self, symbol: str, report_type: str, period: str = 'quarter') -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def company_profile(self, symbol: str) -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def news(self, symbol: str, page_size: int = 10) -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def symbols_by_exchange(self) -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def symbols_by_industries(self) -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def price_board(self, symbols: list) -> pd.DataFrame:
+        ...
+
+
+class VnstockProvider(DataProvider):
+    """Nguồn dữ liệu trực tiếp qua vnstock."""
+
+    def __init__(self, source: str = VN_STOCK_SOURCE):
+        self.source = source
+        self.client = vnstock.Vnstock()
+
+    def _stock(self, symbol: str):
+        return self.client.stock(symbol=symbol, source=self.source)
+
+    def price_history(self, symbol: str, start: str, end: str, interval: str = '1D') -> pd.DataFrame:
+        return self._stock(symbol).quote.history(start=start, end=end, interval=interval)
+
+    def financial_report(self, symbol: str, report_type: str, period: str = 'quarter') -> pd.DataFrame:
+        return getattr(self._stock(symbol).finance, report_type)(period=period, lang='vi')
+
+    def company_profile(self, symbol: str) -> pd.DataFrame:
+        return self._stock(symbol).company.profile()
+
+    def news(self, symbol: str, page_size: int = 10) -> pd.DataFrame:
+        return vnstock.stock_news(symbol=symbol, page_num=1, page_size=page_size)
+
+    def symbols_by_exchange(self) -> pd.DataFrame:
+        return self._stock(DEFAULT_BENCHMARK).listing.symbols_by_exchange()
+
+    def symbols_by_industries(self) -> pd.DataFrame:
+        return self._stock(DEFAULT_BENCHMARK).listing.symbols_by_industries()
+
+    def price_board(self, symbols: list) -> pd.DataFrame:
+        return vnstock.Trading(source=self.source).price_board(symbols_list=list(symbols))
+
+
+class RecordingNotFound(LookupError):
+    """Không có phản hồi nào đã ghi cho yêu cầu này."""
+
+
+class ReplayFault(ConnectionError):
+    """Lỗi mạng giả lập khi phát lại."""
+
+
+def _request_key(method: str, params: dict) -> str:
+    """
+    Khóa của một yêu cầu. Ngày bắt đầu/kết thúc được lưu dưới dạng số ngày trước hôm nay,
+    để một lần chạy phát lại vào ngày khác (cùng cấu hình "3 năm gần nhất") vẫn khớp.
+    """
+    normalized = {}
+    for name, value in sorted(params.items()):
+        if name in ('start', 'end'):
+            value = f"T-{(datetime.now().date() - pd.Timestamp(value).date()).days}"
+        normalized[name] = value
+    readable = "_".join(str(v) for v in normalized.values())
+    digest = hashlib.sha1(json.dumps([method, normalized], sort_keys=True).encode()).hexdigest()[:10]
+    return f"{method}/{re.sub(r'[^0-9A-Za-z_.-]+', '-', readable)[:80]}_{digest}"
+
+
+class _ArchivingProvider(DataProvider):
+    """Chuyển mọi phương thức về một hàm `_call(method, **params)` chung."""
+
+    def price_history(self, symbol, start, end, interval='1D'):
+        return self._call('price_history', symbol=symbol, start=start, end=end, interval=interval)
+
+    def financial_report(self, symbol, report_type, period='quarter'):
+        return self._call('financial_report', symbol=symbol, report_type=report_type, period=period)
+
+    def company_profile(self, symbol):
+        return self._call('company_profile', symbol=symbol)
+
+    def news(self, symbol, page_size=10):
+        return self._call('news', symbol=symbol, page_size=page_size)
+
+    def symbols_by_exchange(self):
+        return self._call('symbols_by_exchange')
+
+    def symbols_by_industries(self):
+        return self._call('symbols_by_industries')
+
+    def price_board(self, symbols):
+        return self._call('price_board', symbols=list(symbols))
+
+    @abstractmethod
+    def _call(self, method: str, **params) -> pd.DataFrame:
+        ...
+
+
+class RecordingProvider(_ArchivingProvider):
+    """
+    Gọi một nguồn dữ liệu khác và ghi lại mỗi phản hồi vào `archive_dir`:
+    `<khóa>.pkl` chứa DataFrame (pickle giữ nguyên cột nhiều tầng và kiểu dữ liệu), và
+    `<khóa>.json` chứa tham số, thời gian phản hồi và lỗi (nếu có).
+    """
+
+    def __init__(self, inner: DataProvider = None, archive_dir: str = DATA_ARCHIVE_DIR):
+        self.inner = inner or VnstockProvider()
+        self.archive_dir = archive_dir
+
+    def _call(self, method: str, **params) -> pd.DataFrame:
+        key = _request_key(method, params)
+        start = time.perf_counter()
+        error = None
+        try:
+            result = getattr(self.inner, method)(**params)
+        except Exception as e:
+            error = e
+            result = None
+        meta = {'method': method, 'params': params, 'elapsed': time.perf_counter() - start,
+                'recorded_at': datetime.now().isoformat(),
+                'error': None if error is None else {'type': type(error).__name__, 'message': str(error)}}
+
+        path = os.path.join(self.archive_dir, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if result is not None:
+            pd.to_pickle(result, f"{path}.pkl.tmp", compression='gzip')
+            os.replace(f"{path}.pkl.tmp", f"{path}.pkl")
+        with open(f"{path}.json.tmp", 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, default=str)
+        os.replace(f"{path}.json.tmp", f"{path}.json")
+
+        if error is not None:
+            raise error
+        return result
+
+
+class ReplayProvider(_ArchivingProvider):
+    """
+    Phát lại các phản hồi đã ghi bởi RecordingProvider.
+
+    Args:
+        archive_dir (str): Thư mục lưu trữ.
+        latency (float): Độ trễ giả lập (giây) cho mỗi yêu cầu; -1 để dùng đúng thời gian đã ghi.
+        fault_rate (float): Xác suất một yêu cầu thất bại với ReplayFault.
+        seed (int): Seed cho độ trễ/lỗi giả lập, để các lần chạy giống hệt nhau.
+    """
+
+    def __init__(self, archive_dir: str = DATA_ARCHIVE_DIR, latency: float = 0.0, fault_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.archive_dir = archive_dir
+        self.latency = latency
+        self.fault_rate = fault_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def _call(self, method: str, **params) -> pd.DataFrame:
+        key = _request_key(method, params)
+        path = os.path.join(self.archive_dir, key)
+        try:
+            with open(f"{path}.json", 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except OSError:
+            raise RecordingNotFound(f"Chưa ghi dữ liệu cho {method}({params}) trong {self.archive_dir}")
+
+        with self._rng_lock:
+            fail = self._rng.random() < self.fault_rate
+        time.sleep(meta['elapsed'] if self.latency < 0 else self.latency)
+        if fail:
+            raise ReplayFault(f"Lỗi mạng giả lập khi gọi {method}({params})")
+        if meta['error'] is not None:
+            raise RuntimeError(f"{meta['error']['type']}: {meta['error']['message']}")
+        return pd.read_pickle(f"{path}.pkl", compression='gzip')
+
+
+_provider: Optional[DataProvider] = None
+_provider_lock = threading.Lock()
+
+
+def create_data_provider(mode: str = DATA_PROVIDER) -> DataProvider:
+    """Tạo nguồn dữ liệu theo chế độ 'live', 'record' hoặc 'replay'."""
+    if mode == 'live':
+        return VnstockProvider()
+    if mode == 'record':
+        return RecordingProvider(VnstockProvider(), DATA_ARCHIVE_DIR)
+    if mode == 'replay':
+        return ReplayProvider(DATA_ARCHIVE_DIR, latency=REPLAY_LATENCY, fault_rate=REPLAY_FAULT_RATE, seed=REPLAY_SEED)
+    raise ValueError(f"Chế độ nguồn dữ liệu không hợp lệ: {mode}")
+
+
+def get_data_provider() -> DataProvider:
+    """Nguồn dữ liệu dùng chung cho toàn bộ tiến trình."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = create_data_provider()
+        return _provider
+
+
+def set_data_provider(provider: DataProvider):
+    """Thay nguồn dữ liệu dùng chung (ví dụ khi đo hiệu năng với dữ liệu phát lại)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
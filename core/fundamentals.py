@@ -0,0 +1,413 @@
+# goldenkey_project/core/fundamentals.py
+"""
+Kho báo cáo tài chính cục bộ: kết quả kinh doanh, cân đối kế toán, lưu chuyển tiền tệ và
+chỉ số tài chính của toàn bộ danh sách mã được lưu dạng cột (mỗi loại báo cáo một file
+Parquet) và chỉ cập nhật thêm khi có quý mới. Trên kho này, việc so sánh với các doanh
+nghiệp cùng ngành là một truy vấn cục bộ thay vì tải báo cáo của từng mã.
+
+Báo cáo tải bổ sung cho từng mã (khi xem một mã chưa có trong kho) được ghi thành các file
+delta nhỏ bên cạnh bảng chính thay vì ghi lại cả bảng; các lần cập nhật theo lô (hoặc khi số
+file delta vượt `MAX_DELTA_FILES`) gộp chúng vào bảng chính.
+
+Nhiều tiến trình có thể dùng chung một thư mục kho: mọi lần ghi đều giữ khóa file
+`<thư mục>/.lock` và đọc lại bảng, các file delta và manifest từ đĩa trước khi ghi.
+"""
+import json
+import glob
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ khóa giữa các luồng trong tiến trình
+    fcntl = None
+
+from config import FUNDAMENTALS_DIR, FUNDAMENTALS_RECHECK_HOURS
+from core.data_provider import get_data_provider
+from core.universe import get_universe
+
+REPORT_TYPES = ['income_statement', 'balance_sheet', 'cash_flow', 'ratio']
+REPORT_LABELS = {
+    'income_statement': 'Kết quả kinh doanh', 'balance_sheet': 'Bảng cân đối kế toán',
+    'cash_flow': 'Lưu chuyển tiền tệ', 'ratio': 'Chỉ số tài chính',
+}
+
+# Tên cột năm/kỳ có thể khác nhau giữa các nguồn và ngôn ngữ của vnstock
+_YEAR_COLUMNS = ['year', 'yearReport', 'Năm']
+_QUARTER_COLUMNS = ['quarter', 'lengthReport', 'Kỳ']
+_SYMBOL_COLUMNS = ['ticker', 'CP', 'symbol']
+_KEY_COLUMNS = ['symbol', 'year', 'quarter']
+
+# Số file delta tối đa của một bảng trước khi tự động gộp vào bảng chính
+MAX_DELTA_FILES = 64
+
+# Chỉ số dùng cho so sánh cùng ngành -> (các tên cột có thể gặp, giá trị cao hơn có tốt hơn không)
+PEER_METRICS = {
+    'roe': (['roe', 'ROE (%)'], True),
+    'roa': (['roa', 'ROA (%)'], True),
+    'pe': (['priceToEarning', 'P/E'], False),
+    'pb': (['priceToBook', 'P/B'], False),
+    'gross_margin': (['grossProfitMargin', 'Biên lợi nhuận gộp (%)'], True),
+    'net_margin': (['postTaxMargin', 'Biên lợi nhuận ròng (%)'], True),
+    'debt_to_equity': (['debtOnEquity', 'Nợ/VCSH'], False),
+}
+
+PEER_METRIC_LABELS = {
+    'roe': 'ROE', 'roa': 'ROA', 'pe': 'P/E', 'pb': 'P/B',
+    'gross_margin': 'Biên lợi nhuận gộp', 'net_margin': 'Biên lợi nhuận ròng', 'debt_to_equity': 'Nợ/Vốn chủ sở hữu',
+}
+
+
+def normalize_report(df: pd.DataFrame, symbol: str, period: str) -> pd.DataFrame:
+    """
+    Chuẩn hóa một báo cáo tải từ vnstock: làm phẳng cột nhiều tầng, đưa cột mã/năm/kỳ về
+    'symbol'/'year'/'quarter' và chuyển các cột số liệu sang kiểu số.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame()
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [col[-1] for col in df.columns]
+    df = df.loc[:, ~pd.Index(df.columns).duplicated()]
+
+    rename = {}
+    for target, candidates in (('year', _YEAR_COLUMNS), ('quarter', _QUARTER_COLUMNS)):
+        source = next((col for col in candidates if col in df.columns), None)
+        if source is not None:
+            rename[source] = target
+    df = df.rename(columns=rename).drop(columns=[c for c in _SYMBOL_COLUMNS if c in df.columns])
+    if 'year' not in df.columns:
+        return pd.DataFrame()
+    if 'quarter' not in df.columns or period == 'year':
+        df['quarter'] = 0
+
+    for col in df.columns:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df = df.dropna(subset=['year'])
+    df['year'] = df['year'].astype(int)
+    df['quarter'] = df['quarter'].fillna(0).astype(int)
+    df.insert(0, 'symbol', symbol)
+    return df.drop_duplicates(subset=['year', 'quarter'], keep='first')
+
+
+def _merge_reports(parts: List[pd.DataFrame]) -> pd.DataFrame:
+    """Gộp các phần của một bảng báo cáo, bỏ kỳ trùng (giữ bản xuất hiện trước), mới nhất trước."""
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return pd.DataFrame()
+    combined = pd.concat(parts, ignore_index=True).drop_duplicates(subset=_KEY_COLUMNS, keep='first')
+    return combined.sort_values(_KEY_COLUMNS, ascending=[True, False, False], ignore_index=True)
+
+
+def latest_completed_quarter(today: Optional[datetime] = None) -> tuple:
+    """(năm, quý) của quý gần nhất đã kết thúc."""
+    today = today or datetime.now()
+    quarter = (today.month - 1) // 3
+    return (today.year, quarter) if quarter > 0 else (today.year - 1, 4)
+
+
+class FundamentalsStore:
+    """
+    Kho báo cáo tài chính dạng cột cho toàn bộ danh sách mã.
+
+    Mỗi (loại báo cáo, kỳ) được lưu trong một file Parquet với các cột symbol/year/quarter
+    và các chỉ tiêu, cộng các file delta trong thư mục `<loại>_<kỳ>.delta` chưa được gộp;
+    `manifest.json` ghi kỳ mới nhất và thời điểm kiểm tra gần nhất của từng mã để chỉ tải
+    lại khi có thể đã có quý mới.
+    """
+
+    def __init__(self, base_dir: str = FUNDAMENTALS_DIR, recheck_hours: float = FUNDAMENTALS_RECHECK_HOURS):
+        self.base_dir = base_dir
+        self.recheck_interval = timedelta(hours=recheck_hours)
+        self._tables: Dict[tuple, pd.DataFrame] = {}
+        self._peer_cache: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._manifest = self._load_manifest()
+
+    @contextmanager
+    def _locked(self):
+        """Khóa ghi kho: khóa luồng (lồng được) cộng khóa file `.lock` dùng chung giữa các tiến trình."""
+        with self._lock:
+            handle = None
+            if self._lock_depth == 0 and fcntl is not None:
+                os.makedirs(self.base_dir, exist_ok=True)
+                handle = open(os.path.join(self.base_dir, '.lock'), 'a')
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if handle is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+                    handle.close()
+
+    # --- Lưu trữ ---
+
+    def _table_path(self, report_type: str, period: str) -> str:
+        return os.path.join(self.base_dir, f"{report_type}_{period}.parquet")
+
+    def _delta_files(self, report_type: str, period: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.base_dir, f"{report_type}_{period}.delta", '*.parquet')))
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(os.path.join(self.base_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        os.makedirs(self.base_dir, exist_ok=True)
+        path = os.path.join(self.base_dir, 'manifest.json')
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _read_deltas(self, files: List[str]) -> List[pd.DataFrame]:
+        parts = []
+        for path in files:
+            try:
+                parts.append(pd.read_parquet(path))
+            except (OSError, ValueError) as e:
+                # File đã được tiến trình khác gộp và xóa, hoặc hỏng: bỏ qua
+                print(f"Lỗi khi đọc file delta {path}: {e}")
+        return parts
+
+    def _load_table(self, report_type: str, period: str) -> pd.DataFrame:
+        """Đọc lại bảng chính cùng các file delta từ đĩa và thay bản trong bộ nhớ."""
+        with self._locked():
+            path = self._table_path(report_type, period)
+            main = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+            deltas = self._read_deltas(self._delta_files(report_type, period))
+            df = _merge_reports(deltas + [main]) if deltas else main
+            self._set_table(report_type, period, df)
+            return df
+
+    def table(self, report_type: str, period: str = 'quarter') -> pd.DataFrame:
+        """Toàn bộ bảng của một loại báo cáo (mọi mã), nạp từ đĩa một lần rồi giữ trong bộ nhớ."""
+        with self._lock:
+            df = self._tables.get((report_type, period))
+            return df if df is not None else self._load_table(report_type, period)
+
+    def _set_table(self, report_type: str, period: str, df: pd.DataFrame):
+        self._tables[(report_type, period)] = df
+        if report_type == 'ratio':
+            self._peer_cache.pop(period, None)
+
+    def _write_table(self, report_type: str, period: str, df: pd.DataFrame):
+        """
+        Ghi lại bảng chính (gộp cả các file delta đang có trên đĩa) rồi xóa các file delta đó.
+        Phải được gọi trong `_locked()` với `df` vừa đọc lại từ đĩa.
+        """
+        os.makedirs(self.base_dir, exist_ok=True)
+        files = self._delta_files(report_type, period)
+        if files:
+            df = _merge_reports([df] + self._read_deltas(files))
+        path = self._table_path(report_type, period)
+        df.to_parquet(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+        for delta in files:
+            try:
+                os.remove(delta)
+            except FileNotFoundError:
+                pass
+        self._set_table(report_type, period, df)
+
+    def _append_delta(self, report_type: str, period: str, new_rows: pd.DataFrame, combined: pd.DataFrame):
+        """Chỉ ghi các dòng mới thành một file delta; bảng trong bộ nhớ được thay bằng `combined`."""
+        delta_dir = os.path.join(self.base_dir, f"{report_type}_{period}.delta")
+        os.makedirs(delta_dir, exist_ok=True)
+        path = os.path.join(delta_dir, f"{time.time_ns()}-{os.getpid()}-{threading.get_ident()}.parquet")
+        new_rows.to_parquet(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+        self._set_table(report_type, period, combined)
+
+    def compact(self, report_type: str, period: str = 'quarter'):
+        """Gộp các file delta của một bảng vào bảng chính."""
+        with self._locked():
+            if self._delta_files(report_type, period):
+                self._write_table(report_type, period, self._load_table(report_type, period))
+
+    # --- Cập nhật tăng dần ---
+
+    def _needs_update(self, symbol: str, report_type: str, period: str) -> bool:
+        entry = self._manifest.get(f"{report_type}:{period}", {}).get(symbol)
+        if entry is None:
+            return True
+        if period == 'quarter':
+            has_latest = (entry['year'], entry['quarter']) >= latest_completed_quarter()
+        else:
+            has_latest = entry['year'] >= datetime.now().year - 1
+        if has_latest:
+            return False
+        # Báo cáo quý mới được công bố trong vài tuần sau khi kết thúc quý: kiểm tra lại định kỳ
+        return datetime.now() - datetime.fromisoformat(entry['checked_at']) >= self.recheck_interval
+
+    @staticmethod
+    def _fetch_report(symbol: str, report_type: str, period: str) -> pd.DataFrame:
+        report = get_data_provider().financial_report(symbol, report_type, period=period)
+        return normalize_report(report, symbol, period)
+
+    def update(self, symbols: List[str], report_types: List[str] = None, period: str = 'quarter',
+               max_workers: int = 8, force: bool = False, compact: bool = True) -> Dict[str, int]:
+        """
+        Tải các báo cáo còn thiếu quý mới và nối vào kho. Chỉ các kỳ chưa có trong kho được
+        thêm vào; mỗi bảng được ghi lại một lần cho cả lô. Với `compact=False` (tải bổ sung
+        vài mã), các dòng mới chỉ được ghi thành một file delta.
+
+        Returns:
+            dict: Số dòng mới được thêm cho mỗi loại báo cáo.
+        """
+        report_types = report_types or REPORT_TYPES
+        added = {}
+        for report_type in report_types:
+            key = f"{report_type}:{period}"
+            pending = [s for s in dict.fromkeys(symbols) if force or self._needs_update(s, report_type, period)]
+            if not pending:
+                added[report_type] = 0
+                continue
+
+            def fetch(symbol: str):
+                try:
+                    return symbol, self._fetch_report(symbol, report_type, period)
+                except Exception as e:
+                    print(f"Lỗi khi truy xuất {report_type} cho {symbol}: {e}")
+                    return symbol, None
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(fetch, pending))
+
+            with self._locked():
+                # Tiến trình khác có thể đã ghi bảng hoặc manifest sau lần nạp trước: đọc lại từ đĩa
+                # để không ghi đè dữ liệu của họ bằng bản cũ. Mỗi mục manifest được gộp với bản trên đĩa.
+                existing = self._load_table(report_type, period)
+                self._manifest = self._load_manifest()
+                manifest = self._manifest.setdefault(key, {})
+                now = datetime.now().isoformat()
+                new_parts = []
+                known_keys = set() if existing.empty else set(zip(existing['symbol'], existing['year'], existing['quarter']))
+                for symbol, df in results:
+                    if df is None:
+                        continue
+                    previous = manifest.get(symbol, {'year': 0, 'quarter': 0})
+                    if df.empty:
+                        # Nguồn không có báo cáo cho mã này: chỉ ghi lại thời điểm kiểm tra
+                        manifest[symbol] = dict(previous, checked_at=now)
+                        continue
+                    latest = max([(previous['year'], previous['quarter'])] + list(zip(df['year'], df['quarter'])))
+                    manifest[symbol] = {'year': int(latest[0]), 'quarter': int(latest[1]), 'checked_at': now}
+                    if known_keys:
+                        df = df[[(symbol, y, q) not in known_keys for y, q in zip(df['year'], df['quarter'])]]
+                    if not df.empty:
+                        new_parts.append(df)
+
+                added[report_type] = sum(len(part) for part in new_parts)
+                if new_parts:
+                    combined = _merge_reports([existing] + new_parts)
+                    if compact or len(self._delta_files(report_type, period)) >= MAX_DELTA_FILES:
+                        self._write_table(report_type, period, combined)
+                    else:
+                        self._append_delta(report_type, period, pd.concat(new_parts, ignore_index=True), combined)
+                self._save_manifest()
+        return added
+
+    def update_universe(self, report_types: List[str] = None, period: str = 'quarter', max_workers: int = 8,
+                        force: bool = False) -> Dict[str, int]:
+        """Cập nhật kho cho toàn bộ cổ phiếu trong danh sách mã (bỏ qua các chỉ số thị trường)."""
+        return self.update(get_universe().stock_symbols(), report_types, period, max_workers, force)
+
+    # --- Truy vấn ---
+
+    def get(self, symbol: str, report_type: str, period: str = 'quarter', years: int = 3) -> pd.DataFrame:
+        """
+        Báo cáo của một mã trong `years` năm gần nhất (mới nhất trước). Nếu mã chưa có
+        trong kho hoặc có thể đã có quý mới thì tải bổ sung trước khi trả về.
+        """
+        symbol = symbol.upper().strip()
+        if self._needs_update(symbol, report_type, period):
+            self.update([symbol], [report_type], period, compact=False)
+        df = self.table(report_type, period)
+        if df.empty:
+            return pd.DataFrame()
+        start_year = datetime.now().year - years
+        report = df[(df['symbol'] == symbol) & (df['year'] >= start_year)]
+        return report.drop(columns='symbol').dropna(axis=1, how='all').reset_index(drop=True)
+
+    def _latest_ratios(self, period: str) -> pd.DataFrame:
+        """Kỳ mới nhất của từng mã với các chỉ số so sánh đã chuẩn hóa tên, kèm ngành."""
+        with self._lock:
+            if period in self._peer_cache:
+                return self._peer_cache[period]
+            ratios = self.table('ratio', period)
+            if ratios.empty:
+                return pd.DataFrame()
+            latest = ratios.sort_values(['year', 'quarter'], ascending=False).drop_duplicates('symbol')
+            columns = {}
+            for metric, (aliases, _) in PEER_METRICS.items():
+                source = next((col for col in aliases if col in latest.columns), None)
+                if source is not None:
+                    columns[metric] = latest[source].values
+            peers = pd.DataFrame(columns, index=latest['symbol'].values)
+            universe = get_universe()
+            peers['industry'] = [universe.industry(symbol) for symbol in peers.index]
+
+            # Hạng phần trăm trong ngành (1 = tốt nhất); với P/E, P/B, nợ thì thấp hơn là tốt hơn.
+            # P/E, P/B âm (doanh nghiệp lỗ hoặc âm vốn) không được xếp hạng.
+            for metric in columns:
+                higher_is_better = PEER_METRICS[metric][1]
+                values = peers[metric] if higher_is_better else peers[metric].where(peers[metric] > 0)
+                peers[f"{metric}_pct"] = values.groupby(peers['industry']).rank(pct=True, ascending=higher_is_better)
+            self._peer_cache[period] = peers
+            return peers
+
+    def peer_comparison(self, symbol: str, period: str = 'quarter') -> pd.DataFrame:
+        """
+        So sánh các chỉ số của một mã với các doanh nghiệp cùng ngành trong kho.
+
+        Returns:
+            pd.DataFrame: Mỗi dòng là một chỉ số với các cột value, industry_median,
+            percentile (0-1, cao hơn là tốt hơn) và peer_count.
+        """
+        peers = self._latest_ratios(period)
+        symbol = symbol.upper().strip()
+        if peers.empty or symbol not in peers.index:
+            return pd.DataFrame()
+        industry = peers.at[symbol, 'industry']
+        group = peers[peers['industry'] == industry]
+        metrics = [m for m in PEER_METRICS if m in peers.columns]
+        return pd.DataFrame({
+            'value': [peers.at[symbol, m] for m in metrics],
+            'industry_median': [group[m].median() for m in metrics],
+            'percentile': [peers.at[symbol, f"{m}_pct"] for m in metrics],
+            'peer_count': [int(group[m].notna().sum()) for m in metrics],
+        }, index=pd.Index(metrics, name=industry))
+
+    def industry_ranking(self, industry: str, metric: str = 'roe', period: str = 'quarter') -> pd.DataFrame:
+        """Xếp hạng các mã trong một ngành theo một chỉ số (tốt nhất trước)."""
+        peers = self._latest_ratios(period)
+        if peers.empty or metric not in peers.columns:
+            return pd.DataFrame()
+        group = peers[peers['industry'] == industry][[metric, f"{metric}_pct"]].dropna()
+        return group.sort_values(f"{metric}_pct", ascending=False)
+
+
+_store: Optional[FundamentalsStore] = None
+_store_lock = threading.Lock()
+
+
+def get_fundamentals_store() -> FundamentalsStore:
+    """Kho dùng chung cho toàn bộ tiến trình."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FundamentalsStore()
+        return _store
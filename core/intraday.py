@@ -0,0 +1,155 @@
+# goldenkey_project/core/intraday.py
+"""
+Hỗ trợ dữ liệu trong phiên (1m/5m/15m/30m/1H): chia khoảng thời gian để tải theo từng
+đoạn, lưu trữ dạng cột gọn nhẹ và tạo các khung thời gian lớn hơn bằng cách
+resample cục bộ từ độ phân giải nhỏ nhất đang có trong cache.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Số phút của mỗi khung thời gian trong phiên
+INTRADAY_INTERVALS = {'1m': 1, '5m': 5, '15m': 15, '30m': 30, '1H': 60}
+
+# Số ngày lịch tối đa cho mỗi lần gọi API, tránh tải một khối dữ liệu phút quá lớn
+CHUNK_DAYS = {'1m': 7, '5m': 30, '15m': 60, '30m': 90, '1H': 180}
+
+# Quy tắc resample tương ứng của pandas
+_RESAMPLE_RULES = {'1m': '1min', '5m': '5min', '15m': '15min', '30m': '30min', '1H': '1h'}
+
+_OHLCV_AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+
+def is_intraday(interval: str) -> bool:
+    """Kiểm tra một khung thời gian có phải là dữ liệu trong phiên hay không."""
+    return interval in INTRADAY_INTERVALS
+
+
+def chunk_date_ranges(start: datetime, end: datetime, chunk_days: int) -> List[Tuple[datetime, datetime]]:
+    """Chia khoảng [start, end] thành các đoạn liên tiếp dài tối đa `chunk_days` ngày."""
+    ranges = []
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+        ranges.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(days=1)
+    return ranges
+
+
+def compact_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Chuẩn hóa và thu gọn dữ liệu OHLCV: sắp xếp theo thời gian, loại bản ghi trùng,
+    lưu giá dạng float32 và khối lượng dạng int64 để giảm bộ nhớ với dữ liệu phút.
+    """
+    if df.empty:
+        return df
+    df = df[['time', 'open', 'high', 'low', 'close', 'volume']].copy()
+    df['time'] = pd.to_datetime(df['time'])
+    df = df.dropna(subset=['volume']).drop_duplicates(subset='time', keep='last').sort_values('time')
+    for col in ['open', 'high', 'low', 'close']:
+        df[col] = df[col].astype(np.float32)
+    df['volume'] = df['volume'].astype(np.int64)
+    return df.reset_index(drop=True)
+
+
+def resample_ohlcv(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    Gộp dữ liệu OHLCV sang khung thời gian lớn hơn. Các khoảng không có giao dịch
+    (ngoài giờ, nghỉ trưa, cuối tuần) bị loại bỏ.
+    """
+    if df.empty:
+        return df
+    resampled = (
+        df.set_index('time')
+          .resample(_RESAMPLE_RULES[interval], label='left', closed='left')
+          .agg(_OHLCV_AGG)
+          .dropna(subset=['close'])
+          .reset_index()
+    )
+    return compact_ohlcv(resampled)
+
+
+class IntradayCache:
+    """
+    Cache dữ liệu trong phiên theo từng mã trong phạm vi tiến trình.
+
+    Với mỗi mã, cache giữ các bản dữ liệu đã tải theo từng độ phân giải cùng khoảng
+    thời gian chúng bao phủ. Khi cần một khung thời gian, bản mịn nhất bao phủ được
+    khoảng yêu cầu sẽ được resample thay vì tải lại. Số mã được giữ bị giới hạn theo
+    LRU để kiểm soát bộ nhớ. Bản dữ liệu có chứa ngày hôm nay chỉ được dùng trong
+    `live_ttl` giây vì phiên giao dịch vẫn đang tiếp diễn.
+    """
+
+    def __init__(self, max_symbols: int = 50, live_ttl: int = 60):
+        self.max_symbols = max_symbols
+        self.live_ttl = live_ttl
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str, interval: str, start: datetime, end: datetime) -> Optional[pd.DataFrame]:
+        """
+        Trả về dữ liệu khung `interval` trong [start, end] nếu có thể suy ra từ cache,
+        ngược lại trả về None.
+        """
+        target_minutes = INTRADAY_INTERVALS[interval]
+        with self._lock:
+            entries = self._entries.get(symbol, {})
+            source = None
+            for cached_interval in sorted(entries, key=INTRADAY_INTERVALS.get):
+                entry = entries[cached_interval]
+                covers = entry['start'] <= start.date() and entry['end'] >= end.date()
+                if covers and self._is_fresh(entry) and target_minutes % INTRADAY_INTERVALS[cached_interval] == 0:
+                    source = entry
+                    break
+            if source is None:
+                return None
+            self._entries.move_to_end(symbol)
+
+        df = source['data']
+        mask = (df['time'] >= pd.Timestamp(start.date())) & (df['time'] < pd.Timestamp(end.date()) + pd.Timedelta(days=1))
+        window = df.loc[mask]
+        if source['interval'] == interval:
+            return window.reset_index(drop=True)
+        return resample_ohlcv(window, interval)
+
+    def put(self, symbol: str, interval: str, start: datetime, end: datetime, df: pd.DataFrame):
+        """
+        Lưu dữ liệu vừa tải. Các bản thô hơn mà bản mới đã bao phủ (và resample ra
+        được) sẽ bị loại để không giữ dữ liệu trùng lặp.
+        """
+        new_minutes = INTRADAY_INTERVALS[interval]
+        new_entry = {'interval': interval, 'start': start.date(), 'end': end.date(), 'data': df,
+                     'fetched_at': time.monotonic()}
+        with self._lock:
+            entries = self._entries.setdefault(symbol, {})
+            existing = entries.get(interval)
+            if (existing is not None and self._is_fresh(existing)
+                    and existing['start'] <= new_entry['start'] and existing['end'] >= new_entry['end']):
+                return
+            for cached_interval in list(entries):
+                entry = entries[cached_interval]
+                within = new_entry['start'] <= entry['start'] and new_entry['end'] >= entry['end']
+                if within and INTRADAY_INTERVALS[cached_interval] % new_minutes == 0:
+                    del entries[cached_interval]
+            entries[interval] = new_entry
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > self.max_symbols:
+                self._entries.popitem(last=False)
+
+    def _is_fresh(self, entry: dict) -> bool:
+        if entry['end'] < datetime.now().date():
+            return True
+        return time.monotonic() - entry['fetched_at'] < self.live_ttl
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Cache dùng chung cho toàn bộ tiến trình (mọi phiên Streamlit trên cùng server)
+intraday_cache = IntradayCache()
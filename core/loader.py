@@ -0,0 +1,156 @@
+# goldenkey_project/core/loader.py
+"""
+Tải đồng thời mọi dữ liệu độc lập của một mã cổ phiếu (giá + chỉ báo, hồ sơ công ty, các
+báo cáo tài chính, so sánh cùng ngành, tin tức) ngay khi mã được gửi. Trang phân tích
+hiển thị từng phần theo thứ tự dữ liệu về, nên biểu đồ xuất hiện sau đúng thời gian tải giá
+thay vì sau tổng thời gian của mọi yêu cầu.
+
+Các tác vụ chạy trên một ThreadPoolExecutor dùng chung cho cả tiến trình (các phiên
+Streamlit dùng chung), vì chúng chủ yếu chờ mạng.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from config import LOADER_MAX_WORKERS
+from core.fundamentals import REPORT_TYPES
+from core.stock import Stock
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_loader_executor() -> ThreadPoolExecutor:
+    """Thread pool dùng chung cho mọi StockDataLoader của tiến trình."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LOADER_MAX_WORKERS, thread_name_prefix='goldenkey-loader')
+        return _executor
+
+
+class StockDataLoader:
+    """
+    Gửi đồng thời các yêu cầu dữ liệu của một `Stock` và trả kết quả theo thứ tự hoàn tất.
+
+    Các khóa kết quả: 'price' (giá đã tính chỉ báo), 'profile', 'report:<loại báo cáo>',
+    'peers' và 'news'. Có thể gửi thêm tác vụ phụ thuộc (ví dụ phân tích AI khi dữ liệu
+    tương ứng đã về) bằng `submit` hoặc `submit_after`; `as_completed` cũng trả về các tác vụ đó.
+    """
+
+    def __init__(self, stock: Stock, years: int = 3, interval: str = '1D', days: int = None,
+                 period: str = 'quarter', report_types: List[str] = None, news_size: int = 10,
+                 executor: ThreadPoolExecutor = None):
+        self.stock = stock
+        self.years = years
+        self.interval = interval
+        self.days = days
+        self.period = period
+        self.report_types = REPORT_TYPES if report_types is None else report_types
+        self.news_size = news_size
+        self.executor = executor or get_loader_executor()
+        self.timings: Dict[str, float] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._started_at = None
+
+    def start(self) -> 'StockDataLoader':
+        """Gửi mọi yêu cầu độc lập cùng lúc; tải giá được gửi trước tiên."""
+        self._started_at = time.perf_counter()
+        self.submit('price', self._load_price)
+        for report_type in self.report_types:
+            self.submit(f"report:{report_type}", self.stock.get_financial_report, report_type,
+                        period=self.period, years=self.years)
+        self.submit('profile', self.stock.get_company_profile)
+        self.submit('news', self.stock.get_related_news, page_size=self.news_size)
+        # Dùng chung kết quả tải báo cáo chỉ số thay vì tải lại song song cùng một báo cáo
+        ratio = self._futures.get('report:ratio')
+        if ratio is not None:
+            self.submit_after(ratio, 'peers', self.stock.get_peer_comparison, period=self.period)
+        else:
+            self.submit('peers', self.stock.get_peer_comparison, period=self.period)
+        return self
+
+    def _wrap(self, key: str, fn, args: tuple, kwargs: dict):
+        def run():
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                print(f"Lỗi khi tải '{key}' cho {self.stock.symbol}: {e}")
+                return pd.DataFrame()
+            finally:
+                self.timings[key] = time.perf_counter() - self._started_at
+        return run
+
+    def submit(self, key: str, fn, *args, **kwargs) -> Future:
+        """Gửi một tác vụ dưới khóa `key`; lỗi được ghi lại và trả về DataFrame rỗng."""
+        with self._lock:
+            future = self.executor.submit(self._wrap(key, fn, args, kwargs))
+            self._futures[key] = future
+        return future
+
+    def submit_after(self, dependency: Future, key: str, fn, *args, **kwargs) -> Future:
+        """
+        Gửi một tác vụ dưới khóa `key` khi `dependency` hoàn tất (kể cả khi bị hủy). Trong lúc
+        chờ, tác vụ không chiếm luồng nào của pool; nó vẫn có thể bị hủy bằng `cancel`.
+        """
+        run = self._wrap(key, fn, args, kwargs)
+        future = Future()
+
+        def execute():
+            if future.set_running_or_notify_cancel():
+                future.set_result(run())
+
+        def schedule(_):
+            if future.cancelled():
+                # Chuyển sang trạng thái đã báo hủy để các lần `wait` đang chờ nhận được nó
+                future.set_running_or_notify_cancel()
+            else:
+                self.executor.submit(execute)
+
+        with self._lock:
+            self._futures[key] = future
+        dependency.add_done_callback(schedule)
+        return future
+
+    def result(self, key: str, timeout: float = None):
+        return self._futures[key].result(timeout)
+
+    def as_completed(self, timeout: float = None) -> Iterator[Tuple[str, object]]:
+        """
+        Trả về từng cặp (khóa, kết quả) ngay khi tác vụ hoàn tất, kể cả các tác vụ được gửi
+        thêm trong lúc đang lặp.
+        """
+        yielded = set()
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            with self._lock:
+                pending = {future: key for key, future in self._futures.items() if key not in yielded}
+            if not pending:
+                return
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"Quá thời gian chờ dữ liệu cho {self.stock.symbol}.")
+            for future in done:
+                key = pending[future]
+                yielded.add(key)
+                if not future.cancelled():
+                    yield key, future.result()
+
+    def cancel(self):
+        """Hủy các tác vụ chưa bắt đầu (ví dụ khi người dùng đã gửi mã khác)."""
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+
+    # --- Các tác vụ ---
+
+    def _load_price(self) -> pd.DataFrame:
+        df = self.stock.fetch_price_history(years=self.years, interval=self.interval, days=self.days)
+        if not df.empty:
+            self.stock.calculate_technical_indicators()
+        return self.stock.price_history
@@ -0,0 +1,292 @@
+# goldenkey_project/core/monitor.py
+"""
+Theo dõi danh mục trong phiên giao dịch: lấy giá khớp mới nhất của các mã đang nắm giữ
+theo lô, cập nhật giá trị, lãi/lỗ, độ lệch tỷ trọng so với phân bổ mục tiêu và các chỉ
+báo tăng dần (EMA/MACD, RSI) — chỉ cho những mã có giá thay đổi.
+
+Nguồn giá có thể thay thế: `VnstockQuoteSource` lấy bảng giá thật, `SimulatedTickSource`
+sinh giá giả lập để kiểm thử và đo tải.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.data_provider import get_data_provider
+
+
+class QuoteSource(ABC):
+    """Nguồn giá cho PortfolioMonitor."""
+
+    @abstractmethod
+    def poll(self, symbols: List[str]) -> Dict[str, float]:
+        """Trả về {mã: giá khớp gần nhất} cho các mã có dữ liệu (có thể chỉ gồm các mã vừa thay đổi)."""
+
+    def snapshot(self, symbols: List[str]) -> Dict[str, float]:
+        """Giá hiện tại của mọi mã được yêu cầu (dùng khi mở vị thế)."""
+        return self.poll(symbols)
+
+
+class VnstockQuoteSource(QuoteSource):
+    """
+    Lấy giá từ bảng giá (price board) theo từng lô `batch_size` mã mỗi yêu cầu.
+
+    Bảng giá trả giá theo đồng trong khi lịch sử giá dùng đơn vị nghìn đồng, nên giá được
+    nhân với `price_scale` để cùng đơn vị với phần còn lại của ứng dụng.
+    """
+
+    _PRICE_COLUMNS = ['match_price', 'close_price', 'price', 'last_price']
+
+    def __init__(self, batch_size: int = 50, price_scale: float = 0.001):
+        self.batch_size = batch_size
+        self.price_scale = price_scale
+
+    def poll(self, symbols: List[str]) -> Dict[str, float]:
+        provider = get_data_provider()
+        quotes = {}
+        for begin in range(0, len(symbols), self.batch_size):
+            batch = symbols[begin:begin + self.batch_size]
+            try:
+                board = provider.price_board(batch)
+            except Exception as e:
+                print(f"Lỗi khi lấy bảng giá cho {', '.join(batch)}: {e}")
+                continue
+            quotes.update(self._parse(board))
+        return quotes
+
+    def _parse(self, board: pd.DataFrame) -> Dict[str, float]:
+        if board is None or board.empty:
+            return {}
+        board = board.copy()
+        if isinstance(board.columns, pd.MultiIndex):
+            board.columns = [col[-1] for col in board.columns]
+        board = board.loc[:, ~pd.Index(board.columns).duplicated()]
+        price_col = next((col for col in self._PRICE_COLUMNS if col in board.columns), None)
+        if 'symbol' not in board.columns or price_col is None:
+            return {}
+        prices = pd.to_numeric(board[price_col], errors='coerce') * self.price_scale
+        return {symbol: float(price) for symbol, price in zip(board['symbol'], prices) if price > 0}
+
+
+class SimulatedTickSource(QuoteSource):
+    """
+    Nguồn giá giả lập: mỗi lần poll, mỗi mã có xác suất `tick_probability` thay đổi giá theo
+    một bước chuyển động Brown hình học; chỉ các mã thay đổi được trả về.
+    """
+
+    def __init__(self, initial_prices: Dict[str, float], volatility: float = 0.3, tick_probability: float = 0.3,
+                 ticks_per_day: int = 20_000, seed: Optional[int] = None):
+        self.prices = dict(initial_prices)
+        self.tick_probability = tick_probability
+        self.step_sigma = volatility / np.sqrt(252 * ticks_per_day)
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def poll(self, symbols: List[str]) -> Dict[str, float]:
+        with self._lock:
+            known = [s for s in symbols if s in self.prices]
+            ticked = self._rng.random(len(known)) < self.tick_probability
+            moved = [s for s, t in zip(known, ticked) if t]
+            shocks = np.exp(self._rng.normal(0.0, self.step_sigma, len(moved)))
+            for symbol, shock in zip(moved, shocks):
+                # Làm tròn về bước giá 10 đồng (0.01 nghìn đồng)
+                self.prices[symbol] = max(0.01, round(self.prices[symbol] * shock, 2))
+            return {s: self.prices[s] for s in moved}
+
+    def snapshot(self, symbols: List[str]) -> Dict[str, float]:
+        with self._lock:
+            return {s: self.prices[s] for s in symbols if s in self.prices}
+
+    def add_symbols(self, prices: Dict[str, float]):
+        """Thêm giá khởi điểm cho các mã mới (các mã đã có giữ nguyên giá hiện tại)."""
+        with self._lock:
+            for symbol, price in prices.items():
+                self.prices.setdefault(symbol, float(price))
+
+
+class PortfolioMonitor:
+    """
+    Theo dõi đồng thời nhiều danh mục trên một tập mã chung.
+
+    Trạng thái được giữ dưới dạng mảng NumPy: số cổ phiếu nắm giữ (danh mục x mã), giá
+    hiện tại và giá trị từng vị thế. Mỗi lần có giá mới, chỉ các cột của mã thay đổi được
+    tính lại, nên chi phí mỗi lần cập nhật tỷ lệ với số mã thay đổi chứ không phải toàn bộ.
+
+    Giá dùng đơn vị của nguồn giá (nghìn đồng, như lịch sử giá); vốn, tiền mặt và giá trị
+    vị thế tính bằng đồng. `price_unit` là số đồng của một đơn vị giá.
+    """
+
+    def __init__(self, source: QuoteSource, price_unit: float = 1000.0):
+        self.source = source
+        self.price_unit = price_unit
+        self.symbols: List[str] = []
+        self._col: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.shares = np.zeros((0, 0))
+        self.targets = np.zeros((0, 0))
+        self.cash = np.zeros(0)
+        self.initial_value = np.zeros(0)
+        self.prices = np.zeros(0)
+        self.position_values = np.zeros((0, 0))
+        self.indicators = IncrementalIndicators(0)
+        self.last_update: Optional[float] = None
+        self.tick_count = 0
+        self._lock = threading.Lock()
+
+    # --- Khởi tạo danh mục ---
+
+    def add_portfolio(self, name: str, stock_weights: Dict[str, float], cash_weight: float = 0.0,
+                      capital: float = 1e9, entry_prices: Dict[str, float] = None):
+        """
+        Thêm một danh mục theo tỷ trọng mục tiêu (phần cổ phiếu, tổng bằng 1) với vốn `capital` (đồng).
+        Số cổ phiếu nắm giữ được tính theo `entry_prices` (đơn vị của nguồn giá); nếu không truyền
+        thì lấy giá hiện tại từ nguồn giá.
+        """
+        weights = {s.upper(): float(w) for s, w in stock_weights.items() if w > 0}
+        new_symbols = [s for s in weights if s not in self._col]
+        entry_prices = dict(entry_prices or {})
+        missing = [s for s in weights if s not in entry_prices and (s not in self._col or not self.prices[self._col[s]] > 0)]
+        if missing:
+            entry_prices.update(self.source.snapshot(missing))
+        unpriced = [s for s in missing if s not in entry_prices]
+        if unpriced:
+            raise ValueError(f"Không lấy được giá cho: {', '.join(unpriced)}")
+
+        with self._lock:
+            if new_symbols:
+                self._add_symbols(new_symbols, entry_prices)
+            prices = np.array([entry_prices.get(s, self.prices[self._col[s]]) for s in weights])
+            row_shares = np.zeros(len(self.symbols))
+            row_targets = np.zeros(len(self.symbols))
+            cols = [self._col[s] for s in weights]
+            w = np.array(list(weights.values()))
+            row_shares[cols] = capital * (1 - cash_weight) * w / (prices * self.price_unit)
+            row_targets[cols] = w * (1 - cash_weight)
+
+            self.names.append(name)
+            self.shares = np.vstack([self.shares, row_shares])
+            self.targets = np.vstack([self.targets, row_targets])
+            self.cash = np.r_[self.cash, capital * cash_weight]
+            self.initial_value = np.r_[self.initial_value, capital]
+            self.position_values = self.shares * self.prices * self.price_unit
+
+    def _add_symbols(self, symbols: List[str], prices: Dict[str, float]):
+        for symbol in symbols:
+            self._col[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        pad = len(symbols)
+        self.shares = np.pad(self.shares, ((0, 0), (0, pad)))
+        self.targets = np.pad(self.targets, ((0, 0), (0, pad)))
+        new_prices = np.array([prices[s] for s in symbols], dtype=float)
+        self.prices = np.r_[self.prices, new_prices]
+        self.indicators.extend(new_prices)
+
+    # --- Cập nhật ---
+
+    def apply_quotes(self, quotes: Dict[str, float]) -> int:
+        """Áp dụng giá mới; chỉ các mã có giá khác giá hiện tại được xử lý. Trả về số mã thay đổi."""
+        with self._lock:
+            cols, new_prices = [], []
+            for symbol, price in quotes.items():
+                col = self._col.get(symbol)
+                if col is not None and price != self.prices[col]:
+                    cols.append(col)
+                    new_prices.append(price)
+            if not cols:
+                return 0
+            cols = np.array(cols)
+            new_prices = np.array(new_prices, dtype=float)
+            self.prices[cols] = new_prices
+            self.position_values[:, cols] = self.shares[:, cols] * (new_prices * self.price_unit)
+            self.indicators.update(cols, new_prices)
+            self.tick_count += len(cols)
+            self.last_update = time.time()
+            return len(cols)
+
+    def poll_once(self) -> int:
+        """Lấy giá mới từ nguồn giá cho toàn bộ các mã đang theo dõi và cập nhật."""
+        if not self.symbols:
+            return 0
+        return self.apply_quotes(self.source.poll(self.symbols))
+
+    # --- Kết quả ---
+
+    def summary(self) -> pd.DataFrame:
+        """Giá trị, lãi/lỗ và độ lệch tỷ trọng lớn nhất của từng danh mục."""
+        with self._lock:
+            stock_values = self.position_values.sum(axis=1)
+            values = stock_values + self.cash
+            weights = self.position_values / values[:, None]
+            drift = np.abs(weights - self.targets).max(axis=1) if self.symbols else np.zeros(len(values))
+            return pd.DataFrame({
+                'value': values,
+                'pnl': values - self.initial_value,
+                'pnl_pct': values / self.initial_value - 1,
+                'max_drift': drift,
+            }, index=pd.Index(self.names, name='portfolio'))
+
+    def positions(self, name: str) -> pd.DataFrame:
+        """Chi tiết từng vị thế của một danh mục: giá, giá trị, tỷ trọng hiện tại/mục tiêu, độ lệch và chỉ báo."""
+        with self._lock:
+            row = self.names.index(name)
+            held = np.flatnonzero(self.shares[row] > 0)
+            value = self.position_values[row].sum() + self.cash[row]
+            weights = self.position_values[row, held] / value
+            df = pd.DataFrame({
+                'price': self.prices[held],
+                'shares': self.shares[row, held],
+                'value': self.position_values[row, held],
+                'weight': weights,
+                'target': self.targets[row, held],
+                'drift': weights - self.targets[row, held],
+            }, index=pd.Index([self.symbols[c] for c in held], name='symbol'))
+            return df.join(self.indicators.frame(held, df.index))
+
+
+class IncrementalIndicators:
+    """
+    Chỉ báo cập nhật tăng dần theo từng lần giá thay đổi, vector hóa trên mọi mã:
+    EMA 12/26, MACD và đường tín hiệu 9, RSI 14 (làm trơn kiểu Wilder). Mỗi lần cập nhật
+    chỉ đụng đến các mã có giá mới, với chi phí O(1) cho mỗi mã.
+    """
+
+    def __init__(self, n: int, fast: int = 12, slow: int = 26, signal: int = 9, rsi_length: int = 14):
+        self.alpha_fast = 2 / (fast + 1)
+        self.alpha_slow = 2 / (slow + 1)
+        self.alpha_signal = 2 / (signal + 1)
+        self.alpha_rsi = 1 / rsi_length
+        self.last = np.zeros(n)
+        self.ema_fast = np.zeros(n)
+        self.ema_slow = np.zeros(n)
+        self.signal = np.zeros(n)
+        self.avg_gain = np.zeros(n)
+        self.avg_loss = np.zeros(n)
+
+    def extend(self, prices: np.ndarray):
+        """Thêm mã mới, khởi tạo các đường trung bình bằng giá hiện tại."""
+        self.last = np.r_[self.last, prices]
+        self.ema_fast = np.r_[self.ema_fast, prices]
+        self.ema_slow = np.r_[self.ema_slow, prices]
+        self.signal = np.r_[self.signal, np.zeros(len(prices))]
+        self.avg_gain = np.r_[self.avg_gain, np.zeros(len(prices))]
+        self.avg_loss = np.r_[self.avg_loss, np.zeros(len(prices))]
+
+    def update(self, cols: np.ndarray, prices: np.ndarray):
+        change = prices - self.last[cols]
+        self.last[cols] = prices
+        self.ema_fast[cols] += self.alpha_fast * (prices - self.ema_fast[cols])
+        self.ema_slow[cols] += self.alpha_slow * (prices - self.ema_slow[cols])
+        macd = self.ema_fast[cols] - self.ema_slow[cols]
+        self.signal[cols] += self.alpha_signal * (macd - self.signal[cols])
+        self.avg_gain[cols] += self.alpha_rsi * (np.maximum(change, 0) - self.avg_gain[cols])
+        self.avg_loss[cols] += self.alpha_rsi * (np.maximum(-change, 0) - self.avg_loss[cols])
+
+    def frame(self, cols: np.ndarray, index: pd.Index) -> pd.DataFrame:
+        macd = self.ema_fast[cols] - self.ema_slow[cols]
+        gain, loss = self.avg_gain[cols], self.avg_loss[cols]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(loss > 0, 100 - 100 / (1 + gain / loss), np.where(gain > 0, 100.0, 50.0))
+        return pd.DataFrame({'MACD': macd, 'MACD_signal': self.signal[cols], 'RSI': rsi}, index=index)
@@ -0,0 +1,293 @@
+# goldenkey_project/core/panel.py
+"""
+Bảng giá toàn thị trường (lịch giao dịch x danh sách mã) lưu trong các file NumPy ánh xạ
+bộ nhớ (memory-mapped). Mọi tiến trình trên cùng máy mở chung các file này mà không sao
+chép (hệ điều hành chia sẻ page cache), `Portfolio` lấy các cột cần thiết mà không cần
+ghép nối dữ liệu bằng pandas, và việc cập nhật hàng ngày chỉ ghi thêm dòng tại chỗ.
+
+Mỗi trường OHLCV là một ma trận (số dòng tối đa x số mã tối đa) lưu theo thứ tự cột
+(Fortran), nên chuỗi giá của một mã nằm liền nhau trên đĩa. Các file được cấp phát sẵn
+theo dung lượng tối đa để việc ghi thêm không làm thay đổi kích thước file đang được các
+tiến trình khác ánh xạ; `meta.json` (ghi sau cùng) cho biết số dòng hợp lệ hiện tại.
+
+Mỗi lần tạo lại bảng được ghi vào một thư mục thế hệ mới (`gen-...`) rồi mới được công bố
+bằng cách thay file `CURRENT` (os.replace), nên tiến trình đang đọc không bao giờ thấy bảng
+dựng dở và các file chúng đang ánh xạ không bị ghi đè.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import DEFAULT_BENCHMARK, PANEL_DIR, PANEL_MAX_STALENESS_DAYS
+from core.data_provider import get_data_provider
+
+# Kiểu dữ liệu của từng trường; giá đóng cửa giữ float64 vì được dùng để tính lợi suất
+PANEL_FIELDS = {'open': np.float32, 'high': np.float32, 'low': np.float32, 'close': np.float64, 'volume': np.float64}
+_CURRENT_FILE = 'CURRENT'
+_GENERATION_PREFIX = 'gen-'
+
+
+def _resolve_data_dir(base_dir: str) -> str:
+    """Thư mục thế hệ đang được công bố; bảng tạo theo cách cũ (file nằm ngay trong base_dir) vẫn đọc được."""
+    try:
+        with open(os.path.join(base_dir, _CURRENT_FILE), 'r', encoding='utf-8') as f:
+            return os.path.join(base_dir, f.read().strip())
+    except FileNotFoundError:
+        return base_dir
+
+
+def _publish_generation(base_dir: str, data_dir: str):
+    """Trỏ CURRENT sang thế hệ mới rồi xóa các thế hệ cũ (tiến trình đang ánh xạ vẫn đọc được file đã xóa)."""
+    name = os.path.basename(data_dir)
+    pointer = os.path.join(base_dir, _CURRENT_FILE)
+    with open(pointer + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(name)
+    os.replace(pointer + '.tmp', pointer)
+    for entry in os.listdir(base_dir):
+        if entry.startswith(_GENERATION_PREFIX) and entry != name:
+            shutil.rmtree(os.path.join(base_dir, entry), ignore_errors=True)
+
+
+class PricePanel:
+    """Bảng giá dùng chung dạng memory-mapped. Mở ở chế độ 'r' để đọc, 'r+' để cập nhật."""
+
+    def __init__(self, base_dir: str = PANEL_DIR, mode: str = 'r'):
+        self.base_dir = base_dir
+        self.mode = mode
+        self._load()
+
+    # --- Tạo và mở ---
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.data_dir, name)
+
+    def _load(self):
+        self.data_dir = _resolve_data_dir(self.base_dir)
+        with open(self._path('meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self._meta_mtime = os.stat(self._path('meta.json')).st_mtime_ns
+        self.symbols: List[str] = meta['symbols']
+        self.length: int = meta['length']
+        self.row_capacity: int = meta['row_capacity']
+        self.col_capacity: int = meta['col_capacity']
+        self._columns: Dict[str, int] = {s: i for i, s in enumerate(self.symbols)}
+        self._calendar = np.load(self._path('calendar.npy'), mmap_mode=self.mode)
+        self._fields = {field: np.load(self._path(f"{field}.npy"), mmap_mode=self.mode) for field in PANEL_FIELDS}
+
+    def reload_if_changed(self):
+        """Mở lại bảng nếu tiến trình khác vừa cập nhật (thêm ngày, thêm mã) hoặc tạo lại bảng."""
+        if (_resolve_data_dir(self.base_dir) != self.data_dir
+                or os.stat(self._path('meta.json')).st_mtime_ns != self._meta_mtime):
+            self._load()
+
+    def _write_meta(self):
+        meta = {'symbols': self.symbols, 'length': self.length, 'row_capacity': self.row_capacity,
+                'col_capacity': self.col_capacity, 'updated_at': datetime.now().isoformat()}
+        with open(self._path('meta.json.tmp'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(self._path('meta.json.tmp'), self._path('meta.json'))
+        self._meta_mtime = os.stat(self._path('meta.json')).st_mtime_ns
+
+    @classmethod
+    def create(cls, symbols: List[str], calendar: pd.DatetimeIndex, base_dir: str = PANEL_DIR,
+               spare_days: int = 252 * 2, spare_symbols: int = None) -> 'PricePanel':
+        """
+        Tạo bảng rỗng (toàn NaN) cho lịch giao dịch và danh sách mã cho trước, có dự phòng
+        `spare_days` phiên để ghi thêm và `spare_symbols` cột cho các mã niêm yết mới.
+        Các file được ghi thẳng vào `base_dir`; để thay bảng đang được dùng, hãy dùng
+        `build_price_panel` (dựng trong thư mục thế hệ mới rồi mới công bố).
+        """
+        os.makedirs(base_dir, exist_ok=True)
+        row_capacity = len(calendar) + spare_days
+        col_capacity = len(symbols) + (spare_symbols if spare_symbols is not None else max(16, len(symbols) // 4))
+
+        dates = np.lib.format.open_memmap(os.path.join(base_dir, 'calendar.npy'), mode='w+',
+                                          dtype='datetime64[D]', shape=(row_capacity,))
+        dates[:len(calendar)] = calendar.values.astype('datetime64[D]')
+        dates.flush()
+        for field, dtype in PANEL_FIELDS.items():
+            matrix = np.lib.format.open_memmap(os.path.join(base_dir, f"{field}.npy"), mode='w+', dtype=dtype,
+                                               shape=(row_capacity, col_capacity), fortran_order=True)
+            matrix[:] = np.nan
+            matrix.flush()
+            del matrix
+
+        with open(os.path.join(base_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'symbols': list(symbols), 'length': len(calendar), 'row_capacity': row_capacity,
+                       'col_capacity': col_capacity, 'updated_at': datetime.now().isoformat()}, f)
+        return cls(base_dir, mode='r+')
+
+    # --- Đọc ---
+
+    @property
+    def calendar(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self._calendar[:self.length])
+
+    @property
+    def last_date(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(self._calendar[self.length - 1]) if self.length else None
+
+    def contains(self, symbols: List[str]) -> bool:
+        return all(s in self._columns for s in symbols)
+
+    def values(self, symbols: List[str], field: str = 'close', start=None, end=None) -> tuple:
+        """
+        Khối dữ liệu (số phiên x số mã) của các mã trong khoảng [start, end] cùng với lịch
+        tương ứng. Chỉ các cột được yêu cầu được đọc khỏi file ánh xạ.
+        """
+        calendar = self._calendar[:self.length]
+        lo = 0 if start is None else int(np.searchsorted(calendar, np.datetime64(pd.Timestamp(start).date()), 'left'))
+        hi = self.length if end is None else int(np.searchsorted(calendar, np.datetime64(pd.Timestamp(end).date()), 'right'))
+        columns = [self._columns[s] for s in symbols]
+        return self._fields[field][lo:hi, columns], calendar[lo:hi]
+
+    def frame(self, symbols: List[str], field: str = 'close', start=None, end=None, dropna: bool = False) -> pd.DataFrame:
+        """Như `values` nhưng trả về DataFrame; `dropna` bỏ các phiên thiếu dữ liệu của bất kỳ mã nào."""
+        block, dates = self.values(symbols, field, start, end)
+        if dropna:
+            complete = ~np.isnan(block).any(axis=1)
+            block, dates = block[complete], dates[complete]
+        return pd.DataFrame(block, index=pd.DatetimeIndex(dates, name='time'), columns=list(symbols))
+
+    # --- Ghi ---
+
+    def write_history(self, symbol: str, df: pd.DataFrame):
+        """Ghi dữ liệu OHLCV của một mã vào các phiên trùng với lịch giao dịch của bảng."""
+        if df is None or df.empty:
+            return
+        if symbol not in self._columns:
+            if len(self.symbols) >= self.col_capacity:
+                raise ValueError("Bảng giá đã hết cột dự phòng cho mã mới, cần tạo lại bảng.")
+            self._columns[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        column = self._columns[symbol]
+        calendar = self._calendar[:self.length]
+        days = pd.to_datetime(df['time']).values.astype('datetime64[D]')
+        positions = np.searchsorted(calendar, days)
+        matched = (positions < self.length) & (calendar[np.minimum(positions, self.length - 1)] == days)
+        for field in PANEL_FIELDS:
+            if field in df.columns:
+                self._fields[field][positions[matched], column] = df[field].values[matched]
+
+    def extend_calendar(self, dates: pd.DatetimeIndex) -> int:
+        """Thêm các phiên mới (sau phiên cuối cùng) vào lịch; trả về số phiên được thêm."""
+        new_days = dates.values.astype('datetime64[D]')
+        if self.length:
+            new_days = new_days[new_days > self._calendar[self.length - 1]]
+        new_days = np.unique(new_days)
+        if self.length + len(new_days) > self.row_capacity:
+            raise ValueError("Bảng giá đã hết dòng dự phòng, cần tạo lại bảng.")
+        self._calendar[self.length:self.length + len(new_days)] = new_days
+        self.length += len(new_days)
+        return len(new_days)
+
+    def flush(self):
+        """Đẩy dữ liệu xuống đĩa rồi mới ghi meta.json, để tiến trình đọc không thấy dòng chưa ghi xong."""
+        self._calendar.flush()
+        for matrix in self._fields.values():
+            matrix.flush()
+        self._write_meta()
+
+
+def _fetch_range(symbol: str, start: datetime, end: datetime) -> pd.DataFrame:
+    df = get_data_provider().price_history(symbol, start=start.strftime('%Y-%m-%d'), end=end.strftime('%Y-%m-%d'))
+    if df is None or df.empty:
+        return pd.DataFrame()
+    df = df.dropna(subset=['close'])
+    df['time'] = pd.to_datetime(df['time'])
+    return df
+
+
+def _fill_panel(panel: PricePanel, symbols: List[str], start: datetime, end: datetime, max_workers: int) -> List[str]:
+    """Tải song song và ghi từng mã ngay khi tải xong; trả về danh sách mã bị lỗi."""
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_fetch_range, symbol, start, end): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                panel.write_history(symbol, future.result())
+            except Exception as e:
+                print(f"Không thể tải dữ liệu cho {symbol}: {e}")
+                failed.append(symbol)
+    return failed
+
+
+def build_price_panel(symbols: List[str], years: int = 10, base_dir: str = PANEL_DIR,
+                      benchmark: str = DEFAULT_BENCHMARK, max_workers: int = 8) -> PricePanel:
+    """
+    Tạo mới bảng giá: lịch giao dịch lấy theo các phiên của chỉ số benchmark. Bảng được dựng
+    trong một thư mục thế hệ mới và chỉ được công bố khi đã ghi xong; mã không tải được dữ
+    liệu không được đăng ký vào bảng (để `contains` trả về False và người đọc tải trực tiếp).
+    """
+    end = datetime.now()
+    start = end - timedelta(days=int(years * 365.25))
+    benchmark_df = _fetch_range(benchmark, start, end)
+    if benchmark_df.empty:
+        raise RuntimeError(f"Không tải được dữ liệu {benchmark} để dựng lịch giao dịch.")
+    others = [s for s in dict.fromkeys(s.upper().strip() for s in symbols) if s != benchmark]
+
+    os.makedirs(base_dir, exist_ok=True)
+    data_dir = tempfile.mkdtemp(prefix=f"{_GENERATION_PREFIX}{datetime.now():%Y%m%d%H%M%S}-", dir=base_dir)
+    try:
+        # Chỉ đăng ký benchmark; các mã khác được thêm khi ghi dữ liệu thành công (write_history)
+        panel = PricePanel.create([benchmark], pd.DatetimeIndex(benchmark_df['time']).normalize().unique(), data_dir,
+                                  spare_symbols=len(others) + max(16, len(others) // 4))
+        panel.write_history(benchmark, benchmark_df)
+        _fill_panel(panel, others, start, end, max_workers)
+        panel.flush()
+        del panel
+    except BaseException:
+        shutil.rmtree(data_dir, ignore_errors=True)
+        raise
+    _publish_generation(base_dir, data_dir)
+    return PricePanel(base_dir, mode='r+')
+
+
+def update_price_panel(panel: PricePanel, benchmark: str = DEFAULT_BENCHMARK, max_workers: int = 8) -> int:
+    """Ghi thêm các phiên mới kể từ phiên cuối của bảng cho mọi mã; trả về số phiên được thêm."""
+    start = panel.last_date.to_pydatetime() + timedelta(days=1)
+    end = datetime.now()
+    if start.date() > end.date():
+        return 0
+    benchmark_df = _fetch_range(benchmark, start, end)
+    if benchmark_df.empty:
+        return 0
+    added = panel.extend_calendar(pd.DatetimeIndex(benchmark_df['time']).normalize())
+    if added:
+        panel.write_history(benchmark, benchmark_df)
+        _fill_panel(panel, [s for s in panel.symbols if s != benchmark], start, end, max_workers)
+        panel.flush()
+    return added
+
+
+_panel: Optional[PricePanel] = None
+_panel_lock = threading.Lock()
+
+
+def get_price_panel() -> Optional[PricePanel]:
+    """
+    Bảng giá dùng chung (chế độ chỉ đọc) của tiến trình, hoặc None nếu chưa được tạo
+    hoặc đã quá cũ (phiên cuối cách hôm nay hơn PANEL_MAX_STALENESS_DAYS ngày).
+    """
+    global _panel
+    with _panel_lock:
+        try:
+            if _panel is None:
+                _panel = PricePanel(PANEL_DIR, mode='r')
+            else:
+                _panel.reload_if_changed()
+        except (OSError, ValueError, KeyError):
+            _panel = None
+            return None
+    if _panel.last_date is None or (datetime.now() - _panel.last_date).days > PANEL_MAX_STALENESS_DAYS:
+        return None
+    return _panel
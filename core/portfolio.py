@@ -1,34 +1,50 @@
 # goldenkey_project/core/portfolio.py
 import pandas as pd
 import numpy as np
-import vnstock
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
 from datetime import datetime, timedelta
-from config import VN_STOCK_SOURCE
+from core.covariance import CovarianceModel, DenseCovariance, estimate_covariance
+from core.data_provider import DataProvider, get_data_provider
+from core.panel import get_price_panel
+from core.risk import drawdown_metrics
 
 class Portfolio:
     """
     Quản lý một danh mục cổ phiếu, thực hiện các tính toán và tối ưu hóa.
     """
-    def __init__(self, symbols: list, benchmark: str = "VNINDEX"):
+    def __init__(self, symbols: list, benchmark: str = "VNINDEX", provider: DataProvider = None):
         self.symbols = [s.upper().strip() for s in symbols]
         self.benchmark = benchmark.upper().strip()
-        self.client = vnstock.Vnstock()
+        self.provider = provider or get_data_provider()
         self.adj_close = pd.DataFrame()
         self.returns = pd.DataFrame()
-        self.cov_matrix = pd.DataFrame()
+        self.cov_model: CovarianceModel = None
 
     def fetch_data(self, years: int = 3) -> bool:
-        """Tải dữ liệu giá lịch sử cho tất cả cổ phiếu trong danh mục và benchmark."""
+        """
+        Tải dữ liệu giá lịch sử cho tất cả cổ phiếu trong danh mục và benchmark. Nếu bảng giá
+        dùng chung (core.panel) có đủ các mã thì chỉ lấy các cột tương ứng, không cần tải.
+        """
         end_date = datetime.now()
         start_date = end_date - timedelta(days=int(years * 365.25))
         
         all_symbols = self.symbols + [self.benchmark]
+        panel = get_price_panel()
+        if panel is not None and panel.contains(all_symbols) and panel.calendar[0] <= start_date:
+            # Mã có cột toàn NaN trong bảng (ví dụ tải lỗi lúc dựng bảng) làm khung rỗng sau dropna:
+            # khi đó tải trực tiếp như bình thường
+            frame = panel.frame(all_symbols, 'close', start=start_date, dropna=True)
+            if not frame.empty:
+                self.adj_close = frame
+                return True
+
         data = {}
         
         for symbol in all_symbols:
             try:
-                stock_data = self.client.stock(symbol=symbol, source=VN_STOCK_SOURCE)
-                df = stock_data.quote.history(
+                df = self.provider.price_history(
+                    symbol,
                     start=start_date.strftime('%Y-%m-%d'),
                     end=end_date.strftime('%Y-%m-%d')
                 )
@@ -40,13 +56,66 @@ class Portfolio:
                 return False
         
         self.adj_close = pd.DataFrame(data).dropna()
-        return True
+        return not self.adj_close.empty
+
+    def calculate_stats(self, cov_method: str = 'sample', n_factors: int = None):
+        """
+        Tính toán lợi suất hàng ngày và mô hình hiệp phương sai (năm hóa) của các cổ phiếu.
 
-    def calculate_stats(self):
-        """Tính toán lợi suất hàng ngày và ma trận hiệp phương sai."""
+        Args:
+            cov_method (str): 'sample', 'ledoit_wolf' hoặc 'factor' (xem core.covariance).
+            n_factors (int): Số nhân tố khi dùng 'factor'; mặc định tự chọn theo số mã.
+        """
         self.returns = self.adj_close.pct_change().dropna()
         asset_returns = self.returns[self.symbols]
-        self.cov_matrix = asset_returns.cov() * 252 # Annualized
+        self.cov_model = estimate_covariance(asset_returns, cov_method, n_factors)
+
+    @property
+    def cov_matrix(self) -> pd.DataFrame:
+        """Ma trận hiệp phương sai đầy đủ, chỉ dựng khi cần (mô hình nhân tố không lưu sẵn)."""
+        if self.cov_model is None:
+            return pd.DataFrame()
+        return self.cov_model.to_frame()
+
+    @cov_matrix.setter
+    def cov_matrix(self, matrix: pd.DataFrame):
+        self.cov_model = None if matrix is None or matrix.empty else DenseCovariance(matrix.values, matrix.columns)
+
+    def sample_weights(self, n: int, min_weight: float = 0.0, max_weight: float = 1.0, attempt_limit: int = None) -> np.ndarray:
+        """
+        Sinh ngẫu nhiên các vector tỷ trọng (tổng bằng 1) thỏa mãn ràng buộc min/max,
+        theo từng lô được vector hóa thay vì thử từng danh mục một.
+
+        Args:
+            n (int): Số vector tỷ trọng hợp lệ cần tìm.
+            min_weight (float): Tỷ trọng tối thiểu cho mỗi cổ phiếu.
+            max_weight (float): Tỷ trọng tối đa cho mỗi cổ phiếu.
+            attempt_limit (int): Số lần thử tối đa; mặc định là n * 200.
+
+        Returns:
+            np.ndarray: Mảng (số_danh_mục_tìm_được x số_cổ_phiếu), có thể ít hơn n nếu ràng buộc quá chặt.
+        """
+        num_assets = len(self.symbols)
+        attempt_limit = attempt_limit if attempt_limit is not None else n * 200
+        # Giới hạn kích thước mỗi lô để bộ nhớ không phụ thuộc vào số lần thử
+        max_batch = max(1, 2_000_000 // num_assets)
+
+        accepted = []
+        found = 0
+        attempts = 0
+        while found < n and attempts < attempt_limit:
+            batch = min(max_batch, attempt_limit - attempts, max(1000, (n - found) * 4))
+            attempts += batch
+            weights = np.random.random((batch, num_assets))
+            weights /= weights.sum(axis=1, keepdims=True)
+            valid = weights[np.all((weights >= min_weight) & (weights <= max_weight), axis=1)]
+            if len(valid):
+                accepted.append(valid[:n - found])
+                found += len(accepted[-1])
+
+        if not accepted:
+            return np.empty((0, num_assets))
+        return np.vstack(accepted)
 
     def run_monte_carlo(self, iterations: int = 10000, risk_free_rate: float = 0.04, min_weight: float = 0.10, max_weight: float = 0.60) -> pd.DataFrame:
         """
@@ -61,38 +130,94 @@ class Portfolio:
         Returns:
             pd.DataFrame: DataFrame chứa kết quả các danh mục hợp lệ.
         """
-        results = []
-        num_assets = len(self.symbols)
-        mean_returns = self.returns[self.symbols].mean() * 252 # Annualized
-        
+        mean_returns = self.returns[self.symbols].mean().values * 252 # Annualized
+
         # Giới hạn số lần thử để tránh vòng lặp vô tận nếu ràng buộc quá chặt
         # Ví dụ: nếu cần 10,000 danh mục, thử tối đa 2,000,000 lần
-        attempt_limit = iterations * 200 
-        attempts = 0
+        attempt_limit = iterations * 200
+        weights = self.sample_weights(iterations, min_weight, max_weight, attempt_limit)
 
-        # Lặp cho đến khi tìm đủ số danh mục hợp lệ hoặc hết số lần thử
-        while len(results) < iterations and attempts < attempt_limit:
-            attempts += 1
-            
-            # Tạo tỷ trọng ngẫu nhiên
-            weights = np.random.random(num_assets)
-            weights /= np.sum(weights)
-            
-            # Kiểm tra xem tất cả các tỷ trọng có nằm trong khoảng cho phép không
-            if np.all((weights >= min_weight) & (weights <= max_weight)):
-                # Nếu hợp lệ, tính toán và lưu kết quả
-                p_return = np.sum(mean_returns * weights)
-                p_volatility = np.sqrt(np.dot(weights.T, np.dot(self.cov_matrix, weights)))
-                sharpe_ratio = (p_return - risk_free_rate) / p_volatility
-                
-                results.append([p_return, p_volatility, sharpe_ratio] + list(weights))
-        
         # In cảnh báo nếu không tìm đủ danh mục
-        if len(results) < iterations:
-            print(f"Cảnh báo: Đã đạt đến giới hạn {attempt_limit} lần thử nhưng chỉ tìm thấy {len(results)}/{iterations} danh mục hợp lệ. Ràng buộc có thể quá chặt.")
+        if len(weights) < iterations:
+            print(f"Cảnh báo: Đã đạt đến giới hạn {attempt_limit} lần thử nhưng chỉ tìm thấy {len(weights)}/{iterations} danh mục hợp lệ. Ràng buộc có thể quá chặt.")
+
+        # Tính lợi nhuận, rủi ro và Sharpe cho tất cả danh mục cùng lúc
+        p_returns = weights @ mean_returns
+        p_volatility = np.sqrt(self.cov_model.quad_form(weights))
+        sharpe_ratio = (p_returns - risk_free_rate) / p_volatility
 
         columns = ['return', 'volatility', 'sharpe'] + self.symbols
-        return pd.DataFrame(results, columns=columns)
+        data = np.column_stack([p_returns, p_volatility, sharpe_ratio, weights])
+        return pd.DataFrame(data, columns=columns)
+
+    def run_hrp(self, risk_free_rate: float = 0.04, min_weight: float = 0.0, max_weight: float = 1.0, linkage_method: str = 'single') -> pd.Series:
+        """
+        Phân bổ theo Hierarchical Risk Parity (HRP): phân cụm các cổ phiếu theo khoảng cách
+        tương quan, sắp xếp lại theo thứ tự của cây phân cụm rồi chia tỷ trọng bằng cách
+        chia đôi đệ quy theo nghịch đảo phương sai của từng cụm.
+
+        Tại mỗi lần chia đôi, phần tỷ trọng của cụm trái được giới hạn sao cho cả hai cụm
+        con vẫn có thể thỏa mãn ràng buộc min/max, nên kết quả cuối luôn nằm trong ràng buộc.
+
+        Args:
+            risk_free_rate (float): Lãi suất phi rủi ro (dùng để tính Sharpe).
+            min_weight (float): Tỷ trọng tối thiểu cho mỗi cổ phiếu.
+            max_weight (float): Tỷ trọng tối đa cho mỗi cổ phiếu.
+            linkage_method (str): Phương pháp liên kết của scipy ('single', 'average', 'ward', ...).
+
+        Returns:
+            pd.Series: Cùng định dạng một dòng kết quả Monte Carlo (return, volatility, sharpe và tỷ trọng).
+        """
+        num_assets = len(self.symbols)
+        if num_assets * min_weight > 1 + 1e-9 or num_assets * max_weight < 1 - 1e-9:
+            raise ValueError("Ràng buộc tỷ trọng không khả thi với số lượng cổ phiếu đã chọn.")
+
+        if num_assets == 1:
+            weights = np.ones(1)
+        else:
+            corr = np.corrcoef(self.returns[self.symbols].values, rowvar=False)
+            distance = np.sqrt(np.clip(0.5 * (1 - corr), 0.0, None))
+            np.fill_diagonal(distance, 0.0)
+            link = linkage(squareform(distance, checks=False), method=linkage_method)
+            order = leaves_list(link)
+            weights = self._hrp_recursive_bisection(self.cov_model, order, min_weight, max_weight)
+
+        mean_returns = self.returns[self.symbols].mean().values * 252 # Annualized
+        p_return = weights @ mean_returns
+        p_volatility = np.sqrt(self.cov_model.quad_form(weights)[0])
+        sharpe_ratio = (p_return - risk_free_rate) / p_volatility
+
+        return pd.Series([p_return, p_volatility, sharpe_ratio] + list(weights),
+                         index=['return', 'volatility', 'sharpe'] + self.symbols, name='HRP')
+
+    @staticmethod
+    def _hrp_recursive_bisection(cov: CovarianceModel, order: np.ndarray, min_weight: float, max_weight: float) -> np.ndarray:
+        """Chia tỷ trọng theo cây phân cụm (đã sắp xếp theo `order`) với ràng buộc min/max."""
+        variances = cov.variances()
+
+        def cluster_variance(items: np.ndarray) -> float:
+            inv_var = 1 / variances[items]
+            inv_var /= inv_var.sum()
+            return cov.subset_quad_form(items, inv_var)
+
+        weights = np.zeros(len(order))
+        stack = [(np.asarray(order), 1.0)]
+        while stack:
+            items, total = stack.pop()
+            if len(items) == 1:
+                weights[items[0]] = total
+                continue
+            half = len(items) // 2
+            left, right = items[:half], items[half:]
+            var_left, var_right = cluster_variance(left), cluster_variance(right)
+            alpha = 1 - var_left / (var_left + var_right)
+            # Khoảng tỷ trọng của cụm trái để cả hai cụm con vẫn khả thi
+            lower = max(len(left) * min_weight, total - len(right) * max_weight)
+            upper = min(len(left) * max_weight, total - len(right) * min_weight)
+            left_total = float(np.clip(alpha * total, lower, upper))
+            stack.append((left, left_total))
+            stack.append((right, total - left_total))
+        return weights
 
     def get_optimal_portfolios_from_mc(self, mc_results: pd.DataFrame) -> (pd.Series, pd.Series):
         """
@@ -110,23 +235,55 @@ class Portfolio:
         """
         Tính toán hiệu suất tích lũy của danh mục và so sánh với benchmark.
         """
+        curves, benchmark_curve, _ = self.calculate_cumulative_performance_batch(
+            np.atleast_2d(stock_weights), cash_weight, risk_free_rate
+        )
+        if curves.empty:
+            return pd.DataFrame()
+
+        performance_df = pd.DataFrame({
+            'Danh mục': curves.iloc[:, 0],
+            f'{self.benchmark}': benchmark_curve
+        })
+        
+        return performance_df
+
+    def calculate_cumulative_performance_batch(self, weights_matrix: np.ndarray, cash_weight: float, risk_free_rate: float) -> (pd.DataFrame, pd.Series, pd.DataFrame):
+        """
+        Tính hiệu suất tích lũy 1 năm gần nhất cho nhiều danh mục cùng lúc bằng một phép nhân ma trận.
+
+        Args:
+            weights_matrix (np.ndarray): Ma trận tỷ trọng cổ phiếu (số danh mục x số cổ phiếu).
+            cash_weight (float): Tỷ trọng tiền mặt của toàn danh mục.
+            risk_free_rate (float): Lãi suất phi rủi ro năm.
+
+        Returns:
+            tuple: (DataFrame đường tích lũy ngày x danh mục, Series đường tích lũy của benchmark,
+                    DataFrame thống kê tóm tắt cho từng danh mục).
+        """
         one_year_ago = self.returns.index.max() - pd.DateOffset(years=1)
         recent_returns = self.returns[self.returns.index >= one_year_ago]
 
         if recent_returns.empty:
-            return pd.DataFrame()
+            return pd.DataFrame(), pd.Series(dtype=float), pd.DataFrame()
+
+        asset_returns = recent_returns[self.symbols].values
+        benchmark_returns = recent_returns[self.benchmark].values
 
-        asset_returns = recent_returns[self.symbols]
-        benchmark_returns = recent_returns[self.benchmark]
-        
-        portfolio_stock_returns = asset_returns.dot(stock_weights)
         daily_risk_free_rate = (1 + risk_free_rate)**(1/252) - 1
         stock_portion_weight = 1 - cash_weight
-        portfolio_total_returns = (portfolio_stock_returns * stock_portion_weight) + (daily_risk_free_rate * cash_weight)
+        portfolio_returns = (asset_returns @ np.asarray(weights_matrix).T) * stock_portion_weight + daily_risk_free_rate * cash_weight
 
-        performance_df = pd.DataFrame({
-            'Danh mục': (1 + portfolio_total_returns).cumprod(),
-            f'{self.benchmark}': (1 + benchmark_returns).cumprod()
+        curves = np.cumprod(1 + portfolio_returns, axis=0)
+        benchmark_curve = np.cumprod(1 + benchmark_returns)
+        max_drawdown, _ = drawdown_metrics(portfolio_returns)
+
+        summary = pd.DataFrame({
+            'total_return': curves[-1] - 1,
+            'volatility': portfolio_returns.std(axis=0, ddof=1) * np.sqrt(252),
+            'max_drawdown': max_drawdown,
+            'excess_vs_benchmark': curves[-1] - benchmark_curve[-1],
         })
-        
-        return performance_df
\ No newline at end of file
+        return (pd.DataFrame(curves, index=recent_returns.index),
+                pd.Series(benchmark_curve, index=recent_returns.index, name=self.benchmark),
+                summary)
@@ -0,0 +1,179 @@
+# goldenkey_project/core/risk.py
+import pandas as pd
+import numpy as np
+from scipy.stats import norm
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from core.portfolio import Portfolio
+
+
+class RiskEngine:
+    """
+    Tính các chỉ số rủi ro cho nhiều vector tỷ trọng cùng lúc dựa trên `Portfolio.returns`:
+    VaR/CVaR (lịch sử, tham số, block-bootstrap), sụt giảm tối đa, thời gian sụt giảm,
+    Sortino và beta so với benchmark.
+
+    Mọi phép tính được thực hiện bằng phép toán ma trận trên từng nhóm danh mục, với kích
+    thước nhóm được chọn sao cho số phần tử trung gian không vượt quá `max_chunk_elements`.
+    """
+
+    def __init__(self, portfolio: 'Portfolio', confidence: float = 0.95, horizon_days: int = 1,
+                 n_bootstrap: int = 10000, block_size: int = 5, max_chunk_elements: int = 20_000_000,
+                 seed: int = None):
+        """
+        Args:
+            portfolio (Portfolio): Danh mục đã gọi calculate_stats().
+            confidence (float): Mức tin cậy của VaR/CVaR (ví dụ 0.95).
+            horizon_days (int): Kỳ hạn (số phiên) của VaR/CVaR.
+            n_bootstrap (int): Số mẫu block-bootstrap.
+            block_size (int): Độ dài mỗi khối phiên liên tiếp khi bootstrap (giữ tự tương quan ngắn hạn).
+            max_chunk_elements (int): Giới hạn số phần tử của mảng trung gian cho mỗi nhóm danh mục.
+            seed (int): Seed cho bộ sinh số ngẫu nhiên.
+        """
+        self.portfolio = portfolio
+        self.confidence = confidence
+        self.horizon_days = horizon_days
+        self.n_bootstrap = n_bootstrap
+        self.block_size = block_size
+        self.max_chunk_elements = max_chunk_elements
+        self.seed = seed
+
+    def portfolio_returns(self, weights: np.ndarray, cash_weight: float = 0.0, risk_free_rate: float = 0.04) -> np.ndarray:
+        """Lợi suất hàng ngày (số phiên x số danh mục) của toàn danh mục, đã tính phần tiền mặt."""
+        weights = np.atleast_2d(weights)
+        asset_returns = self.portfolio.returns[self.portfolio.symbols].values
+        daily_rf = (1 + risk_free_rate) ** (1 / 252) - 1
+        return (asset_returns @ weights.T) * (1 - cash_weight) + daily_rf * cash_weight
+
+    def compute(self, weights: np.ndarray, cash_weight: float = 0.0, risk_free_rate: float = 0.04) -> pd.DataFrame:
+        """
+        Tính toàn bộ chỉ số rủi ro cho các vector tỷ trọng cổ phiếu.
+
+        Args:
+            weights (np.ndarray): Mảng (số danh mục x số cổ phiếu) hoặc một vector tỷ trọng.
+            cash_weight (float): Tỷ trọng tiền mặt của toàn danh mục.
+            risk_free_rate (float): Lãi suất phi rủi ro năm.
+
+        Returns:
+            pd.DataFrame: Mỗi dòng là một danh mục. VaR/CVaR và sụt giảm được biểu diễn
+            dưới dạng tỷ lệ lỗ dương.
+        """
+        weights = np.atleast_2d(np.asarray(weights, dtype=float))
+        num_portfolios = len(weights)
+        num_days = len(self.portfolio.returns)
+        rng = np.random.default_rng(self.seed)
+        bootstrap_plan = self._bootstrap_plan(num_days, rng)
+        benchmark_returns = self.portfolio.returns[self.portfolio.benchmark].values
+
+        # Số danh mục mỗi nhóm: giới hạn bởi mảng lớn nhất (các mẫu bootstrap hoặc chuỗi lợi suất)
+        per_portfolio = max(num_days, self.n_bootstrap * (len(bootstrap_plan['starts'][0]) + 1))
+        chunk = max(1, self.max_chunk_elements // per_portfolio)
+
+        frames = []
+        for begin in range(0, num_portfolios, chunk):
+            returns = self.portfolio_returns(weights[begin:begin + chunk], cash_weight, risk_free_rate)
+            frames.append(self._compute_chunk(returns, weights[begin:begin + chunk], cash_weight,
+                                              risk_free_rate, benchmark_returns, bootstrap_plan))
+        return pd.concat(frames, ignore_index=True)
+
+    # --- Các bước tính toán cho một nhóm danh mục ---
+
+    def _compute_chunk(self, returns: np.ndarray, weights: np.ndarray, cash_weight: float, risk_free_rate: float,
+                       benchmark_returns: np.ndarray, bootstrap_plan: dict) -> pd.DataFrame:
+        var_hist, cvar_hist = self._historical_var(returns)
+        var_param, cvar_param = self._parametric_var(returns, weights, cash_weight)
+        var_boot, cvar_boot = self._bootstrap_var(returns, bootstrap_plan)
+        max_dd, max_dd_days = drawdown_metrics(returns)
+
+        daily_rf = (1 + risk_free_rate) ** (1 / 252) - 1
+        excess = returns - daily_rf
+        downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2, axis=0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sortino = np.where(downside > 0, excess.mean(axis=0) * 252 / (downside * np.sqrt(252)), np.nan)
+
+        bench_centered = benchmark_returns - benchmark_returns.mean()
+        beta = (returns - returns.mean(axis=0)).T @ bench_centered / (bench_centered @ bench_centered)
+
+        return pd.DataFrame({
+            'var_historical': var_hist, 'cvar_historical': cvar_hist,
+            'var_parametric': var_param, 'cvar_parametric': cvar_param,
+            'var_bootstrap': var_boot, 'cvar_bootstrap': cvar_boot,
+            'max_drawdown': max_dd, 'max_drawdown_days': max_dd_days,
+            'sortino': sortino, 'beta': beta,
+        })
+
+    def _horizon_returns(self, returns: np.ndarray) -> np.ndarray:
+        """Lợi suất kép của các cửa sổ `horizon_days` phiên chồng lấn."""
+        if self.horizon_days == 1:
+            return returns
+        log_cum = np.vstack([np.zeros(returns.shape[1]), np.cumsum(np.log1p(returns), axis=0)])
+        return np.expm1(log_cum[self.horizon_days:] - log_cum[:-self.horizon_days])
+
+    def _tail(self, samples: np.ndarray) -> tuple:
+        """VaR và CVaR (dạng lỗ dương) theo cột từ các mẫu lợi suất."""
+        k = max(0, int(np.floor((1 - self.confidence) * len(samples))) - 1)
+        partitioned = np.partition(samples, k, axis=0)
+        return -partitioned[k], -partitioned[:k + 1].mean(axis=0)
+
+    def _historical_var(self, returns: np.ndarray) -> tuple:
+        return self._tail(self._horizon_returns(returns))
+
+    def _parametric_var(self, returns: np.ndarray, weights: np.ndarray, cash_weight: float) -> tuple:
+        """VaR/CVaR theo phân phối chuẩn; độ lệch chuẩn lấy từ mô hình hiệp phương sai của danh mục."""
+        sigma = np.sqrt(self.portfolio.cov_model.quad_form(weights) / 252) * (1 - cash_weight)
+        mu = returns.mean(axis=0)
+        h = self.horizon_days
+        z = norm.ppf(1 - self.confidence)
+        var = -(mu * h + z * sigma * np.sqrt(h))
+        cvar = -(mu * h - sigma * np.sqrt(h) * norm.pdf(z) / (1 - self.confidence))
+        return var, cvar
+
+    def _bootstrap_plan(self, num_days: int, rng: np.random.Generator) -> dict:
+        """
+        Chọn trước vị trí bắt đầu của các khối cho mọi mẫu bootstrap. Dùng chung cho mọi
+        danh mục để các danh mục được so sánh trên cùng các kịch bản lấy mẫu. Độ dài khối là
+        `block_size` bất kể kỳ hạn; khi kỳ hạn không chia hết, mẫu dùng thêm các phiên đầu
+        của một khối nữa.
+        """
+        block = min(self.block_size, num_days)
+        full_blocks, remainder = divmod(self.horizon_days, block)
+        return {
+            'block': block,
+            'remainder': remainder,
+            'starts': rng.integers(0, num_days - block + 1, size=(self.n_bootstrap, full_blocks)),
+            'remainder_starts': rng.integers(0, num_days - remainder + 1, size=self.n_bootstrap) if remainder else None,
+        }
+
+    def _bootstrap_var(self, returns: np.ndarray, plan: dict) -> tuple:
+        """
+        Block-bootstrap VaR/CVaR: mỗi mẫu ghép các khối `block_size` phiên liên tiếp rồi lấy
+        `horizon_days` phiên đầu tiên của chuỗi ghép. Tổng log-lợi suất của mọi khối (và mọi
+        phần đầu khối) có thể được tính sẵn qua tổng tích lũy, nên mỗi mẫu chỉ cần cộng vài giá
+        trị thay vì tái tạo cả chuỗi. Khi kỳ hạn ngắn hơn một khối, mẫu là một đoạn phiên liên
+        tiếp; với kỳ hạn 1 phiên, kết quả tương đương bootstrap độc lập (iid) theo phiên.
+        """
+        log_cum = np.vstack([np.zeros(returns.shape[1]), np.cumsum(np.log1p(returns), axis=0)])
+        block = plan['block']
+        block_sums = log_cum[block:] - log_cum[:-block]
+        samples = block_sums[plan['starts']].sum(axis=1)
+        if plan['remainder']:
+            remainder = plan['remainder']
+            samples += (log_cum[remainder:] - log_cum[:-remainder])[plan['remainder_starts']]
+        return self._tail(np.expm1(samples))
+
+
+def drawdown_metrics(returns: np.ndarray) -> tuple:
+    """
+    Sụt giảm tối đa (dạng tỷ lệ dương) và số phiên dài nhất nằm dưới đỉnh cũ, tính theo cột
+    cho ma trận lợi suất (số phiên x số danh mục).
+    """
+    wealth = np.cumprod(1 + returns, axis=0)
+    running_max = np.maximum.accumulate(np.vstack([np.ones(returns.shape[1]), wealth]), axis=0)[1:]
+    drawdown = wealth / running_max - 1
+
+    underwater = drawdown < 0
+    counts = np.cumsum(underwater, axis=0)
+    last_reset = np.maximum.accumulate(np.where(underwater, 0, counts), axis=0)
+    longest = (counts - last_reset).max(axis=0)
+    return -drawdown.min(axis=0), longest
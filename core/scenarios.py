@@ -0,0 +1,329 @@
+# goldenkey_project/core/scenarios.py
+"""
+Kiểm tra sức chịu đựng (stress test) của nhiều vector tỷ trọng cùng lúc:
+
+- Kịch bản lịch sử: phát lại các giai đoạn sụt giảm đã biết của thị trường (từ đỉnh đến
+  đáy của VNINDEX), đo lợi suất, sụt giảm tối đa và số phiên để hồi phục về đỉnh cũ.
+- Kịch bản giả định: cú sốc tức thời theo thị trường (nhân với beta của từng mã), theo
+  ngành (ngành lấy từ danh sách mã) hoặc theo từng mã.
+
+Các cửa sổ lịch sử có độ dài khác nhau được đệm về cùng độ dài thành một khối
+(kịch bản x phiên x mã), nên mọi danh mục và mọi kịch bản được tính bằng một phép nhân
+ma trận cho mỗi nhóm danh mục, thay vì lặp theo từng kịch bản.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.panel import get_price_panel
+from core.universe import get_universe
+
+if TYPE_CHECKING:
+    from core.portfolio import Portfolio
+
+# Các giai đoạn sụt giảm lớn của VNINDEX (ngày đỉnh, ngày đáy)
+HISTORICAL_SCENARIOS = {
+    'Điều chỉnh 2018': ('2018-04-09', '2018-07-05'),
+    'COVID-19 (03/2020)': ('2020-01-17', '2020-03-24'),
+    'Khủng hoảng trái phiếu 2022': ('2022-04-04', '2022-11-16'),
+}
+
+# Cú sốc giả định: 'market' áp dụng theo beta cho các mã không có cú sốc riêng,
+# 'sectors' theo tên ngành, 'symbols' theo từng mã (ưu tiên mã > ngành > thị trường)
+HYPOTHETICAL_SCENARIOS = {
+    'Thị trường giảm 10%': {'market': -0.10},
+    'Thị trường giảm 20%': {'market': -0.20},
+    'Ngân hàng giảm 15%': {'market': -0.05, 'sectors': {'Ngân hàng': -0.15}},
+    'Bất động sản giảm 25%': {'market': -0.05, 'sectors': {'Bất động sản': -0.25}},
+}
+
+
+def parse_shock_lines(text: str, benchmark: str = "VNINDEX") -> dict:
+    """
+    Đọc cú sốc do người dùng nhập, mỗi dòng dạng `<mã|ngành|benchmark>=<tỷ lệ>`, ví dụ
+    `VNINDEX=-10%`, `Ngân hàng=-20%`, `HPG=-0.3`. Khóa có trong danh sách mã được hiểu là mã.
+    """
+    universe = get_universe()
+    spec = {'market': None, 'sectors': {}, 'symbols': {}}
+    for line in text.splitlines():
+        key, sep, value = line.partition('=')
+        key, value = key.strip(), value.strip()
+        if not sep or not key or not value:
+            continue
+        try:
+            shock = float(value.rstrip('%')) / (100 if value.endswith('%') else 1)
+        except ValueError:
+            continue
+        if key.upper() == benchmark.upper():
+            spec['market'] = shock
+        elif key.upper() in universe or (not universe.is_loaded and key.isalnum() and key.isupper()):
+            spec['symbols'][key.upper()] = shock
+        else:
+            spec['sectors'][key] = shock
+    return spec
+
+
+class ScenarioEngine:
+    """
+    Đánh giá nhiều vector tỷ trọng cổ phiếu của một `Portfolio` trên thư viện kịch bản.
+
+    Dữ liệu giá của các cửa sổ lịch sử được tải một lần (`load_history`) và dùng lại cho mọi
+    lần gọi `evaluate`. Mã chưa niêm yết tại đầu cửa sổ được thay bằng biến động của
+    benchmark; cột `coverage` cho biết tỷ trọng thực sự có dữ liệu.
+    """
+
+    def __init__(self, portfolio: 'Portfolio', historical: Dict[str, tuple] = None,
+                 hypothetical: Dict[str, dict] = None, recovery_days: int = 252,
+                 max_chunk_elements: int = 5_000_000):
+        """
+        Args:
+            portfolio (Portfolio): Danh mục đã gọi calculate_stats().
+            historical (dict): {tên: (ngày đỉnh, ngày đáy)}; mặc định HISTORICAL_SCENARIOS.
+            hypothetical (dict): {tên: cú sốc}; mặc định HYPOTHETICAL_SCENARIOS.
+            recovery_days (int): Số phiên tối đa sau ngày đáy để theo dõi việc hồi phục.
+            max_chunk_elements (int): Giới hạn số phần tử của mảng trung gian cho mỗi nhóm danh mục.
+        """
+        self.portfolio = portfolio
+        self.historical = HISTORICAL_SCENARIOS if historical is None else historical
+        self.hypothetical = dict(HYPOTHETICAL_SCENARIOS if hypothetical is None else hypothetical)
+        self.recovery_days = recovery_days
+        self.max_chunk_elements = max_chunk_elements
+        self._windows: Optional[dict] = None
+
+    # --- Dữ liệu lịch sử ---
+
+    def _load_closes(self, symbols: List[str], start: datetime, end: datetime) -> pd.DataFrame:
+        """Giá đóng cửa (phiên x mã), ưu tiên bảng giá dùng chung; cột toàn NaN nếu không tải được."""
+        panel = get_price_panel()
+        if panel is not None and panel.contains(symbols) and panel.calendar[0] <= start:
+            return panel.frame(symbols, 'close', start=start, end=end)
+
+        provider = self.portfolio.provider
+
+        def fetch(symbol: str) -> pd.Series:
+            try:
+                df = provider.price_history(symbol, start=start.strftime('%Y-%m-%d'), end=end.strftime('%Y-%m-%d'))
+                return pd.Series(df['close'].values, index=pd.to_datetime(df['time']).dt.normalize(), name=symbol)
+            except Exception as e:
+                print(f"Không thể tải dữ liệu cho {symbol}: {e}")
+                return pd.Series(dtype=float, name=symbol)
+
+        with ThreadPoolExecutor(max_workers=min(8, len(symbols))) as executor:
+            series = list(executor.map(fetch, symbols))
+        closes = pd.concat(series, axis=1)
+        closes = closes[~closes.index.duplicated(keep='last')].sort_index()
+        # Lịch giao dịch lấy theo benchmark (cột cuối)
+        return closes.loc[closes[symbols[-1]].notna(), symbols]
+
+    def load_history(self) -> 'ScenarioEngine':
+        """
+        Tải giá cho mọi cửa sổ lịch sử (từ ngày đỉnh đến `recovery_days` phiên sau ngày đáy)
+        và dựng khối lợi suất đã đệm (kịch bản x phiên x mã, cột cuối là benchmark).
+        """
+        columns = self.portfolio.symbols + [self.portfolio.benchmark]
+        if not self.historical:
+            self._windows = {'names': [], 'returns': np.zeros((0, 0, len(columns))),
+                             'stress_len': np.zeros(0, dtype=int), 'path_len': np.zeros(0, dtype=int),
+                             'has_data': np.zeros((0, len(columns) - 1), dtype=bool)}
+            return self
+
+        starts = [pd.Timestamp(s) for s, _ in self.historical.values()]
+        ends = [pd.Timestamp(e) for _, e in self.historical.values()]
+        fetch_start = min(starts) - timedelta(days=10)
+        fetch_end = min(max(ends) + timedelta(days=int(self.recovery_days * 1.5)), pd.Timestamp(datetime.now()))
+        closes = self._load_closes(columns, fetch_start.to_pydatetime(), fetch_end.to_pydatetime())
+
+        names, paths, stress_len, has_data = [], [], [], []
+        for name, start, end in zip(self.historical, starts, ends):
+            # Bắt đầu từ phiên gần nhất trước hoặc đúng ngày đỉnh
+            lo = max(0, int(closes.index.searchsorted(start, 'right')) - 1)
+            trough = int(closes.index.searchsorted(end, 'right'))
+            window = closes.iloc[lo:trough + self.recovery_days]
+            if trough - lo < 2 or window[self.portfolio.benchmark].isna().all():
+                print(f"Không đủ dữ liệu cho kịch bản {name}, bỏ qua.")
+                continue
+            returns = window.ffill().pct_change(fill_method=None).iloc[1:]
+            bench = returns[self.portfolio.benchmark].fillna(0.0).values
+            values = returns.to_numpy(copy=True)
+            missing = np.isnan(values)
+            values[missing] = np.broadcast_to(bench[:, None], values.shape)[missing]
+            names.append(name)
+            paths.append(values)
+            stress_len.append(trough - lo - 1)
+            has_data.append(window.iloc[0, :-1].notna().values)
+
+        length = max((len(p) for p in paths), default=0)
+        padded = np.zeros((len(paths), length, len(columns)))
+        for i, path in enumerate(paths):
+            padded[i, :len(path)] = path
+        self._windows = {'names': names, 'returns': padded, 'stress_len': np.array(stress_len, dtype=int),
+                         'path_len': np.array([len(p) for p in paths], dtype=int),
+                         'has_data': np.array(has_data, dtype=bool).reshape(len(paths), len(columns) - 1)}
+        return self
+
+    # --- Đánh giá ---
+
+    def evaluate(self, weights: np.ndarray, cash_weight: float = 0.0, risk_free_rate: float = 0.04,
+                 extra_shocks: Dict[str, dict] = None) -> pd.DataFrame:
+        """
+        Đánh giá các vector tỷ trọng trên mọi kịch bản lịch sử và giả định.
+
+        Args:
+            weights (np.ndarray): Mảng (số danh mục x số cổ phiếu) hoặc một vector tỷ trọng.
+            cash_weight (float): Tỷ trọng tiền mặt của toàn danh mục.
+            risk_free_rate (float): Lãi suất phi rủi ro năm.
+            extra_shocks (dict): Các cú sốc giả định bổ sung {tên: cú sốc} (ví dụ do người dùng nhập).
+
+        Returns:
+            pd.DataFrame: Mỗi dòng là một cặp (danh mục, kịch bản) với các cột `portfolio`,
+            `scenario`, `type`, `return`, `max_drawdown` (tỷ lệ lỗ dương), `days_to_trough`,
+            `recovery_days` (NaN nếu chưa hồi phục), `coverage` và `benchmark_return`.
+        """
+        weights = np.atleast_2d(np.asarray(weights, dtype=float))
+        if self._windows is None:
+            self.load_history()
+        shocks = dict(self.hypothetical, **(extra_shocks or {}))
+        frames = [self._evaluate_historical(weights, cash_weight, risk_free_rate),
+                  self._evaluate_hypothetical(weights, shocks, cash_weight, risk_free_rate)]
+        frames = [f for f in frames if not f.empty]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def _evaluate_historical(self, weights: np.ndarray, cash_weight: float, risk_free_rate: float) -> pd.DataFrame:
+        windows = self._windows
+        num_scenarios, length, _ = windows['returns'].shape
+        if num_scenarios == 0:
+            return pd.DataFrame()
+        num_assets = weights.shape[1]
+        stacked = windows['returns'].reshape(num_scenarios * length, num_assets + 1)
+        daily_rf = (1 + risk_free_rate) ** (1 / 252) - 1
+        stress_len, path_len = windows['stress_len'], windows['path_len']
+
+        bench = _path_metrics(windows['returns'][:, :, -1:], stress_len, path_len)
+        chunk = max(1, self.max_chunk_elements // (num_scenarios * length))
+        parts = []
+        for begin in range(0, len(weights), chunk):
+            block = weights[begin:begin + chunk]
+            returns = (stacked[:, :num_assets] @ block.T).reshape(num_scenarios, length, len(block))
+            returns = returns * (1 - cash_weight) + daily_rf * cash_weight
+            parts.append(_path_metrics(returns, stress_len, path_len))
+        metrics = {key: np.concatenate([p[key] for p in parts], axis=1) for key in parts[0]}
+        coverage = windows['has_data'] @ weights.T
+
+        num_portfolios = len(weights)
+        return pd.DataFrame({
+            'portfolio': np.tile(np.arange(num_portfolios), num_scenarios),
+            'scenario': np.repeat(windows['names'], num_portfolios),
+            'type': 'historical',
+            'return': metrics['return'].ravel(),
+            'max_drawdown': metrics['max_drawdown'].ravel(),
+            'days_to_trough': metrics['days_to_trough'].ravel(),
+            'recovery_days': metrics['recovery_days'].ravel(),
+            'coverage': coverage.ravel(),
+            'benchmark_return': np.repeat(bench['return'][:, 0], num_portfolios),
+        })
+
+    def _shock_matrix(self, shocks: Dict[str, dict]) -> np.ndarray:
+        """Ma trận cú sốc (số kịch bản x số mã) theo thứ tự ưu tiên mã > ngành > thị trường x beta."""
+        returns = self.portfolio.returns
+        bench = returns[self.portfolio.benchmark].values
+        centered = bench - bench.mean()
+        asset = returns[self.portfolio.symbols].values
+        betas = (asset - asset.mean(axis=0)).T @ centered / (centered @ centered)
+
+        universe = get_universe()
+        industries = [universe.industry(s) for s in self.portfolio.symbols]
+        matrix = np.zeros((len(shocks), len(self.portfolio.symbols)))
+        for i, spec in enumerate(shocks.values()):
+            market = spec.get('market') or 0.0
+            sectors = spec.get('sectors') or {}
+            symbol_shocks = spec.get('symbols') or {}
+            for j, (symbol, industry) in enumerate(zip(self.portfolio.symbols, industries)):
+                if symbol in symbol_shocks:
+                    matrix[i, j] = symbol_shocks[symbol]
+                elif industry in sectors:
+                    matrix[i, j] = sectors[industry]
+                else:
+                    matrix[i, j] = market * betas[j]
+        return np.maximum(matrix, -1.0)
+
+    def _evaluate_hypothetical(self, weights: np.ndarray, shocks: Dict[str, dict], cash_weight: float,
+                               risk_free_rate: float) -> pd.DataFrame:
+        """
+        Cú sốc tức thời: tác động = tỷ trọng x cú sốc. Số phiên hồi phục được ước lượng theo
+        tăng trưởng log trung bình hàng ngày của danh mục trong dữ liệu lịch sử.
+        """
+        if not shocks:
+            return pd.DataFrame()
+        impact = (self._shock_matrix(shocks) @ weights.T) * (1 - cash_weight)
+
+        daily_rf = (1 + risk_free_rate) ** (1 / 252) - 1
+        asset_returns = self.portfolio.returns[self.portfolio.symbols].values
+        chunk = max(1, self.max_chunk_elements // max(1, len(asset_returns)))
+        growth = np.concatenate([
+            np.log1p((asset_returns @ weights[b:b + chunk].T) * (1 - cash_weight) + daily_rf * cash_weight).mean(axis=0)
+            for b in range(0, len(weights), chunk)
+        ])
+        loss = np.maximum(-impact, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            recovery = np.where(loss == 0, 0.0,
+                                np.where(growth > 0, np.ceil(-np.log1p(-loss) / growth), np.nan))
+
+        num_portfolios = len(weights)
+        market = np.array([spec.get('market') or 0.0 for spec in shocks.values()])
+        return pd.DataFrame({
+            'portfolio': np.tile(np.arange(num_portfolios), len(shocks)),
+            'scenario': np.repeat(list(shocks), num_portfolios),
+            'type': 'hypothetical',
+            'return': impact.ravel(),
+            'max_drawdown': loss.ravel(),
+            'days_to_trough': 0,
+            'recovery_days': recovery.ravel(),
+            'coverage': 1.0,
+            'benchmark_return': np.repeat(market, num_portfolios),
+        })
+
+
+def _path_metrics(returns: np.ndarray, stress_len: np.ndarray, path_len: np.ndarray) -> dict:
+    """
+    Chỉ số của các đường lợi suất đã đệm (kịch bản x phiên x danh mục): lợi suất và sụt giảm
+    tối đa trong cửa sổ căng thẳng, số phiên từ đầu cửa sổ đến đáy, và số phiên từ đáy đến
+    khi giá trị danh mục trở lại đỉnh trước đó (tìm trong toàn bộ đường, kể cả phần sau ngày đáy).
+    """
+    num_scenarios, length, _ = returns.shape
+    days = np.arange(length)
+    in_stress = (days[None, :] < stress_len[:, None])[:, :, None]
+    in_path = (days[None, :] < path_len[:, None])[:, :, None]
+
+    wealth = np.cumprod(1 + returns, axis=1)
+    running_max = np.maximum.accumulate(np.maximum(wealth, 1.0), axis=1)
+    drawdown = np.where(in_stress, wealth / running_max - 1, 0.0)
+    trough = drawdown.argmin(axis=1)
+    max_drawdown = -np.take_along_axis(drawdown, trough[:, None, :], axis=1)[:, 0, :]
+    peak = np.take_along_axis(running_max, trough[:, None, :], axis=1)
+
+    recovered = (wealth >= peak) & (days[None, :, None] > trough[:, None, :]) & in_path
+    first = recovered.argmax(axis=1)
+    recovery_days = np.where(max_drawdown <= 0, 0.0, np.where(recovered.any(axis=1), first - trough, np.nan))
+
+    return {
+        'return': wealth[np.arange(num_scenarios), stress_len - 1] - 1,
+        'max_drawdown': max_drawdown,
+        'days_to_trough': np.where(max_drawdown > 0, trough + 1, 0),
+        'recovery_days': recovery_days,
+    }
+
+
+def worst_case_summary(results: pd.DataFrame) -> pd.DataFrame:
+    """Kịch bản tệ nhất (sụt giảm lớn nhất) cho từng danh mục trong kết quả của `evaluate`."""
+    if results.empty:
+        return pd.DataFrame()
+    worst = results.loc[results.groupby('portfolio')['max_drawdown'].idxmax()].set_index('portfolio')
+    return pd.DataFrame({
+        'worst_scenario': worst['scenario'],
+        'worst_drawdown': worst['max_drawdown'],
+        'worst_recovery_days': worst['recovery_days'],
+        'mean_drawdown': results.groupby('portfolio')['max_drawdown'].mean(),
+    })
@@ -0,0 +1,176 @@
+# goldenkey_project/core/simulation.py
+"""
+Mô phỏng Monte Carlo giá trị tương lai của một danh mục đã chọn (GBM có tương quan hoặc
+block-bootstrap lịch sử), trả về dải phân vị theo phiên, xác suất chạm mức lỗ/mục tiêu và
+phân phối sụt giảm tối đa. Các đường được sinh theo từng đoạn phiên nên bộ nhớ không tăng
+theo kỳ hạn mô phỏng.
+"""
+from typing import TYPE_CHECKING, Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from core.portfolio import Portfolio
+
+SIMULATION_METHODS = ['gbm', 'bootstrap']
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+class ForwardSimulator:
+    """
+    Mô phỏng giá trị tương lai của một danh mục đã chọn (gồm phần tiền mặt) theo từng phiên.
+
+    - 'gbm': chuyển động Brown hình học có tương quan. Với tỷ trọng cố định (tái cân bằng mỗi
+      phiên, như mọi phép tính danh mục khác trong dự án), tổ hợp tuyến tính của các lợi suất
+      có tương quan vẫn là phân phối chuẩn với kỳ vọng w'μ và phương sai w'Σw, nên chỉ cần sinh
+      một chuỗi cho mỗi đường thay vì một chuỗi cho mỗi mã. Σ lấy từ `cov_model` của danh mục.
+    - 'bootstrap': ghép các khối phiên liên tiếp lấy ngẫu nhiên từ lợi suất lịch sử của danh
+      mục (giữ tương quan giữa các mã, đuôi dày và tự tương quan ngắn hạn).
+
+    Các đường được sinh theo từng đoạn phiên cho toàn bộ số đường cùng lúc; mỗi đoạn chỉ giữ
+    lại các phân vị theo phiên và trạng thái của từng đường (giá trị hiện tại, đỉnh, đáy, sụt
+    giảm tối đa), nên bộ nhớ bị chặn bởi `max_chunk_elements` chứ không tăng theo kỳ hạn.
+    """
+
+    def __init__(self, portfolio: 'Portfolio', method: str = 'gbm', horizon_days: int = 252,
+                 n_paths: int = 100_000, block_size: int = 5, percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                 max_chunk_elements: int = 5_000_000, seed: int = None):
+        """
+        Args:
+            portfolio (Portfolio): Danh mục đã gọi calculate_stats().
+            method (str): 'gbm' hoặc 'bootstrap'.
+            horizon_days (int): Kỳ hạn mô phỏng (số phiên).
+            n_paths (int): Số đường mô phỏng.
+            block_size (int): Độ dài mỗi khối phiên liên tiếp khi bootstrap.
+            percentiles (Sequence[float]): Các phân vị (0-100) của giá trị danh mục được giữ lại mỗi phiên.
+            max_chunk_elements (int): Giới hạn số phần tử của mảng (số phiên x số đường) cho mỗi đoạn.
+            seed (int): Seed cho bộ sinh số ngẫu nhiên.
+        """
+        if method not in SIMULATION_METHODS:
+            raise ValueError(f"Phương pháp mô phỏng không hợp lệ: {method}. Chọn một trong {SIMULATION_METHODS}.")
+        self.portfolio = portfolio
+        self.method = method
+        self.horizon_days = horizon_days
+        self.n_paths = n_paths
+        self.block_size = block_size
+        self.percentiles = list(percentiles)
+        self.max_chunk_elements = max_chunk_elements
+        self.seed = seed
+
+    def simulate(self, weights: np.ndarray, cash_weight: float = 0.0, risk_free_rate: float = 0.04,
+                 initial_value: float = 1.0, loss_threshold: float = 0.2, target_return: float = 0.2) -> Dict[str, object]:
+        """
+        Mô phỏng giá trị danh mục trong `horizon_days` phiên tới.
+
+        Args:
+            weights (np.ndarray): Vector tỷ trọng cổ phiếu (theo thứ tự `portfolio.symbols`).
+            cash_weight (float): Tỷ trọng tiền mặt của toàn danh mục.
+            risk_free_rate (float): Lãi suất phi rủi ro năm (lãi của phần tiền mặt).
+            initial_value (float): Giá trị ban đầu của danh mục.
+            loss_threshold (float): Mức lỗ (tỷ lệ dương, ví dụ 0.2 = -20%) cần đo xác suất chạm tới.
+            target_return (float): Mức lãi mục tiêu (ví dụ 0.2 = +20%) cần đo xác suất chạm tới.
+
+        Returns:
+            dict: 'fan' (DataFrame phiên x phân vị của giá trị danh mục), 'hit_probability'
+            (DataFrame phiên x ['loss', 'target']: xác suất đã chạm mức lỗ/mục tiêu tính đến
+            phiên đó) và 'summary' (Series các chỉ số của giá trị cuối kỳ và sụt giảm).
+        """
+        weights = np.asarray(weights, dtype=float).ravel()
+        loss_level = np.log1p(-loss_threshold) if loss_threshold < 1 else -np.inf
+        target_level = np.log1p(target_return)
+        rng = np.random.default_rng(self.seed)
+
+        if self.method == 'gbm':
+            drift, volatility = self._gbm_parameters(weights, cash_weight, risk_free_rate)
+            history = None
+        else:
+            history = np.log1p(self._historical_portfolio_returns(weights, cash_weight, risk_free_rate))
+            if len(history) < self.block_size:
+                raise ValueError("Không đủ dữ liệu lịch sử để lấy mẫu block-bootstrap.")
+
+        log_value = np.zeros(self.n_paths)
+        running_max = np.zeros(self.n_paths)
+        running_min = np.zeros(self.n_paths)
+        max_drawdown = np.zeros(self.n_paths)
+        fan = np.empty((self.horizon_days + 1, len(self.percentiles)))
+        fan[0] = 0.0
+        hits = np.zeros((self.horizon_days + 1, 2))
+
+        step = self._chunk_days()
+        for start in range(0, self.horizon_days, step):
+            days = min(step, self.horizon_days - start)
+            if history is None:
+                increments = drift + volatility * rng.standard_normal((days, self.n_paths))
+            else:
+                increments = self._bootstrap_increments(history, days, rng)
+
+            path = np.cumsum(increments, axis=0, out=increments)
+            path += log_value
+            fan[start + 1:start + days + 1] = np.percentile(path, self.percentiles, axis=1).T
+
+            chunk_max = np.maximum.accumulate(path, axis=0)
+            np.maximum(chunk_max, running_max, out=chunk_max)
+            max_drawdown = np.minimum(max_drawdown, (path - chunk_max).min(axis=0))
+            hits[start + 1:start + days + 1, 1] = (chunk_max >= target_level).mean(axis=1)
+            running_max = chunk_max[-1].copy()
+            del chunk_max
+
+            chunk_min = np.minimum.accumulate(path, axis=0)
+            np.minimum(chunk_min, running_min, out=chunk_min)
+            hits[start + 1:start + days + 1, 0] = (chunk_min <= loss_level).mean(axis=1)
+            running_min = chunk_min[-1].copy()
+            del chunk_min
+
+            log_value = path[-1].copy()
+
+        terminal = initial_value * np.exp(log_value)
+        days_index = pd.RangeIndex(self.horizon_days + 1, name='day')
+        summary = {
+            'expected_value': terminal.mean(),
+            'expected_return': terminal.mean() / initial_value - 1,
+            'prob_terminal_loss': (terminal < initial_value).mean(),
+            'prob_hit_loss': hits[-1, 0],
+            'prob_hit_target': hits[-1, 1],
+            # Sụt giảm dạng tỷ lệ lỗ dương; p95 là mức sụt giảm mà 5% số đường tệ nhất vượt qua
+            'median_max_drawdown': -np.expm1(np.median(max_drawdown)),
+            'max_drawdown_p95': -np.expm1(np.percentile(max_drawdown, 5)),
+        }
+        for q in self.percentiles:
+            summary[f'terminal_p{q:g}'] = np.percentile(terminal, q)
+        return {
+            'fan': pd.DataFrame(initial_value * np.exp(fan), index=days_index,
+                                columns=[f'p{q:g}' for q in self.percentiles]),
+            'hit_probability': pd.DataFrame(hits, index=days_index, columns=['loss', 'target']),
+            'summary': pd.Series(summary, name=self.method),
+        }
+
+    def _chunk_days(self) -> int:
+        """Số phiên mỗi đoạn; với bootstrap là bội số của độ dài khối để các khối không bị cắt."""
+        days = max(1, self.max_chunk_elements // max(1, self.n_paths))
+        if self.method == 'bootstrap':
+            days = max(self.block_size, days - days % self.block_size)
+        return min(days, self.horizon_days)
+
+    def _gbm_parameters(self, weights: np.ndarray, cash_weight: float, risk_free_rate: float) -> tuple:
+        """Drift và độ lệch chuẩn của log-lợi suất mỗi phiên theo GBM."""
+        mean_returns = self.portfolio.returns[self.portfolio.symbols].mean().values * 252
+        mu = (weights @ mean_returns) * (1 - cash_weight) + risk_free_rate * cash_weight
+        sigma = np.sqrt(self.portfolio.cov_model.quad_form(weights)[0]) * (1 - cash_weight)
+        dt = 1 / 252
+        return (mu - 0.5 * sigma ** 2) * dt, sigma * np.sqrt(dt)
+
+    def _historical_portfolio_returns(self, weights: np.ndarray, cash_weight: float, risk_free_rate: float) -> np.ndarray:
+        asset_returns = self.portfolio.returns[self.portfolio.symbols].values
+        daily_rf = (1 + risk_free_rate) ** (1 / 252) - 1
+        return asset_returns @ weights * (1 - cash_weight) + daily_rf * cash_weight
+
+    def _bootstrap_increments(self, history: np.ndarray, days: int, rng: np.random.Generator) -> np.ndarray:
+        """Log-lợi suất (số phiên x số đường) ghép từ các khối phiên liên tiếp lấy ngẫu nhiên."""
+        block = self.block_size
+        n_blocks = -(-days // block)
+        starts = rng.integers(0, len(history) - block + 1, size=(n_blocks, self.n_paths))
+        offsets = np.arange(block)[None, :, None]
+        # (khối, vị trí trong khối, đường) -> (phiên, đường)
+        samples = history[starts[:, None, :] + offsets].reshape(n_blocks * block, self.n_paths)
+        return samples[:days]
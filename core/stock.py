@@ -1,44 +1,82 @@
 # goldenkey_project/core/stock.py
 import pandas as pd
-import vnstock
 from datetime import datetime, timedelta
-from config import VN_STOCK_SOURCE
+from core.data_provider import DataProvider, get_data_provider
+from core.intraday import CHUNK_DAYS, chunk_date_ranges, compact_ohlcv, intraday_cache, is_intraday
+from core.fundamentals import get_fundamentals_store
 import pandas_ta as ta
 
 class Stock:
     """
     Đại diện cho một cổ phiếu, quản lý việc truy xuất và xử lý dữ liệu.
     """
-    def __init__(self, symbol: str):
+    def __init__(self, symbol: str, provider: DataProvider = None):
         if not isinstance(symbol, str) or not symbol:
             raise ValueError("Mã cổ phiếu phải là một chuỗi không rỗng.")
         self.symbol = symbol.upper().strip()
-        self.client = vnstock.Vnstock()
-        self.stock_data = self.client.stock(symbol=self.symbol, source=VN_STOCK_SOURCE)
+        # Mặc định dùng nguồn dữ liệu chung của tiến trình; truyền `provider` để dùng nguồn riêng (ví dụ dữ liệu tổng hợp)
+        self.provider = provider or get_data_provider()
         self.price_history = pd.DataFrame()
 
-    def fetch_price_history(self, years: int = 3, interval: str = '1D') -> pd.DataFrame:
-        """Tải dữ liệu giá lịch sử cho cổ phiếu."""
+    def fetch_price_history(self, years: int = 3, interval: str = '1D', days: int = None) -> pd.DataFrame:
+        """
+        Tải dữ liệu giá lịch sử cho cổ phiếu.
+
+        Args:
+            years (int): Số năm dữ liệu (dùng khi không truyền `days`).
+            interval (str): Khung thời gian: '1D' hoặc dữ liệu trong phiên '1m', '5m', '15m', '30m', '1H'.
+            days (int): Số ngày lịch cần tải; ưu tiên hơn `years`, phù hợp với dữ liệu trong phiên.
+        """
         try:
             end_date = datetime.now()
-            start_date = end_date - timedelta(days=int(years * 365.25))
-            df = self.stock_data.quote.history(
-                start=start_date.strftime('%Y-%m-%d'),
-                end=end_date.strftime('%Y-%m-%d'),
-                interval=interval
-            )
-            df.dropna(subset=['volume'], inplace=True)
-            df['time'] = pd.to_datetime(df['time'])
+            start_date = end_date - timedelta(days=int(days if days is not None else years * 365.25))
+            if is_intraday(interval):
+                df = self._fetch_intraday(start_date, end_date, interval)
+            else:
+                df = self.provider.price_history(
+                    self.symbol,
+                    start=start_date.strftime('%Y-%m-%d'),
+                    end=end_date.strftime('%Y-%m-%d'),
+                    interval=interval
+                )
+                df.dropna(subset=['volume'], inplace=True)
+                df['time'] = pd.to_datetime(df['time'])
             self.price_history = df
             return self.price_history
         except Exception as e:
             print(f"Lỗi khi tải dữ liệu giá cho {self.symbol}: {e}")
             return pd.DataFrame()
 
+    def _fetch_intraday(self, start_date: datetime, end_date: datetime, interval: str) -> pd.DataFrame:
+        """
+        Tải dữ liệu trong phiên theo từng đoạn ngày. Nếu cache đã có dữ liệu mịn hơn
+        bao phủ khoảng yêu cầu thì resample cục bộ thay vì gọi API.
+        """
+        cached = intraday_cache.get(self.symbol, interval, start_date, end_date)
+        if cached is not None:
+            return cached
+
+        chunks = []
+        for chunk_start, chunk_end in chunk_date_ranges(start_date, end_date, CHUNK_DAYS[interval]):
+            chunk = self.provider.price_history(
+                self.symbol,
+                start=chunk_start.strftime('%Y-%m-%d'),
+                end=chunk_end.strftime('%Y-%m-%d'),
+                interval=interval
+            )
+            if chunk is not None and not chunk.empty:
+                chunks.append(compact_ohlcv(chunk))
+        if not chunks:
+            return pd.DataFrame()
+
+        df = compact_ohlcv(pd.concat(chunks, ignore_index=True))
+        intraday_cache.put(self.symbol, interval, start_date, end_date, df)
+        return df.copy()
+
     def get_company_profile(self) -> pd.DataFrame:
         """Lấy thông tin tổng quan về công ty."""
         try:
-            profile_df = self.stock_data.company.profile()
+            profile_df = self.provider.company_profile(self.symbol)
             return profile_df
         except Exception as e:
             print(f"Lỗi khi lấy thông tin công ty {self.symbol}: {e}")
@@ -87,27 +125,33 @@ class Stock:
         return levels, highest_high, lowest_low
 
     def get_financial_report(self, report_type: str, period: str = 'quarter', years: int = 3) -> pd.DataFrame:
-        """Lấy dữ liệu báo cáo tài chính."""
+        """
+        Lấy dữ liệu báo cáo tài chính từ kho cục bộ (chỉ tải từ nguồn khi mã chưa có
+        trong kho hoặc có thể đã có quý mới).
+        """
         try:
-            api_method = getattr(self.stock_data.finance, report_type)
-            df_report = api_method(period=period, lang='vi')
-            if df_report.empty: return pd.DataFrame()
-            current_year = datetime.now().year
-            start_year_filter = current_year - years
-            df_report['year'] = pd.to_numeric(df_report['year'], errors='coerce')
-            df_filtered = df_report[df_report['year'] >= start_year_filter]
-            return df_filtered
+            return get_fundamentals_store().get(self.symbol, report_type, period=period, years=years)
         except Exception as e:
             print(f"Lỗi khi truy xuất {report_type} cho {self.symbol}: {e}")
             return pd.DataFrame()
             
+    def get_peer_comparison(self, period: str = 'quarter') -> pd.DataFrame:
+        """So sánh các chỉ số tài chính với doanh nghiệp cùng ngành (truy vấn cục bộ trên kho báo cáo)."""
+        try:
+            store = get_fundamentals_store()
+            store.get(self.symbol, 'ratio', period=period)
+            return store.peer_comparison(self.symbol, period=period)
+        except Exception as e:
+            print(f"Lỗi khi so sánh cùng ngành cho {self.symbol}: {e}")
+            return pd.DataFrame()
+
     def get_related_news(self, page_size: int = 10) -> pd.DataFrame:
         """
         Lấy các tin tức gần nhất liên quan đến cổ phiếu.
         """
         try:
             # Chức năng này của vnstock có thể yêu cầu phiên bản mới
-            news_df = vnstock.stock_news(symbol=self.symbol, page_num=1, page_size=page_size)
+            news_df = self.provider.news(self.symbol, page_size=page_size)
             if not news_df.empty:
                 return news_df[['title', 'source', 'url']].head(5) # Lấy 5 tin mới nhất
             return pd.DataFrame()
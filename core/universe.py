@@ -0,0 +1,272 @@
+# goldenkey_project/core/universe.py
+"""
+Danh mục toàn bộ mã chứng khoán niêm yết (symbol universe) dùng chung cho cả tiến trình:
+kiểm tra mã hợp lệ, tìm kiếm theo tiền tố / gần đúng trên mã và tên công ty, tra cứu
+sàn và ngành. Dữ liệu được lưu thành snapshot trên đĩa để khởi động không cần mạng và
+được làm mới định kỳ ở luồng nền.
+"""
+import bisect
+import difflib
+import json
+import os
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from config import UNIVERSE_REFRESH_HOURS, UNIVERSE_SNAPSHOT_PATH
+from core.data_provider import get_data_provider
+
+# Các chỉ số thị trường luôn được coi là hợp lệ (dùng làm benchmark)
+MARKET_INDICES = {
+    'VNINDEX': 'Chỉ số VN-Index', 'VN30': 'Chỉ số VN30',
+    'HNXINDEX': 'Chỉ số HNX-Index', 'HNX30': 'Chỉ số HNX30', 'UPCOMINDEX': 'Chỉ số UPCoM-Index',
+}
+
+
+def _normalize_text(text: str) -> str:
+    """Chữ thường, bỏ dấu tiếng Việt để tìm kiếm không phân biệt dấu."""
+    text = unicodedata.normalize('NFD', str(text).lower().replace('đ', 'd'))
+    return ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+
+
+def _first_column(df: pd.DataFrame, candidates: List[str]) -> Optional[str]:
+    return next((col for col in candidates if col in df.columns), None)
+
+
+class SymbolUniverse:
+    """
+    Chỉ mục mã chứng khoán trong bộ nhớ.
+
+    - Kiểm tra hợp lệ O(1) qua dict theo mã.
+    - Tìm theo tiền tố mã bằng tìm kiếm nhị phân trên danh sách mã đã sắp xếp.
+    - Tìm theo tên công ty (không dấu) và gợi ý gần đúng bằng difflib trên mã và trên từng
+      từ của tên công ty (gõ sai chính tả tên vẫn tìm được).
+    """
+
+    def __init__(self, snapshot_path: str = UNIVERSE_SNAPSHOT_PATH, refresh_hours: float = UNIVERSE_REFRESH_HOURS):
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = timedelta(hours=refresh_hours)
+        self.updated_at: Optional[datetime] = None
+        self._records: Dict[str, dict] = {}
+        self._sorted_symbols: List[str] = []
+        self._search_names: Dict[str, str] = {}
+        self._name_words: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._last_attempt: Optional[datetime] = None
+
+    # --- Nạp và làm mới dữ liệu ---
+
+    def load(self) -> 'SymbolUniverse':
+        """Nạp từ snapshot trên đĩa; nếu chưa có snapshot thì tải trực tiếp từ nguồn dữ liệu."""
+        if not self._load_snapshot():
+            self.refresh()
+        return self
+
+    def _load_snapshot(self) -> bool:
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self._build_index(snapshot['symbols'], datetime.fromisoformat(snapshot['updated_at']))
+            return True
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Không đọc được snapshot danh sách mã ({self.snapshot_path}): {e}")
+            return False
+
+    def refresh(self) -> bool:
+        """Tải lại danh sách mã từ nguồn dữ liệu, cập nhật chỉ mục và ghi snapshot mới."""
+        try:
+            records = self._fetch_listing()
+        except Exception as e:
+            print(f"Lỗi khi tải danh sách mã chứng khoán: {e}")
+            return False
+        if not records:
+            return False
+        updated_at = datetime.now()
+        self._build_index(records, updated_at)
+        self._save_snapshot(records, updated_at)
+        return True
+
+    def refresh_if_stale(self):
+        """Nếu dữ liệu đã quá hạn làm mới, khởi động một luồng nền để tải lại (không chặn người gọi)."""
+        now = datetime.now()
+        if self.updated_at is not None and now - self.updated_at < self.refresh_interval:
+            return
+        with self._lock:
+            # Khi mất mạng, chỉ thử lại sau ít nhất 5 phút
+            if self._refreshing or (self._last_attempt and now - self._last_attempt < timedelta(minutes=5)):
+                return
+            self._refreshing = True
+            self._last_attempt = now
+
+        def _run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=_run, name="symbol-universe-refresh", daemon=True).start()
+
+    def _fetch_listing(self) -> List[dict]:
+        """Ghép danh sách mã theo sàn với thông tin ngành thành các bản ghi {symbol, name, exchange, industry}."""
+        provider = get_data_provider()
+        by_exchange = provider.symbols_by_exchange()
+        by_industry = provider.symbols_by_industries()
+
+        exchange_col = _first_column(by_exchange, ['exchange', 'board', 'comGroupCode'])
+        name_col = _first_column(by_exchange, ['organ_name', 'organ_short_name', 'company_name'])
+        industry_col = _first_column(by_industry, ['icb_name2', 'icb_name3', 'industry_name'])
+
+        records = pd.DataFrame({
+            'symbol': by_exchange['symbol'].astype(str).str.upper().str.strip(),
+            'name': by_exchange[name_col] if name_col else '',
+            'exchange': by_exchange[exchange_col] if exchange_col else '',
+        })
+        if industry_col:
+            industries = by_industry[['symbol', industry_col]].rename(columns={industry_col: 'industry'})
+            records = records.merge(industries.drop_duplicates('symbol'), on='symbol', how='left')
+        else:
+            records['industry'] = ''
+        records = records.drop_duplicates('symbol').fillna('')
+        return records.to_dict('records')
+
+    def _save_snapshot(self, records: List[dict], updated_at: datetime):
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'updated_at': updated_at.isoformat(), 'symbols': records}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"Lỗi khi ghi snapshot danh sách mã: {e}")
+
+    def _build_index(self, records: List[dict], updated_at: datetime):
+        """Xây chỉ mục mới rồi thay thế một lần, để các luồng đang đọc luôn thấy trạng thái nhất quán."""
+        index = {symbol: {'symbol': symbol, 'name': name, 'exchange': 'INDEX', 'industry': ''}
+                 for symbol, name in MARKET_INDICES.items()}
+        for record in records:
+            symbol = str(record['symbol']).upper().strip()
+            if symbol:
+                index[symbol] = {'symbol': symbol, 'name': record.get('name', ''),
+                                 'exchange': record.get('exchange', ''), 'industry': record.get('industry', '')}
+        search_names = {symbol: _normalize_text(info['name']) for symbol, info in index.items()}
+        name_words: Dict[str, List[str]] = {}
+        for symbol, name in search_names.items():
+            for word in dict.fromkeys(name.split()):
+                name_words.setdefault(word, []).append(symbol)
+        self._records, self._sorted_symbols, self._search_names = index, sorted(index), search_names
+        self._name_words = name_words
+        self.updated_at = updated_at
+
+    # --- Tra cứu ---
+
+    @property
+    def is_loaded(self) -> bool:
+        return bool(self._sorted_symbols)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, symbol: str) -> bool:
+        return str(symbol).upper().strip() in self._records
+
+    def info(self, symbol: str) -> Optional[dict]:
+        """Thông tin {symbol, name, exchange, industry} của một mã, hoặc None nếu không tồn tại."""
+        return self._records.get(str(symbol).upper().strip())
+
+    def stock_symbols(self) -> List[str]:
+        """Toàn bộ mã cổ phiếu (không gồm các chỉ số thị trường), đã sắp xếp."""
+        return [s for s in self._sorted_symbols if s not in MARKET_INDICES]
+
+    def industry(self, symbol: str, default: str = 'Khác') -> str:
+        info = self.info(symbol)
+        return (info or {}).get('industry') or default
+
+    def validate(self, symbols: List[str]) -> Tuple[List[str], List[str]]:
+        """Tách danh sách mã thành (hợp lệ, không hợp lệ). Mã được chuẩn hóa về chữ in hoa."""
+        valid, invalid = [], []
+        for s in symbols:
+            symbol = str(s).upper().strip()
+            (valid if symbol in self._records else invalid).append(symbol)
+        return valid, invalid
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """
+        Tìm mã theo thứ tự ưu tiên: trùng khớp mã, tiền tố mã, tên công ty chứa từ khóa
+        (không phân biệt dấu), rồi các mã/tên gần giống.
+        """
+        query = str(query).strip()
+        if not query:
+            return []
+        upper = query.upper()
+        matches = []
+
+        def add(symbol: str):
+            if symbol not in matches:
+                matches.append(symbol)
+
+        symbols = self._sorted_symbols
+        position = bisect.bisect_left(symbols, upper)
+        while position < len(symbols) and symbols[position].startswith(upper) and len(matches) < limit:
+            add(symbols[position])
+            position += 1
+
+        if len(matches) < limit:
+            needle = _normalize_text(query)
+            for symbol, name in self._search_names.items():
+                if needle in name:
+                    add(symbol)
+                    if len(matches) >= limit:
+                        break
+
+        if len(matches) < limit:
+            for symbol in self.suggest(upper, limit=limit):
+                add(symbol)
+
+        if len(matches) < limit:
+            for symbol in self._suggest_by_name(query, limit=limit):
+                add(symbol)
+
+        return [self._records[s] for s in matches[:limit]]
+
+    def suggest(self, symbol: str, limit: int = 3) -> List[str]:
+        """Các mã gần giống với một mã không hợp lệ (ví dụ gõ nhầm một ký tự)."""
+        return difflib.get_close_matches(str(symbol).upper().strip(), self._sorted_symbols, n=limit, cutoff=0.6)
+
+    def _suggest_by_name(self, query: str, limit: int = 10) -> List[str]:
+        """
+        Các mã có tên công ty chứa những từ gần giống các từ trong `query` (không dấu),
+        xếp theo số từ khớp rồi theo độ giống.
+        """
+        name_words = self._name_words
+        scores: Dict[str, float] = {}
+        for word in _normalize_text(query).split():
+            if len(word) < 3:
+                continue
+            for close in difflib.get_close_matches(word, name_words, n=5, cutoff=0.75):
+                ratio = difflib.SequenceMatcher(None, word, close).ratio()
+                for symbol in name_words[close]:
+                    scores[symbol] = scores.get(symbol, 0.0) + ratio
+        return sorted(scores, key=lambda symbol: (-scores[symbol], symbol))[:limit]
+
+
+_universe: Optional[SymbolUniverse] = None
+_universe_lock = threading.Lock()
+
+
+def get_universe() -> SymbolUniverse:
+    """Trả về chỉ mục dùng chung của tiến trình, nạp lần đầu khi được gọi và tự làm mới khi quá hạn."""
+    global _universe
+    universe = _universe
+    if universe is None:
+        # Nạp (có thể phải tải qua mạng) ngoài khóa; nếu luồng khác đã nạp xong trước thì dùng bản đó
+        loaded = SymbolUniverse().load()
+        with _universe_lock:
+            if _universe is None:
+                _universe = loaded
+            universe = _universe
+    universe.refresh_if_stale()
+    return universe
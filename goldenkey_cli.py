@@ -0,0 +1,390 @@
+# goldenkey_cli.py
+"""
+Giao diện dòng lệnh (không cần Streamlit) để chạy hàng loạt các phân tích của Goldenkey.
+
+Ví dụ:
+    python goldenkey_cli.py --out-dir reports --workers 8 stocks FPT HPG ACB
+    python goldenkey_cli.py --out-dir reports stocks --symbols-file vn30.txt --ai
+    python goldenkey_cli.py --out-dir reports portfolios --portfolio FPT,HPG,ACB --portfolio VCB,MWG,TCB
+    python goldenkey_cli.py --workers 8 fundamentals
+    python goldenkey_cli.py --years 10 panel build
+
+Tiến độ được ghi vào `<out-dir>/progress.json` sau mỗi tác vụ hoàn tất; chạy lại cùng
+lệnh sẽ bỏ qua các tác vụ đã xong (dùng --force để chạy lại từ đầu).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import GEMINI_API_KEY, DEFAULT_BENCHMARK, MONTE_CARLO_ITERATIONS
+from core.covariance import COVARIANCE_METHODS
+
+# Đối tượng AI Analyzer được khởi tạo một lần cho mỗi tiến trình worker
+_worker_analyzer = None
+
+
+# -----------------------------------------------------------------------------
+# Tiến trình worker
+# -----------------------------------------------------------------------------
+
+def _init_worker(api_key: Optional[str]):
+    """Khởi tạo tài nguyên dùng chung cho một tiến trình worker."""
+    global _worker_analyzer
+    # Các worker được fork từ cùng một tiến trình sẽ chia sẻ trạng thái RNG nếu không seed lại
+    np.random.seed()
+    if api_key:
+        from core.analyzer import StockAIAnalyzer
+        _worker_analyzer = StockAIAnalyzer(api_key=api_key)
+
+
+class _StageTimer:
+    """Ghi lại thời gian chạy của từng giai đoạn trong một tác vụ."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def process_stock(symbol: str, years: int, out_dir: str, with_ai: bool, interval: str = '1D', days: int = None) -> dict:
+    """Tải dữ liệu, tính chỉ báo (và tùy chọn chạy AI) cho một mã; ghi kết quả ra đĩa."""
+    from core.fundamentals import REPORT_TYPES
+    from core.stock import Stock
+
+    timer = _StageTimer()
+    with timer.stage('fetch'):
+        stock = Stock(symbol=symbol)
+        df_price = stock.fetch_price_history(years=years, interval=interval, days=days)
+    if df_price.empty:
+        raise RuntimeError(f"Không có dữ liệu giá cho {symbol}.")
+
+    with timer.stage('indicators'):
+        stock.calculate_technical_indicators()
+        fib_levels, highest, lowest = stock.calculate_fibonacci_levels()
+
+    last = stock.price_history.iloc[-1]
+    summary = {
+        'symbol': stock.symbol,
+        'interval': interval,
+        'last_time': str(last['time']),
+        'last_close': float(last['close']),
+        'indicators': {col: (None if pd.isna(last.get(col)) else float(last[col]))
+                       for col in ['MA20', 'MA50', 'MA100', 'MACD', 'MACD_signal', 'RSI']},
+        'fibonacci': {k: float(v) for k, v in fib_levels.items()} if fib_levels else None,
+        'highest': None if highest is None else float(highest),
+        'lowest': None if lowest is None else float(lowest),
+    }
+
+    if with_ai:
+        if _worker_analyzer is None:
+            raise RuntimeError("Chưa cấu hình Gemini API Key cho chế độ --ai.")
+        with timer.stage('fetch_reports'):
+            reports = {name: stock.get_financial_report(name, years=years) for name in REPORT_TYPES}
+            news_df = stock.get_related_news()
+        with timer.stage('ai'):
+            analyses = {'technical': _worker_analyzer.analyze_technical(stock)}
+            financial_parts = [_worker_analyzer.analyze_financial_report(df, name, stock.symbol)
+                               for name, df in reports.items()]
+            analyses['financial'] = "\n\n".join(financial_parts)
+            analyses['news'] = _worker_analyzer.analyze_news_sentiment(news_df, stock.symbol)
+            analyses['summary'] = _worker_analyzer.generate_overall_summary(stock.symbol, analyses)
+        summary['ai'] = analyses
+
+    with timer.stage('write'):
+        stock_dir = os.path.join(out_dir, 'stocks')
+        stock.price_history.to_parquet(os.path.join(stock_dir, f"{stock.symbol}_{interval}.parquet"), index=False)
+        _write_json(os.path.join(stock_dir, f"{stock.symbol}_{interval}.json"), summary)
+
+    return {'timings': timer.timings}
+
+
+def process_portfolio(name: str, symbols: List[str], years: int, out_dir: str, iterations: int,
+                      risk_free_rate: float, cash_weight: float, min_weight: float, max_weight: float,
+                      method: str = 'monte_carlo', cov_method: str = 'sample', n_factors: int = None) -> dict:
+    """Tải dữ liệu, tối ưu hóa (Monte Carlo hoặc HRP) và ghi kết quả cho một danh mục."""
+    from core.portfolio import Portfolio
+
+    timer = _StageTimer()
+    with timer.stage('fetch'):
+        portfolio = Portfolio(symbols=symbols, benchmark=DEFAULT_BENCHMARK)
+        if not portfolio.fetch_data(years=years):
+            raise RuntimeError(f"Không thể tải dữ liệu cho danh mục {name}.")
+
+    with timer.stage('stats'):
+        portfolio.calculate_stats(cov_method=cov_method, n_factors=n_factors)
+
+    with timer.stage('optimize'):
+        if method == 'hrp':
+            hrp = portfolio.run_hrp(risk_free_rate=risk_free_rate, min_weight=min_weight, max_weight=max_weight)
+            candidates = [('hrp', hrp)]
+            mc_results = None
+        else:
+            mc_results = portfolio.run_monte_carlo(iterations=iterations, risk_free_rate=risk_free_rate,
+                                                   min_weight=min_weight, max_weight=max_weight)
+            if mc_results.empty:
+                raise RuntimeError(f"Không tìm thấy danh mục hợp lệ cho {name}; hãy nới lỏng ràng buộc.")
+            max_sharpe, max_return = portfolio.get_optimal_portfolios_from_mc(mc_results)
+            candidates = [('max_sharpe', max_sharpe), ('max_return', max_return)]
+
+    with timer.stage('performance'):
+        optimal = {}
+        for label, series in candidates:
+            stock_weights = series[portfolio.symbols].values
+            performance_df = portfolio.calculate_cumulative_performance(stock_weights, cash_weight, risk_free_rate)
+            optimal[label] = {
+                'return': float(series['return']),
+                'volatility': float(series['volatility']),
+                'sharpe': float(series['sharpe']),
+                'weights': {s: float(w) for s, w in zip(portfolio.symbols, stock_weights)},
+                'cumulative_1y': {col: float(performance_df[col].iloc[-1]) for col in performance_df.columns}
+                                 if not performance_df.empty else {},
+            }
+
+    with timer.stage('write'):
+        portfolio_dir = os.path.join(out_dir, 'portfolios')
+        if mc_results is not None:
+            mc_results.to_parquet(os.path.join(portfolio_dir, f"{name}_mc.parquet"), index=False)
+        _write_json(os.path.join(portfolio_dir, f"{name}_{method}.json"), {
+            'name': name, 'symbols': portfolio.symbols, 'benchmark': portfolio.benchmark,
+            'cash_weight': cash_weight, 'risk_free_rate': risk_free_rate,
+            'min_weight': min_weight, 'max_weight': max_weight, 'method': method, 'portfolios': optimal,
+        })
+
+    return {'timings': timer.timings}
+
+
+def _run_task(func, kwargs: dict) -> dict:
+    """Bọc tác vụ để lỗi được trả về dưới dạng dữ liệu thay vì làm hỏng cả pool."""
+    start = time.perf_counter()
+    try:
+        result = func(**kwargs)
+        result['status'] = 'done'
+    except Exception as e:
+        result = {'status': 'failed', 'error': f"{type(e).__name__}: {e}",
+                  'traceback': traceback.format_exc(), 'timings': {}}
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+
+# -----------------------------------------------------------------------------
+# Tiến trình chính: điều phối, lưu tiến độ, tổng hợp thời gian
+# -----------------------------------------------------------------------------
+
+def _write_json(path: str, payload) -> None:
+    """Ghi JSON nguyên tử (ghi file tạm rồi đổi tên) để không hỏng file khi bị ngắt."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def _load_progress(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def summarize_timings(results: Dict[str, dict]) -> pd.DataFrame:
+    """Tổng hợp thời gian theo từng giai đoạn của các tác vụ đã hoàn tất."""
+    per_stage: Dict[str, list] = {}
+    for result in results.values():
+        if result.get('status') != 'done':
+            continue
+        for stage, seconds in result.get('timings', {}).items():
+            per_stage.setdefault(stage, []).append(seconds)
+    rows = []
+    for stage, values in per_stage.items():
+        arr = np.asarray(values)
+        rows.append({'stage': stage, 'tasks': len(arr), 'total_s': arr.sum(), 'mean_s': arr.mean(),
+                     'p95_s': np.percentile(arr, 95), 'max_s': arr.max()})
+    return pd.DataFrame(rows, columns=['stage', 'tasks', 'total_s', 'mean_s', 'p95_s', 'max_s'])
+
+
+def run_tasks(tasks: Dict[str, tuple], out_dir: str, workers: int, api_key: Optional[str], force: bool) -> int:
+    """
+    Chạy các tác vụ trên một process pool, bỏ qua các tác vụ đã hoàn tất trong lần chạy trước.
+
+    Args:
+        tasks: {khóa_tác_vụ: (hàm, kwargs)}.
+
+    Returns:
+        int: Số tác vụ thất bại.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    progress_path = os.path.join(out_dir, 'progress.json')
+    progress = {} if force else _load_progress(progress_path)
+    pending = {key: task for key, task in tasks.items() if progress.get(key, {}).get('status') != 'done'}
+    print(f"{len(tasks)} tác vụ, {len(tasks) - len(pending)} đã hoàn tất trước đó, {len(pending)} cần chạy.")
+
+    wall_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(api_key,)) as executor:
+        futures = {executor.submit(_run_task, func, kwargs): key for key, (func, kwargs) in pending.items()}
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            key = futures[future]
+            result = future.result()
+            result['finished_at'] = datetime.now().isoformat(timespec='seconds')
+            progress[key] = {k: v for k, v in result.items() if k != 'traceback'}
+            _write_json(progress_path, progress)
+            status = "OK" if result['status'] == 'done' else f"LỖI - {result['error']}"
+            print(f"[{done_count}/{len(pending)}] {key}: {status} ({result['elapsed']:.2f}s)")
+    wall = time.perf_counter() - wall_start
+
+    timing_df = summarize_timings({key: progress[key] for key in tasks if key in progress})
+    _write_json(os.path.join(out_dir, 'timings.json'), {
+        'wall_s': wall, 'workers': workers, 'stages': timing_df.to_dict(orient='records'),
+    })
+    print(f"\nTổng thời gian: {wall:.2f}s với {workers} worker")
+    if not timing_df.empty:
+        print(timing_df.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+    return sum(1 for key in tasks if progress.get(key, {}).get('status') != 'done')
+
+
+def update_fundamentals(symbols: List[str], period: str, workers: int, force: bool) -> int:
+    """Cập nhật tăng dần kho báo cáo tài chính (chỉ tải các mã có thể đã có kỳ báo cáo mới)."""
+    from core.fundamentals import get_fundamentals_store
+
+    store = get_fundamentals_store()
+    start = time.perf_counter()
+    if symbols:
+        added = store.update([s.upper().strip() for s in symbols], period=period, max_workers=workers, force=force)
+    else:
+        added = store.update_universe(period=period, max_workers=workers, force=force)
+    for report_type, rows in added.items():
+        # Gộp cả các file delta do trang web ghi thêm từ lần cập nhật trước
+        store.compact(report_type, period)
+        print(f"{report_type}: thêm {rows} dòng")
+    print(f"Tổng thời gian: {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def run_panel(action: str, symbols: List[str], years: int, workers: int) -> int:
+    """Tạo mới (build) hoặc ghi thêm các phiên mới (update) cho bảng giá dùng chung."""
+    from core.panel import PricePanel, build_price_panel, update_price_panel
+    from config import PANEL_DIR
+
+    start = time.perf_counter()
+    if action == 'build':
+        if not symbols:
+            from core.universe import get_universe
+            symbols = get_universe().stock_symbols()
+        panel = build_price_panel(symbols, years=years, max_workers=workers)
+        print(f"Đã tạo bảng giá {panel.length} phiên x {len(panel.symbols)} mã tại {PANEL_DIR}")
+    else:
+        added = update_price_panel(PricePanel(PANEL_DIR, mode='r+'), max_workers=workers)
+        print(f"Đã thêm {added} phiên mới")
+    print(f"Tổng thời gian: {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def _read_list_file(path: str) -> List[str]:
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Chạy hàng loạt phân tích cổ phiếu và tối ưu danh mục Goldenkey.")
+    parser.add_argument('--out-dir', default='goldenkey_output', help="Thư mục ghi kết quả và tiến độ.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Số tiến trình worker.")
+    parser.add_argument('--years', type=int, default=3, help="Số năm dữ liệu lịch sử.")
+    parser.add_argument('--force', action='store_true', help="Bỏ qua tiến độ cũ và chạy lại tất cả.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stocks_parser = subparsers.add_parser('stocks', help="Tính chỉ báo kỹ thuật (và báo cáo AI) cho danh sách mã.")
+    stocks_parser.add_argument('symbols', nargs='*', help="Các mã cổ phiếu.")
+    stocks_parser.add_argument('--symbols-file', help="File chứa mỗi dòng một mã.")
+    stocks_parser.add_argument('--interval', default='1D', choices=['1D', '1H', '30m', '15m', '5m', '1m'],
+                               help="Khung thời gian dữ liệu giá.")
+    stocks_parser.add_argument('--days', type=int, help="Số ngày dữ liệu (ưu tiên hơn --years, dùng cho khung trong phiên).")
+    stocks_parser.add_argument('--ai', action='store_true', help="Tạo thêm báo cáo phân tích bằng AI.")
+
+    portfolios_parser = subparsers.add_parser('portfolios', help="Tối ưu hóa danh sách danh mục.")
+    portfolios_parser.add_argument('--portfolio', action='append', default=[],
+                                   help="Danh mục dạng 'FPT,HPG,ACB' hoặc 'ten=FPT,HPG,ACB'; có thể lặp lại.")
+    portfolios_parser.add_argument('--portfolios-file', help="File chứa mỗi dòng một danh mục (cùng định dạng).")
+    portfolios_parser.add_argument('--method', choices=['monte_carlo', 'hrp'], default='monte_carlo',
+                                   help="Phương pháp phân bổ.")
+    portfolios_parser.add_argument('--iterations', type=int, default=MONTE_CARLO_ITERATIONS)
+    portfolios_parser.add_argument('--risk-free-rate', type=float, default=0.04)
+    portfolios_parser.add_argument('--cash-weight', type=float, default=0.0)
+    portfolios_parser.add_argument('--min-weight', type=float, default=0.10)
+    portfolios_parser.add_argument('--max-weight', type=float, default=0.60)
+    portfolios_parser.add_argument('--cov-method', choices=COVARIANCE_METHODS, default='sample',
+                                   help="Cách ước lượng hiệp phương sai (mẫu, co rút Ledoit-Wolf, mô hình nhân tố).")
+    portfolios_parser.add_argument('--factors', type=int, help="Số nhân tố khi dùng --cov-method factor.")
+
+    fundamentals_parser = subparsers.add_parser('fundamentals', help="Cập nhật kho báo cáo tài chính cục bộ.")
+    fundamentals_parser.add_argument('symbols', nargs='*', help="Các mã cổ phiếu (mặc định: toàn bộ danh sách mã).")
+    fundamentals_parser.add_argument('--period', choices=['quarter', 'year'], default='quarter')
+
+    panel_parser = subparsers.add_parser('panel', help="Tạo hoặc cập nhật bảng giá toàn thị trường (memory-mapped).")
+    panel_parser.add_argument('action', choices=['build', 'update'])
+    panel_parser.add_argument('symbols', nargs='*', help="Các mã khi build (mặc định: toàn bộ danh sách mã).")
+
+    args = parser.parse_args(argv)
+    if args.command == 'fundamentals':
+        return update_fundamentals(args.symbols, args.period, args.workers, args.force)
+    if args.command == 'panel':
+        return run_panel(args.action, args.symbols, args.years, args.workers)
+    os.makedirs(args.out_dir, exist_ok=True)
+    tasks: Dict[str, tuple] = {}
+    api_key = None
+
+    if args.command == 'stocks':
+        symbols = list(args.symbols) + (_read_list_file(args.symbols_file) if args.symbols_file else [])
+        symbols = list(dict.fromkeys(s.upper().strip() for s in symbols if s.strip()))
+        if not symbols:
+            parser.error("Cần ít nhất một mã cổ phiếu.")
+        if args.ai:
+            api_key = os.environ.get("GEMINI_API_KEY") or GEMINI_API_KEY
+            if not api_key or "YOUR_GEMINI_API_KEY" in api_key:
+                parser.error("Chế độ --ai cần GEMINI_API_KEY (biến môi trường hoặc config.py).")
+        os.makedirs(os.path.join(args.out_dir, 'stocks'), exist_ok=True)
+        suffix = ':ai' if args.ai else ''
+        for symbol in symbols:
+            tasks[f"stock:{symbol}:{args.interval}{suffix}"] = (process_stock, {
+                'symbol': symbol, 'years': args.years, 'out_dir': args.out_dir, 'with_ai': args.ai,
+                'interval': args.interval, 'days': args.days,
+            })
+    else:
+        specs = list(args.portfolio) + (_read_list_file(args.portfolios_file) if args.portfolios_file else [])
+        if not specs:
+            parser.error("Cần ít nhất một danh mục (--portfolio hoặc --portfolios-file).")
+        os.makedirs(os.path.join(args.out_dir, 'portfolios'), exist_ok=True)
+        for spec in specs:
+            name, _, symbol_part = spec.rpartition('=')
+            symbols = [s.strip().upper() for s in symbol_part.split(',') if s.strip()]
+            if len(symbols) < 2:
+                parser.error(f"Danh mục '{spec}' cần ít nhất hai mã.")
+            name = name.strip() or "_".join(symbols)
+            suffix = '' if args.cov_method == 'sample' else f":{args.cov_method}"
+            tasks[f"portfolio:{name}:{args.method}{suffix}"] = (process_portfolio, {
+                'name': name, 'symbols': symbols, 'years': args.years, 'out_dir': args.out_dir,
+                'iterations': args.iterations, 'risk_free_rate': args.risk_free_rate,
+                'cash_weight': args.cash_weight, 'min_weight': args.min_weight, 'max_weight': args.max_weight,
+                'method': args.method, 'cov_method': args.cov_method, 'n_factors': args.factors,
+            })
+
+    failed = run_tasks(tasks, args.out_dir, args.workers, api_key, args.force)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,10 +9,14 @@ import plotly.express as px
 # Thêm thư mục gốc của dự án vào Python Path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from core.stock import Stock
-from core.analyzer import StockAIAnalyzer
+from core.loader import StockDataLoader
+from core.intraday import is_intraday
+from core.universe import get_universe
+from core.fundamentals import PEER_METRIC_LABELS, REPORT_LABELS, REPORT_TYPES
+from utils.helpers import format_invalid_symbols
 # SỬA LỖI: Quay lại sử dụng hàm vẽ biểu đồ của Plotly
 from utils.visualization import plot_stock_chart_plotly
+from service.client import create_analyzer, create_stock, get_service_client
 from config import GEMINI_API_KEY
 
 # --- Cấu hình trang ---
@@ -21,63 +25,172 @@ st.markdown("<h1 style='text-align:center;'>Phân tích Cổ phiếu Toàn diệ
 st.markdown("---")
 
 # --- Khởi tạo AI Analyzer (chỉ một lần) ---
+# Khi dùng dịch vụ tính toán dùng chung, API key nằm ở phía dịch vụ
 if 'analyzer' not in st.session_state:
     try:
-        api_key = GEMINI_API_KEY or st.secrets.get("GEMINI_API_KEY")
-        if not api_key or "YOUR_GEMINI_API_KEY" in api_key:
-            st.error("Lỗi: Vui lòng thiết lập Gemini API Key trong `config.py` hoặc Streamlit Secrets.")
-            st.stop()
-        st.session_state.analyzer = StockAIAnalyzer(api_key=api_key)
+        api_key = None
+        if get_service_client() is None:
+            api_key = GEMINI_API_KEY or st.secrets.get("GEMINI_API_KEY")
+            if not api_key or "YOUR_GEMINI_API_KEY" in api_key:
+                st.error("Lỗi: Vui lòng thiết lập Gemini API Key trong `config.py` hoặc Streamlit Secrets.")
+                st.stop()
+        st.session_state.analyzer = create_analyzer(api_key=api_key)
     except Exception as e:
         st.error(f"Lỗi khi khởi tạo AI: {e}")
         st.stop()
 
 # --- Giao diện nhập liệu ---
 st.markdown("### Cấu hình Phân tích:")
-col1, col2, col3 = st.columns([2, 1, 1])
+col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
 with col1:
     ticker_input = st.text_input("Nhập mã cổ phiếu (ví dụ: FPT, HPG):", key="ticker_input").upper().strip()
 with col2:
-    years_input = st.slider("Số năm dữ liệu:", 1, 10, 3, key="years_slider")
+    interval_map = {"Ngày": "1D", "1 giờ": "1H", "30 phút": "30m", "15 phút": "15m", "5 phút": "5m", "1 phút": "1m"}
+    interval_label = st.selectbox("Khung thời gian:", list(interval_map.keys()), key="interval_select")
+    interval_value = interval_map[interval_label]
 with col3:
+    if is_intraday(interval_value):
+        days_input = st.slider("Số ngày dữ liệu:", 1, 180, 30, key="days_slider")
+        years_input = 1
+    else:
+        years_input = st.slider("Số năm dữ liệu:", 1, 10, 3, key="years_slider")
+        days_input = None
+with col4:
     term_type_map = {"Quý": "quarter", "Năm": "year"}
     term_type_label = st.selectbox("Chu kỳ BCTC:", list(term_type_map.keys()), key="term_type_select")
     term_type_value = term_type_map[term_type_label]
 
+# --- Thông tin mã / gợi ý khi đang nhập (tra cứu trong bộ nhớ, không gọi mạng) ---
+universe = get_universe()
+if ticker_input and universe.is_loaded:
+    ticker_info = universe.info(ticker_input)
+    if ticker_info:
+        st.caption(f"**{ticker_info['symbol']}** – {ticker_info['name']} | Sàn: {ticker_info['exchange']} | "
+                   f"Ngành: {ticker_info['industry'] or 'Chưa phân loại'}")
+    else:
+        matches = universe.search(ticker_input, limit=5)
+        if matches:
+            st.caption("Gợi ý: " + ", ".join(f"**{m['symbol']}** ({m['name']})" for m in matches))
+
 if st.button("🚀 Khởi động Phân tích", type="primary", use_container_width=True):
     if not ticker_input:
         st.error("⚠️ Vui lòng nhập mã cổ phiếu!")
+    elif universe.is_loaded and ticker_input not in universe:
+        st.error(f"⚠️ {format_invalid_symbols([ticker_input])}")
     else:
         st.markdown("---")
         st.header(f"Kết quả phân tích cho cổ phiếu: {ticker_input}")
 
-        # 1. TẠO ĐỐI TƯỢNG STOCK VÀ TẢI DỮ LIỆU
-        with st.spinner(f"Đang tải dữ liệu cho {ticker_input}..."):
-            stock = Stock(symbol=ticker_input)
-            df_price = stock.fetch_price_history(years=years_input)
-            if df_price.empty:
-                st.error(f"Không thể tải dữ liệu giá cho {ticker_input}. Vui lòng thử lại.")
-                st.stop()
-            stock.calculate_technical_indicators()
+        # 1. GỬI ĐỒNG THỜI MỌI YÊU CẦU DỮ LIỆU CỦA MÃ
+        # Mỗi phần bên dưới có một chỗ giữ sẵn và được hiển thị ngay khi dữ liệu của nó về,
+        # không phải chờ yêu cầu chậm nhất.
+        stock = create_stock(ticker_input)
+        loader = StockDataLoader(stock, years=years_input, interval=interval_value, days=days_input,
+                                 period=term_type_value).start()
+        analyzer = st.session_state.analyzer
 
-        # (Phần hiển thị thông tin công ty giữ nguyên)
+        profile_slot = st.empty()
 
-        # 2. PHÂN TÍCH KỸ THUẬT
         st.subheader("1. Phân tích Kỹ thuật")
-        
-        # SỬA LỖI: Quay lại sử dụng st.plotly_chart
-        with st.spinner("Đang vẽ biểu đồ kỹ thuật..."):
-            fig = plot_stock_chart_plotly(stock)
-            st.plotly_chart(fig, use_container_width=True)
-
-        # (Phần phân tích của AI và phân tích cơ bản giữ nguyên)
-        with st.spinner("AI đang phân tích biểu đồ kỹ thuật..."):
-            tech_analysis_text = st.session_state.analyzer.analyze_technical(stock)
-            with st.expander("Xem kết luận của AI về Phân tích Kỹ thuật", expanded=True):
-                st.markdown(tech_analysis_text)
-        
+        chart_slot = st.empty()
+        tech_ai_slot = st.empty()
+
         st.subheader("2. Phân tích Cơ bản")
-        # ... (toàn bộ code phần phân tích cơ bản và tổng hợp không thay đổi)
-        # ...
+        peers_slot = st.empty()
+        report_tabs = st.tabs([REPORT_LABELS[r] for r in REPORT_TYPES])
+        report_slots = {}
+        for report_type, tab in zip(REPORT_TYPES, report_tabs):
+            with tab:
+                report_slots[report_type] = (st.empty(), st.empty())
+
+        st.subheader("3. Tin tức liên quan")
+        news_slot = st.empty()
+        news_ai_slot = st.empty()
+
+        st.subheader("4. Tổng hợp của AI")
+        summary_slot = st.empty()
+
+        for slot in [chart_slot, peers_slot, news_slot, summary_slot] + [table for table, _ in report_slots.values()]:
+            slot.info("⏳ Đang tải dữ liệu...")
+
+        analyses = {}
+        pending_analyses = {'ai:technical', 'ai:news'} | {f"ai:report:{r}" for r in REPORT_TYPES}
+
+        def finish_analysis(analysis_key: str):
+            """Đánh dấu một phân tích đã xong (hoặc bị bỏ qua); gửi bản tổng hợp khi không còn phân tích nào."""
+            pending_analyses.discard(analysis_key)
+            if not pending_analyses:
+                summary_inputs = {k: analyses[k] for k in ('technical', 'news') if k in analyses}
+                summary_inputs['financial'] = "\n\n".join(analyses[r] for r in REPORT_TYPES if r in analyses)
+                summary_slot.info("🤖 AI đang tổng hợp...")
+                loader.submit('ai:summary', analyzer.generate_overall_summary, ticker_input, summary_inputs)
+
+        for key, data in loader.as_completed():
+            if key == 'price':
+                if data.empty:
+                    chart_slot.error(f"Không thể tải dữ liệu giá cho {ticker_input}. Vui lòng thử lại.")
+                    finish_analysis('ai:technical')
+                else:
+                    chart_slot.plotly_chart(plot_stock_chart_plotly(stock), use_container_width=True)
+                    tech_ai_slot.info("🤖 AI đang phân tích biểu đồ kỹ thuật...")
+                    loader.submit('ai:technical', analyzer.analyze_technical, stock)
+
+            elif key == 'profile':
+                if not data.empty:
+                    with profile_slot.expander("Thông tin doanh nghiệp", expanded=False):
+                        st.dataframe(data.T, use_container_width=True)
+
+            elif key.startswith('report:'):
+                report_type = key.split(':', 1)[1]
+                table_slot, ai_slot = report_slots[report_type]
+                if data.empty:
+                    table_slot.warning(f"Không có dữ liệu {REPORT_LABELS[report_type]}.")
+                else:
+                    table_slot.dataframe(data, use_container_width=True)
+                ai_slot.info("🤖 AI đang phân tích báo cáo...")
+                loader.submit(f"ai:{key}", analyzer.analyze_financial_report, data, report_type, ticker_input)
+
+            elif key == 'peers':
+                if data.empty:
+                    peers_slot.empty()
+                else:
+                    with peers_slot.expander(f"So sánh với doanh nghiệp cùng ngành ({data.index.name})", expanded=True):
+                        peer_table = data.rename(index=PEER_METRIC_LABELS, columns={
+                            'value': ticker_input, 'industry_median': 'Trung vị ngành',
+                            'percentile': 'Xếp hạng trong ngành', 'peer_count': 'Số DN so sánh',
+                        })
+                        st.dataframe(peer_table.style.format({
+                            ticker_input: "{:.2f}", 'Trung vị ngành': "{:.2f}", 'Xếp hạng trong ngành': "{:.0%}",
+                        }), use_container_width=True)
+                        st.caption("Xếp hạng trong ngành: 100% là tốt nhất (với P/E, P/B, Nợ/Vốn chủ sở hữu thì thấp hơn được xem là tốt hơn).")
+
+            elif key == 'news':
+                if data.empty:
+                    news_slot.info("Không tìm thấy tin tức gần đây.")
+                else:
+                    news_slot.markdown("\n".join(f"- [{row['title']}]({row['url']}) – *{row['source']}*"
+                                                 for _, row in data.iterrows()))
+                news_ai_slot.info("🤖 AI đang phân tích tin tức...")
+                loader.submit('ai:news', analyzer.analyze_news_sentiment, data, ticker_input)
+
+            elif key.startswith('ai:') and key != 'ai:summary':
+                text = data if isinstance(data, str) else "Không thể tạo phân tích."
+                if key == 'ai:technical':
+                    analyses['technical'] = text
+                    with tech_ai_slot.expander("Xem kết luận của AI về Phân tích Kỹ thuật", expanded=True):
+                        st.markdown(text)
+                elif key == 'ai:news':
+                    analyses['news'] = text
+                    with news_ai_slot.expander("Xem phân tích tin tức của AI", expanded=True):
+                        st.markdown(text)
+                else:
+                    report_type = key.split(':', 2)[2]
+                    analyses[report_type] = text
+                    with report_slots[report_type][1].expander("Xem phân tích của AI", expanded=True):
+                        st.markdown(text)
+                finish_analysis(key)
+
+            elif key == 'ai:summary':
+                summary_slot.markdown(data if isinstance(data, str) else "Không thể tạo bản tổng hợp.")
 
         st.success("✅ Phân tích toàn diện hoàn tất!")
\ No newline at end of file
@@ -2,7 +2,13 @@
 import streamlit as st
 import pandas as pd
 from core.portfolio import Portfolio
-from utils.visualization import plot_efficient_frontier, prepare_echarts_sunburst_data, plot_cumulative_returns
+from core.backtest import WalkForwardBacktester
+from core.risk import RiskEngine
+from core.scenarios import ScenarioEngine, parse_shock_lines, worst_case_summary
+from core.simulation import ForwardSimulator
+from utils.visualization import plot_efficient_frontier, prepare_echarts_sunburst_data, plot_cumulative_returns, plot_stress_test, plot_forward_simulation
+from utils.helpers import validate_symbols, format_invalid_symbols
+from service.client import create_portfolio
 from config import DEFAULT_STOCK_SYMBOLS, MONTE_CARLO_ITERATIONS
 import streamlit.components.v1 as components
 import json
@@ -14,12 +20,16 @@ st.markdown("Tìm kiếm các danh mục tối ưu dựa trên mô phỏng Monte
 st.markdown("---")
 
 # --- Hàm hỗ trợ để hiển thị thông tin chi tiết của danh mục ---
-def display_portfolio_details(portfolio_obj: Portfolio, portfolio_series: pd.Series, cash_weight: float, risk_free_rate: float, symbols: list, title: str):
-    """Hàm hỗ trợ hiển thị thông tin chi tiết cho một danh mục tối ưu."""
+def display_portfolio_details(portfolio_obj: Portfolio, portfolio_series: pd.Series, cash_weight: float, risk_free_rate: float, symbols: list, title: str, risk_metrics: pd.Series = None, performance_df: pd.DataFrame = None, var_confidence: float = 0.95, var_horizon: int = 1):
+    """Hàm hỗ trợ hiển thị thông tin chi tiết cho một danh mục tối ưu (VaR/CVaR theo mức tin cậy và kỳ hạn đã dùng khi tính)."""
     
     st.header(title)
     if "Sharpe" in title:
         st.markdown("Danh mục này cân bằng tốt nhất giữa lợi nhuận và rủi ro.")
+    elif "được chọn" in title:
+        st.markdown("Danh mục này được chọn trực tiếp từ đường biên hiệu quả.")
+    elif "HRP" in title:
+        st.markdown("Danh mục này phân bổ rủi ro theo cấu trúc phân cụm tương quan của các cổ phiếu, ổn định hơn với danh mục lớn.")
     else:
         st.markdown("Danh mục này tập trung vào việc đạt lợi nhuận cao nhất, thường đi kèm với rủi ro cao hơn.")
 
@@ -37,16 +47,32 @@ def display_portfolio_details(portfolio_obj: Portfolio, portfolio_series: pd.Ser
     c2.metric("Rủi ro (toàn DM)", f"{total_vol:.2%}")
     c3.metric("Tỷ lệ Sharpe (phần cổ phiếu)", f"{p_sharpe:.2f}")
 
+    if risk_metrics is not None:
+        st.subheader(f"Chỉ số rủi ro (VaR/CVaR {var_confidence:.0%}, kỳ hạn {var_horizon} phiên)")
+        r1, r2, r3, r4, r5 = st.columns(5)
+        r1.metric("VaR lịch sử", f"{risk_metrics['var_historical']:.2%}")
+        r2.metric("CVaR bootstrap", f"{risk_metrics['cvar_bootstrap']:.2%}")
+        r3.metric("Sụt giảm tối đa", f"{risk_metrics['max_drawdown']:.2%}", f"{risk_metrics['max_drawdown_days']:.0f} phiên", delta_color="off")
+        r4.metric("Sortino", f"{risk_metrics['sortino']:.2f}")
+        r5.metric(f"Beta so với {portfolio_obj.benchmark}", f"{risk_metrics['beta']:.2f}")
+        with st.expander("Chi tiết VaR/CVaR theo từng phương pháp"):
+            var_table = pd.DataFrame({
+                'VaR': [risk_metrics['var_historical'], risk_metrics['var_parametric'], risk_metrics['var_bootstrap']],
+                'CVaR': [risk_metrics['cvar_historical'], risk_metrics['cvar_parametric'], risk_metrics['cvar_bootstrap']],
+            }, index=['Lịch sử', 'Tham số (chuẩn)', 'Block bootstrap' if var_horizon > 1 else 'Bootstrap (iid)'])
+            st.dataframe(var_table.style.format("{:.2%}"))
+
     # Lấy tỷ trọng cổ phiếu
     stock_weights = portfolio_series[symbols].values
     
-    # Tính toán hiệu suất tích lũy
-    with st.spinner("Đang tính toán hiệu suất lịch sử..."):
-        performance_df = portfolio_obj.calculate_cumulative_performance(
-            stock_weights=stock_weights,
-            cash_weight=cash_weight,
-            risk_free_rate=risk_free_rate
-        )
+    # Tính toán hiệu suất tích lũy (nếu chưa được tính sẵn)
+    if performance_df is None:
+        with st.spinner("Đang tính toán hiệu suất lịch sử..."):
+            performance_df = portfolio_obj.calculate_cumulative_performance(
+                stock_weights=stock_weights,
+                cash_weight=cash_weight,
+                risk_free_rate=risk_free_rate
+            )
 
     col1, col2 = st.columns([1, 2])
     with col1:
@@ -57,6 +83,13 @@ def display_portfolio_details(portfolio_obj: Portfolio, portfolio_series: pd.Ser
             cash_df = pd.DataFrame([cash_weight], index=['Tiền mặt'], columns=['Tỷ trọng'])
             weights_df = pd.concat([weights_df, cash_df])
         st.dataframe(weights_df.style.format({'Tỷ trọng': "{:.2%}"}))
+        if st.button("📡 Theo dõi danh mục này", key=f"monitor_{title}"):
+            # Trang Theo dõi Danh mục đọc danh sách này để tính độ lệch so với phân bổ mục tiêu
+            st.session_state.setdefault('monitored_portfolios', {})[title] = {
+                'weights': dict(zip(symbols, map(float, stock_weights))),
+                'cash_weight': cash_weight,
+            }
+            st.success("Đã thêm vào trang Theo dõi Danh mục.")
 
     with col2:
         st.subheader("Biến động của danh mục (1 năm qua)")
@@ -73,6 +106,18 @@ symbols_input = st.sidebar.text_area(
 years_input = st.sidebar.slider("Số năm dữ liệu lịch sử", 1, 10, 3)
 risk_free_rate_input = st.sidebar.slider("Lãi suất phi rủi ro (%)", 1.0, 10.0, 4.0, 0.1) / 100
 cash_weight_input = st.sidebar.slider("Tỷ trọng tiền mặt trong danh mục (%)", 0, 100, 0, 1) / 100
+method_map = {"Monte Carlo (Markowitz)": "monte_carlo", "Hierarchical Risk Parity (HRP)": "hrp"}
+method_label = st.sidebar.selectbox("Phương pháp phân bổ", list(method_map.keys()),
+                                    help="HRP phù hợp với danh mục lớn (hàng trăm mã) hoặc ràng buộc chặt.")
+method_input = method_map[method_label]
+cov_method_map = {"Mẫu (sample)": "sample", "Co rút Ledoit-Wolf": "ledoit_wolf", "Mô hình nhân tố": "factor"}
+cov_method_label = st.sidebar.selectbox("Ước lượng hiệp phương sai", list(cov_method_map.keys()),
+                                        help="Với nhiều mã và ít phiên, ma trận mẫu nhiễu và gần suy biến; "
+                                             "co rút hoặc mô hình nhân tố cho kết quả ổn định hơn.")
+cov_method_input = cov_method_map[cov_method_label]
+n_factors_input = None
+if cov_method_input == "factor":
+    n_factors_input = st.sidebar.slider("Số nhân tố", 1, 20, 5, 1)
 
 # --- THÊM PHẦN RÀNG BUỘC ---
 st.sidebar.header("Ràng buộc Tỷ trọng Cổ phiếu")
@@ -80,32 +125,91 @@ st.sidebar.caption("Áp dụng cho phần danh mục cổ phiếu.")
 min_weight_input = st.sidebar.slider("Tỷ trọng tối thiểu cho mỗi CP (%)", 0, 40, 10, 1) / 100
 max_weight_input = st.sidebar.slider("Tỷ trọng tối đa cho mỗi CP (%)", 10, 100, 60, 1) / 100
 
+st.sidebar.header("Phân tích Rủi ro")
+var_confidence_input = st.sidebar.selectbox("Mức tin cậy VaR/CVaR", [0.90, 0.95, 0.99], index=1, format_func=lambda x: f"{x:.0%}")
+var_horizon_input = st.sidebar.slider("Kỳ hạn VaR (phiên)", 1, 20, 1, 1)
+
+st.sidebar.header("Kiểm tra Sức chịu đựng")
+run_stress_input = st.sidebar.checkbox("Chạy kịch bản sốc lịch sử và giả định", value=False,
+                                       help="Điều chỉnh 2018, COVID-19 (03/2020), khủng hoảng trái phiếu 2022 và các cú sốc theo thị trường/ngành.")
+custom_shocks_input = st.sidebar.text_area("Cú sốc tùy chỉnh (mỗi dòng một mục)", "",
+                                           placeholder="VNINDEX=-15%\nNgân hàng=-20%\nHPG=-30%",
+                                           help="Mã, tên ngành hoặc benchmark; các mã không được nêu chịu cú sốc thị trường theo beta.")
+
+st.sidebar.header("Mô phỏng Tương lai")
+run_forward_input = st.sidebar.checkbox("Mô phỏng giá trị danh mục trong tương lai", value=False,
+                                        help="Mô phỏng hàng trăm nghìn đường giá trị của danh mục tối ưu (gồm tiền mặt).")
+forward_method_map = {"GBM có tương quan": "gbm", "Block-bootstrap lịch sử": "bootstrap"}
+forward_method_label = st.sidebar.selectbox("Phương pháp mô phỏng", list(forward_method_map.keys()),
+                                            help="GBM dùng lợi suất kỳ vọng và hiệp phương sai; bootstrap ghép các khối phiên lịch sử (giữ đuôi dày).")
+forward_horizon_input = st.sidebar.slider("Kỳ hạn mô phỏng (phiên)", 21, 756, 252, 21)
+forward_paths_input = st.sidebar.select_slider("Số đường mô phỏng", [10_000, 50_000, 100_000, 200_000], value=100_000)
+forward_loss_input = st.sidebar.slider("Ngưỡng lỗ (%)", 5, 50, 20, 5) / 100
+forward_target_input = st.sidebar.slider("Mục tiêu lợi nhuận (%)", 5, 100, 20, 5) / 100
+
+st.sidebar.header("Kiểm định Walk-forward")
+run_backtest_input = st.sidebar.checkbox("Chạy kiểm định walk-forward", value=False)
+rebalance_map = {"Hàng tháng": "monthly", "Hàng quý": "quarterly"}
+rebalance_label = st.sidebar.selectbox("Tần suất tái cân bằng", list(rebalance_map.keys()))
+lookback_months_input = st.sidebar.slider("Cửa sổ ước lượng (tháng)", 6, 24, 12, 1)
+transaction_cost_input = st.sidebar.slider("Chi phí giao dịch (%)", 0.0, 1.0, 0.15, 0.05) / 100
+
 if st.sidebar.button("🚀 Chạy Tối ưu hóa", use_container_width=True):
     symbols = [s.strip().upper() for s in symbols_input.split(',') if s.strip()]
+    symbols, invalid_symbols = validate_symbols(list(dict.fromkeys(symbols)))
+    if invalid_symbols:
+        st.warning(f"{format_invalid_symbols(invalid_symbols)}. Các mã này sẽ bị bỏ qua.")
     if len(symbols) < 2:
         st.error("Vui lòng nhập ít nhất hai mã cổ phiếu.")
-    else:
-        # --- THÊM PHẦN KIỂM TRA RÀNG BUỘC ---
-        if min_weight_input >= max_weight_input:
-            st.sidebar.error("Tỷ trọng tối thiểu phải nhỏ hơn tỷ trọng tối đa.")
-            st.stop()
-        
-        # Kiểm tra xem ràng buộc có khả thi về mặt toán học không
-        if len(symbols) * min_weight_input > 1.0:
-            st.sidebar.error(f"Ràng buộc không khả thi: Tổng các tỷ trọng tối thiểu ({len(symbols) * min_weight_input:.0%}) đã vượt quá 100%. Vui lòng giảm số lượng cổ phiếu hoặc giảm tỷ trọng tối thiểu.")
+        st.stop()
+
+    # --- THÊM PHẦN KIỂM TRA RÀNG BUỘC ---
+    if min_weight_input >= max_weight_input:
+        st.sidebar.error("Tỷ trọng tối thiểu phải nhỏ hơn tỷ trọng tối đa.")
+        st.stop()
+
+    # Kiểm tra xem ràng buộc có khả thi về mặt toán học không
+    if len(symbols) * min_weight_input > 1.0:
+        st.sidebar.error(f"Ràng buộc không khả thi: Tổng các tỷ trọng tối thiểu ({len(symbols) * min_weight_input:.0%}) đã vượt quá 100%. Vui lòng giảm số lượng cổ phiếu hoặc giảm tỷ trọng tối thiểu.")
+        st.stop()
+    if len(symbols) * max_weight_input < 1.0:
+        st.sidebar.error(f"Ràng buộc không khả thi: Tổng các tỷ trọng tối đa ({len(symbols) * max_weight_input:.0%}) chưa đạt 100%. Vui lòng thêm cổ phiếu hoặc tăng tỷ trọng tối đa.")
+        st.stop()
+
+    with st.spinner("Đang tải và xử lý dữ liệu..."):
+        portfolio = create_portfolio(symbols)
+        if not portfolio.fetch_data(years=years_input):
+            st.error("Xảy ra lỗi khi tải dữ liệu. Vui lòng kiểm tra lại mã cổ phiếu.")
             st.stop()
-        
-        with st.spinner("Đang tải và xử lý dữ liệu..."):
-            portfolio = Portfolio(symbols=symbols)
-            if not portfolio.fetch_data(years=years_input):
-                st.error("Xảy ra lỗi khi tải dữ liệu. Vui lòng kiểm tra lại mã cổ phiếu.")
-                st.stop()
-            portfolio.calculate_stats()
-        
+        portfolio.calculate_stats(cov_method=cov_method_input, n_factors=n_factors_input)
+        risk_engine = RiskEngine(portfolio, confidence=var_confidence_input, horizon_days=var_horizon_input)
+
+    # Kết quả được lưu trong session_state để các lần chạy lại của trang (ví dụ khi chọn
+    # một điểm trên đường biên hiệu quả) không phải tính toán lại.
+    results = {
+        'portfolio': portfolio,
+        'symbols': symbols,
+        'method': method_input,
+        'cash_weight': cash_weight_input,
+        'risk_free_rate': risk_free_rate_input,
+        'var_confidence': var_confidence_input,
+        'var_horizon': var_horizon_input,
+    }
+
+    if method_input == "hrp":
+        with st.spinner("Đang phân bổ theo Hierarchical Risk Parity..."):
+            hrp_port = portfolio.run_hrp(
+                risk_free_rate=risk_free_rate_input,
+                min_weight=min_weight_input,
+                max_weight=max_weight_input
+            )
+            results['hrp'] = hrp_port
+            results['hrp_risk'] = risk_engine.compute(hrp_port[symbols].values, cash_weight_input, risk_free_rate_input).iloc[0]
+    else:
         with st.spinner(f"Thực hiện mô phỏng Monte Carlo ({MONTE_CARLO_ITERATIONS} lần)... Điều này có thể mất chút thời gian với các ràng buộc chặt."):
             # --- TRUYỀN RÀNG BUỘC VÀO HÀM ---
             mc_results = portfolio.run_monte_carlo(
-                risk_free_rate=risk_free_rate_input, 
+                risk_free_rate=risk_free_rate_input,
                 iterations=MONTE_CARLO_ITERATIONS,
                 min_weight=min_weight_input,
                 max_weight=max_weight_input
@@ -117,10 +221,105 @@ if st.sidebar.button("🚀 Chạy Tối ưu hóa", use_container_width=True):
             st.stop()
 
         max_sharpe_port, max_return_port = portfolio.get_optimal_portfolios_from_mc(mc_results)
-
         if max_sharpe_port.empty or max_return_port.empty:
-             st.warning("Không tìm thấy danh mục tối ưu. Vui lòng thử lại.")
-             st.stop()
+            st.warning("Không tìm thấy danh mục tối ưu. Vui lòng thử lại.")
+            st.stop()
+
+        with st.spinner("Đang tính rủi ro và hiệu suất lịch sử cho toàn bộ danh mục mô phỏng..."):
+            mc_weights = mc_results[symbols].values
+            results['mc_results'] = mc_results
+            results['mc_risk'] = risk_engine.compute(mc_weights, cash_weight_input, risk_free_rate_input)
+            # Hiệu suất 1 năm của mọi điểm trên đường biên được tính sẵn trong một lần
+            curves, benchmark_curve, _ = portfolio.calculate_cumulative_performance_batch(
+                mc_weights, cash_weight_input, risk_free_rate_input
+            )
+            results['mc_curves'] = curves
+            results['benchmark_curve'] = benchmark_curve
+            results['max_sharpe'] = max_sharpe_port
+            results['max_return'] = max_return_port
+
+    if run_stress_input:
+        try:
+            with st.spinner("Đang đánh giá các kịch bản sốc cho toàn bộ danh mục..."):
+                stress_weights = results['hrp'][symbols].values if method_input == "hrp" else results['mc_results'][symbols].values
+                extra_shocks = {}
+                if custom_shocks_input.strip():
+                    extra_shocks['Cú sốc tùy chỉnh'] = parse_shock_lines(custom_shocks_input, portfolio.benchmark)
+                results['stress'] = ScenarioEngine(portfolio).evaluate(
+                    stress_weights, cash_weight_input, risk_free_rate_input, extra_shocks
+                )
+        except Exception as e:
+            results['stress_error'] = str(e)
+
+    if run_forward_input:
+        try:
+            with st.spinner("Đang mô phỏng giá trị danh mục trong tương lai..."):
+                if method_input == "hrp":
+                    forward_portfolios = {"Danh mục HRP": results['hrp']}
+                else:
+                    forward_portfolios = {"Sharpe Tối đa": results['max_sharpe'], "Lợi nhuận Tối đa": results['max_return']}
+                simulator = ForwardSimulator(portfolio, method=forward_method_map[forward_method_label],
+                                             horizon_days=forward_horizon_input, n_paths=forward_paths_input)
+                results['forward'] = {
+                    label: simulator.simulate(series[symbols].values, cash_weight_input, risk_free_rate_input,
+                                              loss_threshold=forward_loss_input, target_return=forward_target_input)
+                    for label, series in forward_portfolios.items()
+                }
+                results['forward_thresholds'] = (forward_loss_input, forward_target_input)
+        except Exception as e:
+            results['forward_error'] = str(e)
+
+    if run_backtest_input:
+        try:
+            with st.spinner("Đang chạy kiểm định walk-forward..."):
+                backtester = WalkForwardBacktester(
+                    portfolio,
+                    lookback_days=lookback_months_input * 21,
+                    rebalance=rebalance_map[rebalance_label],
+                    transaction_cost=transaction_cost_input,
+                    min_weight=min_weight_input,
+                    max_weight=max_weight_input,
+                    cash_weight=cash_weight_input,
+                    risk_free_rate=risk_free_rate_input
+                )
+                results['backtest'] = backtester.run()
+        except ValueError as e:
+            results['backtest_error'] = str(e)
+
+    st.session_state.allocation_results = results
+
+
+def _precomputed_performance(results: dict, row_label) -> pd.DataFrame:
+    """Lấy đường hiệu suất đã tính sẵn của một danh mục Monte Carlo."""
+    return pd.DataFrame({
+        'Danh mục': results['mc_curves'][row_label],
+        results['portfolio'].benchmark: results['benchmark_curve'],
+    })
+
+
+results = st.session_state.get('allocation_results')
+if results:
+    portfolio = results['portfolio']
+    symbols = results['symbols']
+
+    if results['method'] == "hrp":
+        st.header("Kết quả Phân bổ Danh mục")
+        display_portfolio_details(
+            portfolio_obj=portfolio,
+            portfolio_series=results['hrp'],
+            cash_weight=results['cash_weight'],
+            risk_free_rate=results['risk_free_rate'],
+            symbols=symbols,
+            title="Danh mục HRP",
+            risk_metrics=results['hrp_risk'],
+            var_confidence=results['var_confidence'],
+            var_horizon=results['var_horizon']
+        )
+    else:
+        mc_results = results['mc_results']
+        mc_risk = results['mc_risk']
+        max_sharpe_port = results['max_sharpe']
+        max_return_port = results['max_return']
 
         st.header("Kết quả Tối ưu hóa Danh mục")
         st.info("Dưới đây là hai danh mục nổi bật được tìm thấy từ hàng ngàn kịch bản mô phỏng.")
@@ -131,22 +330,30 @@ if st.sidebar.button("🚀 Chạy Tối ưu hóa", use_container_width=True):
             display_portfolio_details(
                 portfolio_obj=portfolio,
                 portfolio_series=max_sharpe_port,
-                cash_weight=cash_weight_input,
-                risk_free_rate=risk_free_rate_input,
+                cash_weight=results['cash_weight'],
+                risk_free_rate=results['risk_free_rate'],
                 symbols=symbols,
-                title="Danh mục Sharpe Tối đa"
+                title="Danh mục Sharpe Tối đa",
+                risk_metrics=mc_risk.loc[max_sharpe_port.name],
+                performance_df=_precomputed_performance(results, max_sharpe_port.name),
+                var_confidence=results['var_confidence'],
+                var_horizon=results['var_horizon']
             )
 
         with tab2:
             display_portfolio_details(
                 portfolio_obj=portfolio,
                 portfolio_series=max_return_port,
-                cash_weight=cash_weight_input,
-                risk_free_rate=risk_free_rate_input,
+                cash_weight=results['cash_weight'],
+                risk_free_rate=results['risk_free_rate'],
                 symbols=symbols,
-                title="Danh mục Lợi nhuận Tối đa"
+                title="Danh mục Lợi nhuận Tối đa",
+                risk_metrics=mc_risk.loc[max_return_port.name],
+                performance_df=_precomputed_performance(results, max_return_port.name),
+                var_confidence=results['var_confidence'],
+                var_horizon=results['var_horizon']
             )
-        
+
         st.markdown("---")
         st.header("So sánh Phân bổ Danh mục theo Ngành")
 
@@ -157,11 +364,11 @@ if st.sidebar.button("🚀 Chạy Tối ưu hóa", use_container_width=True):
             sharpe_stock_weights = max_sharpe_port[symbols]
             sharpe_weights_df = pd.DataFrame(sharpe_stock_weights).rename(columns={max_sharpe_port.name: 'Tỷ trọng'})
             sharpe_weights_df = sharpe_weights_df[sharpe_weights_df['Tỷ trọng'] > 0.001]
-            
+        
             if not sharpe_weights_df.empty:
                 sharpe_echarts_json = prepare_echarts_sunburst_data(sharpe_weights_df.copy())
                 sharpe_echarts_data = json.loads(sharpe_echarts_json)
-                
+            
                 echarts_html_sharpe = f"""
                 <div id="echarts_sharpe" style="width: 100%; height: 500px;"></div>
                 <script src="https://cdn.jsdelivr.net/npm/echarts@5.4.3/dist/echarts.min.js"></script>
@@ -192,7 +399,7 @@ if st.sidebar.button("🚀 Chạy Tối ưu hóa", use_container_width=True):
             if not return_weights_df.empty:
                 return_echarts_json = prepare_echarts_sunburst_data(return_weights_df.copy())
                 return_echarts_data = json.loads(return_echarts_json)
-                
+            
                 echarts_html_return = f"""
                 <div id="echarts_return" style="width: 100%; height: 500px;"></div>
                 <script src="https://cdn.jsdelivr.net/npm/echarts@5.4.3/dist/echarts.min.js"></script>
@@ -216,5 +423,118 @@ if st.sidebar.button("🚀 Chạy Tối ưu hóa", use_container_width=True):
 
         st.markdown("---")
         st.header("Đường biên Hiệu quả & Các Danh mục Mô phỏng")
+        st.caption("Nhấn vào một điểm bất kỳ trên biểu đồ để xem chi tiết và hiệu suất lịch sử của danh mục đó.")
         fig_ef = plot_efficient_frontier(mc_results, portfolio.symbols)
-        st.plotly_chart(fig_ef, use_container_width=True)
\ No newline at end of file
+        frontier_event = st.plotly_chart(fig_ef, use_container_width=True, on_select="rerun",
+                                         selection_mode="points", key="frontier_chart")
+
+        selected_points = frontier_event.selection.points if frontier_event else []
+        if selected_points:
+            point = selected_points[0]
+            # Trace 0 chứa toàn bộ danh mục mô phỏng; trace 1 và 2 là hai điểm nổi bật
+            if point['curve_number'] == 0 and point['point_index'] < len(mc_results):
+                selected_label = mc_results.index[point['point_index']]
+            elif point['curve_number'] == 1:
+                selected_label = mc_results['sharpe'].idxmax()
+            else:
+                selected_label = mc_results['volatility'].idxmin()
+            st.markdown("---")
+            display_portfolio_details(
+                portfolio_obj=portfolio,
+                portfolio_series=mc_results.loc[selected_label],
+                cash_weight=results['cash_weight'],
+                risk_free_rate=results['risk_free_rate'],
+                symbols=symbols,
+                title=f"Danh mục được chọn #{selected_label}",
+                risk_metrics=mc_risk.loc[selected_label],
+                performance_df=_precomputed_performance(results, selected_label),
+                var_confidence=results['var_confidence'],
+                var_horizon=results['var_horizon']
+            )
+
+    if 'stress' in results or 'stress_error' in results:
+        st.markdown("---")
+        st.header("Kiểm tra Sức chịu đựng")
+        st.caption("Kịch bản lịch sử đo từ đỉnh đến đáy của VNINDEX; số phiên hồi phục tính từ đáy đến khi danh mục trở lại đỉnh cũ. "
+                   "Với cú sốc giả định, số phiên hồi phục được ước lượng theo tốc độ tăng trưởng lịch sử của danh mục.")
+        stress = results.get('stress')
+        if 'stress_error' in results or stress is None or stress.empty:
+            st.warning(f"Không thể đánh giá kịch bản: {results.get('stress_error', 'không đủ dữ liệu')}")
+        else:
+            if results['method'] == "hrp":
+                highlighted = {"Danh mục HRP": 0}
+            else:
+                highlighted = {"Sharpe Tối đa": results['max_sharpe'].name, "Lợi nhuận Tối đa": results['max_return'].name}
+            scenario_order = list(dict.fromkeys(stress['scenario']))
+            returns_table = pd.DataFrame({
+                label: stress[stress['portfolio'] == row].set_index('scenario')['return'] for label, row in highlighted.items()
+            }).reindex(scenario_order)
+            returns_table[portfolio.benchmark] = stress.drop_duplicates('scenario').set_index('scenario')['benchmark_return']
+            st.plotly_chart(plot_stress_test(returns_table), use_container_width=True)
+
+            for label, row in highlighted.items():
+                st.subheader(label)
+                detail = stress[stress['portfolio'] == row].set_index('scenario')[
+                    ['return', 'max_drawdown', 'days_to_trough', 'recovery_days', 'coverage']
+                ].rename(columns={'return': 'Lợi suất', 'max_drawdown': 'Sụt giảm tối đa', 'days_to_trough': 'Phiên đến đáy',
+                                  'recovery_days': 'Phiên hồi phục', 'coverage': 'Tỷ trọng có dữ liệu'})
+                st.dataframe(detail.style.format({'Lợi suất': "{:.2%}", 'Sụt giảm tối đa': "{:.2%}", 'Phiên đến đáy': "{:.0f}",
+                                                  'Phiên hồi phục': "{:.0f}", 'Tỷ trọng có dữ liệu': "{:.0%}"}, na_rep="Chưa hồi phục"),
+                             use_container_width=True)
+
+            if results['method'] != "hrp":
+                st.subheader("Danh mục mô phỏng chịu sốc tốt nhất")
+                st.caption("Xếp theo mức sụt giảm trong kịch bản tệ nhất của từng danh mục.")
+                worst = worst_case_summary(stress).join(results['mc_results'][['return', 'volatility', 'sharpe']])
+                st.dataframe(worst.nsmallest(10, 'worst_drawdown').rename(columns={
+                    'worst_scenario': 'Kịch bản tệ nhất', 'worst_drawdown': 'Sụt giảm tệ nhất',
+                    'worst_recovery_days': 'Phiên hồi phục', 'mean_drawdown': 'Sụt giảm trung bình',
+                    'return': 'Lợi nhuận kỳ vọng', 'volatility': 'Rủi ro', 'sharpe': 'Sharpe'
+                }).style.format({'Sụt giảm tệ nhất': "{:.2%}", 'Phiên hồi phục': "{:.0f}", 'Sụt giảm trung bình': "{:.2%}",
+                                 'Lợi nhuận kỳ vọng': "{:.2%}", 'Rủi ro': "{:.2%}", 'Sharpe': "{:.2f}"}, na_rep="-"),
+                             use_container_width=True)
+
+    if 'forward' in results or 'forward_error' in results:
+        st.markdown("---")
+        st.header("Mô phỏng Giá trị Danh mục trong Tương lai")
+        if 'forward_error' in results:
+            st.warning(f"Không thể mô phỏng: {results['forward_error']}")
+        else:
+            loss_threshold, target_return = results['forward_thresholds']
+            st.caption(f"Giá trị ban đầu = 1. Dải màu là các khoảng phân vị 5-95% và 25-75% theo từng phiên; "
+                       f"xác suất chạm tính trên toàn bộ đường (ngưỡng lỗ -{loss_threshold:.0%}, mục tiêu +{target_return:.0%}).")
+            forward_tabs = st.tabs(list(results['forward']))
+            for tab, (label, forward) in zip(forward_tabs, results['forward'].items()):
+                with tab:
+                    summary = forward['summary']
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("Lợi suất kỳ vọng", f"{summary['expected_return']:.2%}")
+                    col2.metric("Xác suất lỗ cuối kỳ", f"{summary['prob_terminal_loss']:.1%}")
+                    col3.metric(f"Xác suất chạm -{loss_threshold:.0%}", f"{summary['prob_hit_loss']:.1%}")
+                    col4.metric(f"Xác suất chạm +{target_return:.0%}", f"{summary['prob_hit_target']:.1%}")
+                    st.plotly_chart(plot_forward_simulation(forward['fan'], forward['hit_probability'],
+                                                            loss_value=1 - loss_threshold, target_value=1 + target_return,
+                                                            title=f"Mô phỏng {label}"), use_container_width=True)
+                    terminal = summary[[c for c in summary.index if c.startswith('terminal_p')]]
+                    st.dataframe(pd.DataFrame({
+                        'Giá trị cuối kỳ': terminal.values,
+                        'Lợi suất': terminal.values - 1,
+                    }, index=[c.replace('terminal_p', 'Phân vị ') + '%' for c in terminal.index]).style.format({
+                        'Giá trị cuối kỳ': "{:.3f}", 'Lợi suất': "{:.2%}"
+                    }), use_container_width=True)
+                    st.caption(f"Sụt giảm tối đa trong kỳ: trung vị {summary['median_max_drawdown']:.2%}, "
+                               f"5% số đường tệ nhất vượt {summary['max_drawdown_p95']:.2%}.")
+
+    if 'backtest' in results or 'backtest_error' in results:
+        st.markdown("---")
+        st.header("Kiểm định Walk-forward (Sharpe Tối đa)")
+        st.caption("Tại mỗi kỳ tái cân bằng, danh mục được tối ưu lại trên cửa sổ dữ liệu trước đó với cùng ràng buộc và chi phí giao dịch.")
+        if 'backtest_error' in results:
+            st.warning(f"Không thể chạy kiểm định: {results['backtest_error']}")
+        else:
+            backtest = results['backtest']
+            st.plotly_chart(plot_cumulative_returns(backtest['equity'], title="Hiệu suất Walk-forward"), use_container_width=True)
+            st.dataframe(backtest['stats'].style.format({
+                'cagr': "{:.2%}", 'volatility': "{:.2%}", 'sharpe': "{:.2f}",
+                'max_drawdown': "{:.2%}", 'max_drawdown_days': "{:.0f}", 'annual_turnover': "{:.2f}"
+            }, na_rep="-"))
@@ -0,0 +1,87 @@
+# goldenkey_project/pages/3_📥_Tải_dữ_liệu.py
+import sys
+import os
+import tempfile
+import streamlit as st
+
+# Thêm thư mục gốc của dự án vào Python Path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.exporter import export_price_history, EXPORT_FORMATS
+from utils.helpers import validate_symbols, format_invalid_symbols
+from config import DEFAULT_STOCK_SYMBOLS
+
+st.set_page_config(page_title="Tải dữ liệu", page_icon="📥", layout="wide")
+
+st.title("📥 Tải dữ liệu giá lịch sử")
+st.markdown("Xuất dữ liệu giá của nhiều mã cổ phiếu ra Excel, CSV hoặc Parquet. "
+            "Dữ liệu được tải song song và ghi dần ra file nên có thể xuất hàng trăm mã cùng lúc.")
+st.markdown("---")
+
+# --- Giao diện nhập liệu ---
+symbols_input = st.text_area(
+    "Nhập các mã cổ phiếu (cách nhau bởi dấu phẩy hoặc xuống dòng):",
+    ", ".join(DEFAULT_STOCK_SYMBOLS),
+)
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    years_input = st.slider("Số năm dữ liệu:", 1, 10, 3)
+with col2:
+    interval_map = {'Ngày': '1D', 'Tuần': '1W', 'Tháng': '1M'}
+    interval_label = st.selectbox("Khung thời gian:", list(interval_map.keys()))
+with col3:
+    format_map = {'Excel (.xlsx)': 'excel', 'CSV (.csv)': 'csv', 'Parquet (.parquet)': 'parquet'}
+    format_label = st.selectbox("Định dạng:", list(format_map.keys()))
+with col4:
+    workers_input = st.number_input("Số luồng tải song song:", min_value=1, max_value=32, value=8)
+
+if st.button("🚀 Xuất dữ liệu", use_container_width=True):
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols_input.replace('\n', ',').split(',') if s.strip()))
+    symbols, invalid_symbols = validate_symbols(symbols)
+    if invalid_symbols:
+        st.warning(f"{format_invalid_symbols(invalid_symbols)}. Các mã này sẽ bị bỏ qua.")
+    if not symbols:
+        st.warning("Vui lòng nhập ít nhất một mã cổ phiếu.")
+        st.stop()
+
+    fmt = format_map[format_label]
+    extension, _ = EXPORT_FORMATS[fmt]
+    # Xóa file của lần xuất trước (nếu có) trước khi tạo file mới
+    previous = st.session_state.pop('export_result', None)
+    if previous and os.path.exists(previous['path']):
+        os.remove(previous['path'])
+
+    handle, path = tempfile.mkstemp(prefix="goldenkey_export_", suffix=f".{extension}")
+    os.close(handle)
+
+    progress_bar = st.progress(0.0, text="Đang tải dữ liệu...")
+
+    def update_progress(done: int, total: int, symbol: str, rows: int):
+        progress_bar.progress(done / total, text=f"Đã xử lý {done}/{total} mã ({symbol}: {rows} dòng)")
+
+    try:
+        summary = export_price_history(symbols, path, fmt=fmt, years=years_input,
+                                       interval=interval_map[interval_label],
+                                       max_workers=int(workers_input), on_progress=update_progress)
+    except Exception as e:
+        os.remove(path)
+        st.error(f"Lỗi khi xuất dữ liệu: {e}")
+        st.stop()
+
+    st.session_state.export_result = {'path': path, 'fmt': fmt, 'summary': summary}
+
+# --- Hiển thị kết quả và nút tải về ---
+result = st.session_state.get('export_result')
+if result and os.path.exists(result['path']):
+    summary = result['summary']
+    failed = summary.loc[summary['rows'] == 0, 'symbol'].tolist()
+    st.success(f"Đã xuất {len(summary) - len(failed)}/{len(summary)} mã, tổng cộng {summary['rows'].sum():,} dòng.")
+    if failed:
+        st.warning(f"Không tải được dữ liệu cho các mã: {', '.join(failed)}")
+
+    extension, mime = EXPORT_FORMATS[result['fmt']]
+    with open(result['path'], 'rb') as f:
+        st.download_button("💾 Tải file về", data=f, file_name=f"goldenkey_price_history.{extension}",
+                           mime=mime, use_container_width=True)
+    with st.expander("Chi tiết số dòng theo từng mã"):
+        st.dataframe(summary, use_container_width=True)
@@ -0,0 +1,126 @@
+# goldenkey_project/pages/4_📡_Theo_dõi_Danh_mục.py
+import sys
+import os
+from datetime import datetime
+import streamlit as st
+
+# Thêm thư mục gốc của dự án vào Python Path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.monitor import PortfolioMonitor, SimulatedTickSource, VnstockQuoteSource
+from core.stock import Stock
+
+st.set_page_config(page_title="Theo dõi Danh mục", page_icon="📡", layout="wide")
+
+st.title("📡 Theo dõi Danh mục trong phiên")
+st.markdown("Cập nhật giá trị, lãi/lỗ và độ lệch tỷ trọng so với phân bổ mục tiêu của các danh mục theo giá khớp mới nhất.")
+st.markdown("---")
+
+
+def _last_closes(symbols: list) -> dict:
+    """Giá đóng cửa gần nhất, dùng làm giá khởi điểm cho nguồn giá giả lập."""
+    closes = {}
+    for symbol in symbols:
+        df = Stock(symbol=symbol).fetch_price_history(days=14)
+        if not df.empty:
+            closes[symbol] = float(df['close'].iloc[-1])
+    return closes
+
+
+def _parse_weights(text: str) -> dict:
+    """Đọc tỷ trọng dạng 'FPT:0.4, HPG:0.6' và chuẩn hóa về tổng bằng 1."""
+    weights = {}
+    for part in text.split(','):
+        if ':' in part:
+            symbol, weight = part.split(':', 1)
+            weights[symbol.strip().upper()] = float(weight)
+    total = sum(weights.values())
+    if not weights or total <= 0:
+        raise ValueError("Cần ít nhất một mã với tỷ trọng dương.")
+    return {s: w / total for s, w in weights.items()}
+
+
+# --- Cấu hình ---
+st.sidebar.header("Cấu hình Theo dõi")
+source_map = {"Bảng giá trực tiếp": "live", "Giả lập (kiểm thử)": "simulated"}
+source_label = st.sidebar.selectbox("Nguồn giá", list(source_map.keys()))
+source_mode = source_map[source_label]
+refresh_seconds = st.sidebar.slider("Chu kỳ cập nhật (giây)", 0.5, 10.0, 2.0, 0.5)
+paused = st.sidebar.checkbox("Tạm dừng cập nhật", value=False)
+capital_input = st.sidebar.number_input("Vốn mỗi danh mục (triệu đồng)", min_value=1.0, value=1000.0, step=100.0) * 1e6
+
+if st.session_state.get('monitor_source_mode') != source_mode:
+    source = VnstockQuoteSource() if source_mode == 'live' else SimulatedTickSource({})
+    st.session_state.monitor = PortfolioMonitor(source)
+    st.session_state.monitor_source_mode = source_mode
+monitor: PortfolioMonitor = st.session_state.monitor
+
+with st.expander("➕ Thêm danh mục thủ công"):
+    c1, c2, c3 = st.columns([1, 3, 1])
+    manual_name = c1.text_input("Tên danh mục", "Danh mục tự chọn")
+    manual_weights = c2.text_input("Tỷ trọng cổ phiếu (ví dụ: FPT:0.4, HPG:0.3, ACB:0.3)")
+    manual_cash = c3.slider("Tiền mặt (%)", 0, 100, 0, 1) / 100
+    if st.button("Thêm danh mục"):
+        try:
+            st.session_state.setdefault('monitored_portfolios', {})[manual_name] = {
+                'weights': _parse_weights(manual_weights), 'cash_weight': manual_cash,
+            }
+        except ValueError as e:
+            st.error(f"Tỷ trọng không hợp lệ: {e}")
+
+# Đưa các danh mục được chọn (từ trang Phân bổ Danh mục hoặc thêm thủ công) vào bộ theo dõi
+pending = {name: spec for name, spec in st.session_state.get('monitored_portfolios', {}).items() if name not in monitor.names}
+if pending:
+    with st.spinner("Đang mở vị thế cho các danh mục mới..."):
+        if isinstance(monitor.source, SimulatedTickSource):
+            needed = sorted({s for spec in pending.values() for s in spec['weights']} - set(monitor.source.prices))
+            monitor.source.add_symbols(_last_closes(needed))
+        for name, spec in pending.items():
+            try:
+                monitor.add_portfolio(name, spec['weights'], spec['cash_weight'], capital=capital_input)
+            except ValueError as e:
+                st.error(f"Không thể theo dõi '{name}': {e}")
+
+if not monitor.names:
+    st.info("Chưa có danh mục nào. Hãy bấm \"📡 Theo dõi danh mục này\" ở trang Phân bổ Danh mục hoặc thêm danh mục thủ công.")
+    st.stop()
+
+
+# Chỉ phần này được chạy lại theo chu kỳ, không chạy lại toàn bộ trang
+@st.fragment(run_every=None if paused else refresh_seconds)
+def render_monitor():
+    changed = monitor.poll_once() if not paused else 0
+    summary = monitor.summary()
+
+    total_value = summary['value'].sum()
+    total_pnl = summary['pnl'].sum()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Tổng giá trị", f"{total_value:,.0f} đ")
+    c2.metric("Tổng lãi/lỗ", f"{total_pnl:,.0f} đ", f"{total_pnl / (total_value - total_pnl):.2%}")
+    c3.metric("Độ lệch tỷ trọng lớn nhất", f"{summary['max_drift'].max():.2%}")
+
+    st.dataframe(
+        summary.rename(columns={'value': 'Giá trị', 'pnl': 'Lãi/lỗ', 'pnl_pct': 'Lãi/lỗ (%)', 'max_drift': 'Độ lệch lớn nhất'})
+               .style.format({'Giá trị': "{:,.0f}", 'Lãi/lỗ': "{:,.0f}", 'Lãi/lỗ (%)': "{:.2%}", 'Độ lệch lớn nhất': "{:.2%}"}),
+        use_container_width=True,
+    )
+
+    selected = st.selectbox("Chi tiết danh mục", monitor.names, key="monitor_detail")
+    positions = monitor.positions(selected).rename(columns={
+        'price': 'Giá', 'shares': 'Số CP', 'value': 'Giá trị', 'weight': 'Tỷ trọng',
+        'target': 'Mục tiêu', 'drift': 'Độ lệch',
+    })
+    st.dataframe(positions.style.format({
+        'Giá': "{:,.2f}", 'Số CP': "{:,.0f}", 'Giá trị': "{:,.0f}", 'Tỷ trọng': "{:.2%}",
+        'Mục tiêu': "{:.2%}", 'Độ lệch': "{:+.2%}", 'MACD': "{:.3f}", 'MACD_signal': "{:.3f}", 'RSI': "{:.1f}",
+    }), use_container_width=True)
+    st.caption(f"Cập nhật lúc {datetime.now():%H:%M:%S} — {changed} mã thay đổi giá trong lần cập nhật này. "
+               "MACD/RSI được tính tăng dần theo từng lần giá thay đổi kể từ khi bắt đầu theo dõi.")
+
+
+render_monitor()
+
+if st.sidebar.button("🗑️ Xóa tất cả danh mục đang theo dõi"):
+    st.session_state.monitored_portfolios = {}
+    st.session_state.pop('monitor_source_mode', None)
+    st.rerun()
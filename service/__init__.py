@@ -0,0 +1,2 @@
+# goldenkey_project/service/__init__.py
+# Dịch vụ tính toán dùng chung (server HTTP + pool tiến trình) và client cho các trang Streamlit.
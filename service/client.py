@@ -0,0 +1,227 @@
+# goldenkey_project/service/client.py
+"""
+Client của dịch vụ tính toán dùng chung (service/server.py) cho các trang Streamlit.
+
+`RemoteStock`, `RemotePortfolio` và `RemoteAnalyzer` có cùng giao diện với `Stock`,
+`Portfolio` và `StockAIAnalyzer` nhưng gửi các thao tác tải dữ liệu, tính toán nặng và gọi AI
+tới dịch vụ. Trang Phân tích Cổ phiếu chỉ còn hiển thị kết quả; ở trang Phân bổ Danh mục,
+rủi ro, kịch bản, mô phỏng và kiểm định walk-forward vẫn chạy tại chỗ trên bảng giá lấy từ
+dịch vụ, còn các trang Tải dữ liệu/Theo dõi Danh mục chưa dùng dịch vụ. Các hàm `create_stock`, `create_portfolio` và
+`create_analyzer` trả về bản từ xa khi GOLDENKEY_SERVICE_URL được đặt, ngược lại trả về lớp
+gốc chạy trong tiến trình như trước.
+
+Khi có nhiều địa chỉ dịch vụ, yêu cầu được định tuyến theo mã cổ phiếu (cùng một mã luôn tới
+cùng một node để tận dụng cache) và chuyển sang node kế tiếp nếu node đó không phản hồi.
+"""
+import json
+import threading
+import urllib.error
+import urllib.request
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import SERVICE_TIMEOUT, SERVICE_TOKEN, SERVICE_URL
+from core.portfolio import Portfolio
+from core.stock import Stock
+from service.operations import decode_result, frame_to_json
+
+
+class ServiceError(RuntimeError):
+    """Lỗi khi gọi dịch vụ tính toán (không kết nối được hoặc dịch vụ báo lỗi)."""
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Không thể chuyển {type(value).__name__} sang JSON.")
+
+
+class ServiceClient:
+    """Gửi thao tác tới một hoặc nhiều node dịch vụ qua HTTP."""
+
+    def __init__(self, urls: List[str], token: str = SERVICE_TOKEN, timeout: float = SERVICE_TIMEOUT):
+        self.urls = [u.strip().rstrip('/') for u in urls if u.strip()]
+        if not self.urls:
+            raise ValueError("Cần ít nhất một địa chỉ dịch vụ.")
+        self.token = token
+        self.timeout = timeout
+
+    def _nodes_for(self, routing_key: str) -> List[str]:
+        start = zlib.crc32(routing_key.encode('utf-8')) % len(self.urls)
+        return self.urls[start:] + self.urls[:start]
+
+    def call(self, op: str, routing_key: str = '', **params) -> Any:
+        body = json.dumps(params, default=_json_default).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['X-Goldenkey-Token'] = self.token
+
+        last_error = None
+        for url in self._nodes_for(routing_key or op):
+            request = urllib.request.Request(f"{url}/call/{op}", data=body, headers=headers, method='POST')
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    payload, kind = response.read(), response.headers.get('X-Goldenkey-Result', 'json')
+                return decode_result(payload, kind)
+            except urllib.error.HTTPError as e:
+                try:
+                    message = json.loads(e.read()).get('error', str(e))
+                except ValueError:
+                    message = str(e)
+                raise ServiceError(f"Dịch vụ báo lỗi khi thực thi '{op}': {message}") from e
+            except (urllib.error.URLError, OSError) as e:
+                # Node không phản hồi: thử node kế tiếp
+                last_error = e
+            except ValueError as e:
+                raise ServiceError(f"Không đọc được kết quả của '{op}': {e}") from e
+        raise ServiceError(f"Không thể kết nối tới dịch vụ tính toán ({', '.join(self.urls)}): {last_error}")
+
+    def health(self, url: str = None) -> Dict[str, Any]:
+        request = urllib.request.Request(f"{url or self.urls[0]}/health",
+                                         headers={'X-Goldenkey-Token': self.token} if self.token else {})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+
+_client: Optional[ServiceClient] = None
+_client_lock = threading.Lock()
+
+
+def get_service_client() -> Optional[ServiceClient]:
+    """Client dùng chung của tiến trình; None nếu không cấu hình GOLDENKEY_SERVICE_URL."""
+    global _client
+    with _client_lock:
+        if _client is None and SERVICE_URL:
+            _client = ServiceClient(SERVICE_URL.split(','))
+        return _client
+
+
+class RemoteStock(Stock):
+    """`Stock` lấy dữ liệu (giá đã tính chỉ báo, hồ sơ, báo cáo, tin tức) từ dịch vụ."""
+
+    def __init__(self, symbol: str, client: ServiceClient):
+        super().__init__(symbol)
+        self.client = client
+
+    def _call(self, op: str, **params) -> pd.DataFrame:
+        try:
+            return self.client.call(op, routing_key=self.symbol, symbol=self.symbol, **params)
+        except ServiceError as e:
+            print(f"Lỗi khi lấy dữ liệu cho {self.symbol}: {e}")
+            return pd.DataFrame()
+
+    def fetch_price_history(self, years: int = 3, interval: str = '1D', days: int = None) -> pd.DataFrame:
+        self.price_history = self._call('stock_price_history', years=years, interval=interval, days=days)
+        return self.price_history
+
+    def calculate_technical_indicators(self):
+        # Dịch vụ đã tính sẵn chỉ báo cùng với giá
+        if 'RSI' not in self.price_history.columns:
+            super().calculate_technical_indicators()
+
+    def get_company_profile(self) -> pd.DataFrame:
+        return self._call('stock_company_profile')
+
+    def get_financial_report(self, report_type: str, period: str = 'quarter', years: int = 3) -> pd.DataFrame:
+        return self._call('stock_financial_report', report_type=report_type, period=period, years=years)
+
+    def get_peer_comparison(self, period: str = 'quarter') -> pd.DataFrame:
+        return self._call('stock_peer_comparison', period=period)
+
+    def get_related_news(self, page_size: int = 10) -> pd.DataFrame:
+        return self._call('stock_related_news', page_size=page_size)
+
+
+class RemotePortfolio(Portfolio):
+    """
+    `Portfolio` tải giá và chạy Monte Carlo/HRP trên dịch vụ. Thống kê lợi suất vẫn được tính
+    tại chỗ (nhẹ) vì các phần hiển thị, rủi ro và kiểm tra sức chịu đựng dùng trực tiếp; nhờ
+    vậy Monte Carlo/HRP cũng được tính tại chỗ nếu dịch vụ gặp lỗi.
+    """
+
+    def __init__(self, symbols: list, benchmark: str = "VNINDEX", client: ServiceClient = None):
+        super().__init__(symbols, benchmark)
+        self.client = client
+        self._remote_params = {'symbols': self.symbols, 'benchmark': self.benchmark, 'years': 3}
+
+    def _call(self, op: str, **params):
+        return self.client.call(op, routing_key=','.join(sorted(self.symbols)), **self._remote_params, **params)
+
+    def fetch_data(self, years: int = 3) -> bool:
+        self._remote_params['years'] = years
+        try:
+            self.adj_close = self._call('portfolio_prices')
+        except ServiceError as e:
+            print(f"Không thể tải dữ liệu danh mục: {e}")
+            return False
+        return not self.adj_close.empty
+
+    def calculate_stats(self, cov_method: str = 'sample', n_factors: int = None):
+        super().calculate_stats(cov_method=cov_method, n_factors=n_factors)
+        self._remote_params.update(cov_method=cov_method, n_factors=n_factors)
+
+    def run_monte_carlo(self, iterations: int = 10000, risk_free_rate: float = 0.04, min_weight: float = 0.10, max_weight: float = 0.60) -> pd.DataFrame:
+        try:
+            return self._call('portfolio_monte_carlo', iterations=iterations, risk_free_rate=risk_free_rate,
+                              min_weight=min_weight, max_weight=max_weight)
+        except ServiceError as e:
+            print(f"Lỗi khi chạy Monte Carlo trên dịch vụ, chuyển sang tính tại chỗ: {e}")
+            return super().run_monte_carlo(iterations, risk_free_rate, min_weight, max_weight)
+
+    def run_hrp(self, risk_free_rate: float = 0.04, min_weight: float = 0.0, max_weight: float = 1.0, linkage_method: str = 'single') -> pd.Series:
+        try:
+            return self._call('portfolio_hrp', risk_free_rate=risk_free_rate, min_weight=min_weight,
+                              max_weight=max_weight, linkage_method=linkage_method)
+        except ServiceError as e:
+            print(f"Lỗi khi chạy HRP trên dịch vụ, chuyển sang tính tại chỗ: {e}")
+            return super().run_hrp(risk_free_rate, min_weight, max_weight, linkage_method)
+
+
+class RemoteAnalyzer:
+    """Cùng giao diện với `StockAIAnalyzer`; lời gọi AI (và API key) nằm ở phía dịch vụ."""
+
+    def __init__(self, client: ServiceClient):
+        self.client = client
+
+    def _call(self, op: str, symbol: str, **params) -> str:
+        try:
+            return self.client.call(op, routing_key=symbol, symbol=symbol, **params)
+        except ServiceError as e:
+            return f"⚠️ Không thể tạo phân tích AI: {e}"
+
+    def analyze_technical(self, stock_obj: Stock) -> str:
+        # Mô hình chỉ dùng các phiên gần nhất; không cần gửi toàn bộ lịch sử
+        return self._call('ai_technical', stock_obj.symbol, price_history=frame_to_json(stock_obj.price_history.tail(90)))
+
+    def analyze_financial_report(self, report_df: pd.DataFrame, report_name: str, symbol: str) -> str:
+        return self._call('ai_financial_report', symbol, report_name=report_name, report=frame_to_json(report_df))
+
+    def analyze_news_sentiment(self, news_df: pd.DataFrame, symbol: str) -> str:
+        return self._call('ai_news_sentiment', symbol, news=frame_to_json(news_df))
+
+    def generate_overall_summary(self, symbol: str, analyses: Dict[str, str]) -> str:
+        return self._call('ai_overall_summary', symbol, analyses=analyses)
+
+
+def create_stock(symbol: str) -> Stock:
+    client = get_service_client()
+    return RemoteStock(symbol, client) if client else Stock(symbol)
+
+
+def create_portfolio(symbols: list, benchmark: str = "VNINDEX") -> Portfolio:
+    client = get_service_client()
+    return RemotePortfolio(symbols, benchmark, client) if client else Portfolio(symbols, benchmark)
+
+
+def create_analyzer(api_key: str = None):
+    """Analyzer từ xa nếu có dịch vụ, ngược lại `StockAIAnalyzer` với `api_key`."""
+    client = get_service_client()
+    if client:
+        return RemoteAnalyzer(client)
+    from core.analyzer import StockAIAnalyzer
+    return StockAIAnalyzer(api_key=api_key)
@@ -0,0 +1,172 @@
+# goldenkey_project/service/operations.py
+"""
+Các thao tác mà dịch vụ tính toán cung cấp. Mỗi thao tác là một hàm cấp module chỉ nhận
+tham số kiểu JSON (mã, số, chuỗi, danh sách, DataFrame dạng JSON 'split') và trả về DataFrame,
+Series hoặc giá trị kiểu JSON. Kết quả được gửi về dạng Parquet (DataFrame, Series) hoặc JSON
+(`encode_result`/`decode_result`), nên không phía nào phải unpickle dữ liệu nhận qua mạng.
+
+Trong OPERATIONS, mỗi thao tác khai báo:
+- 'pool': 'thread' chạy ngay trong luồng xử lý yêu cầu của tiến trình dịch vụ (chủ yếu chờ
+  mạng, dùng chung nguồn dữ liệu, kho báo cáo và cache trong phiên); 'process' chạy trong
+  pool tiến trình worker (tính toán nặng CPU).
+- 'ttl': số giây kết quả được giữ trong cache dùng chung (hoặc hàm nhận tham số và trả về số giây).
+- 'prices': thao tác cần bảng giá của danh mục; dịch vụ lấy bảng giá (qua cache) rồi truyền
+  vào hàm dưới tham số `adj_close`.
+"""
+import io
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from config import GEMINI_API_KEY
+from core.intraday import is_intraday
+from core.portfolio import Portfolio
+from core.stock import Stock
+
+
+def frame_to_json(df: pd.DataFrame) -> str:
+    return df.to_json(orient='split', date_format='iso')
+
+
+def frame_from_json(payload: str) -> pd.DataFrame:
+    return pd.read_json(io.StringIO(payload), orient='split') if payload else pd.DataFrame()
+
+
+def encode_result(value: Any) -> Tuple[bytes, str]:
+    """
+    Mã hóa kết quả của một thao tác thành (nội dung, loại): 'frame' và 'series' dạng Parquet
+    (giữ nguyên kiểu dữ liệu và chỉ mục thời gian), 'json' cho các giá trị còn lại.
+    """
+    if isinstance(value, pd.Series):
+        # Cột của Parquet phải có tên kiểu chuỗi; Series không tên được lưu với tên rỗng
+        frame = value.to_frame(name='' if value.name is None else str(value.name))
+        return frame.to_parquet(), 'series'
+    if isinstance(value, pd.DataFrame):
+        return value.to_parquet(), 'frame'
+    return json.dumps(value, ensure_ascii=False).encode('utf-8'), 'json'
+
+
+def decode_result(body: bytes, kind: str) -> Any:
+    """Ngược lại của `encode_result`."""
+    if kind == 'json':
+        return json.loads(body)
+    if kind not in ('frame', 'series'):
+        raise ValueError(f"Loại kết quả không được hỗ trợ: {kind}")
+    frame = pd.read_parquet(io.BytesIO(body))
+    if kind == 'frame':
+        return frame
+    series = frame.iloc[:, 0]
+    return series.rename(series.name or None)
+
+
+# --- Cổ phiếu ---
+
+def stock_price_history(symbol: str, years: int = 3, interval: str = '1D', days: int = None) -> pd.DataFrame:
+    """Giá lịch sử đã tính sẵn chỉ báo kỹ thuật."""
+    stock = Stock(symbol)
+    if not stock.fetch_price_history(years=years, interval=interval, days=days).empty:
+        stock.calculate_technical_indicators()
+    return stock.price_history
+
+
+def stock_company_profile(symbol: str) -> pd.DataFrame:
+    return Stock(symbol).get_company_profile()
+
+
+def stock_financial_report(symbol: str, report_type: str, period: str = 'quarter', years: int = 3) -> pd.DataFrame:
+    return Stock(symbol).get_financial_report(report_type, period=period, years=years)
+
+
+def stock_peer_comparison(symbol: str, period: str = 'quarter') -> pd.DataFrame:
+    return Stock(symbol).get_peer_comparison(period=period)
+
+
+def stock_related_news(symbol: str, page_size: int = 10) -> pd.DataFrame:
+    return Stock(symbol).get_related_news(page_size=page_size)
+
+
+# --- Danh mục ---
+
+def portfolio_prices(symbols: List[str], benchmark: str = "VNINDEX", years: int = 3) -> pd.DataFrame:
+    """Bảng giá đóng cửa của danh mục (rỗng nếu không tải được)."""
+    portfolio = Portfolio(symbols, benchmark)
+    return portfolio.adj_close if portfolio.fetch_data(years=years) else pd.DataFrame()
+
+
+def _prepared_portfolio(adj_close: pd.DataFrame, symbols: List[str], benchmark: str, cov_method: str,
+                        n_factors: Optional[int]) -> Portfolio:
+    if adj_close.empty:
+        raise ValueError("Không có dữ liệu giá cho danh mục.")
+    portfolio = Portfolio(symbols, benchmark)
+    portfolio.adj_close = adj_close
+    portfolio.calculate_stats(cov_method=cov_method, n_factors=n_factors)
+    return portfolio
+
+
+def portfolio_monte_carlo(adj_close: pd.DataFrame, symbols: List[str], benchmark: str = "VNINDEX", years: int = 3,
+                          cov_method: str = 'sample', n_factors: int = None, iterations: int = 10000,
+                          risk_free_rate: float = 0.04, min_weight: float = 0.10, max_weight: float = 0.60) -> pd.DataFrame:
+    portfolio = _prepared_portfolio(adj_close, symbols, benchmark, cov_method, n_factors)
+    return portfolio.run_monte_carlo(iterations=iterations, risk_free_rate=risk_free_rate,
+                                     min_weight=min_weight, max_weight=max_weight)
+
+
+def portfolio_hrp(adj_close: pd.DataFrame, symbols: List[str], benchmark: str = "VNINDEX", years: int = 3,
+                  cov_method: str = 'sample', n_factors: int = None, risk_free_rate: float = 0.04,
+                  min_weight: float = 0.0, max_weight: float = 1.0, linkage_method: str = 'single') -> pd.Series:
+    portfolio = _prepared_portfolio(adj_close, symbols, benchmark, cov_method, n_factors)
+    return portfolio.run_hrp(risk_free_rate=risk_free_rate, min_weight=min_weight, max_weight=max_weight,
+                             linkage_method=linkage_method)
+
+
+# --- Phân tích AI (API key chỉ nằm ở phía dịch vụ) ---
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+
+def _get_analyzer():
+    global _analyzer
+    with _analyzer_lock:
+        if _analyzer is None:
+            from core.analyzer import StockAIAnalyzer
+            _analyzer = StockAIAnalyzer(api_key=GEMINI_API_KEY)
+        return _analyzer
+
+
+def ai_technical(symbol: str, price_history: str) -> str:
+    stock = Stock.__new__(Stock)
+    stock.symbol = symbol
+    stock.price_history = frame_from_json(price_history)
+    return _get_analyzer().analyze_technical(stock)
+
+
+def ai_financial_report(symbol: str, report_name: str, report: str) -> str:
+    return _get_analyzer().analyze_financial_report(frame_from_json(report), report_name, symbol)
+
+
+def ai_news_sentiment(symbol: str, news: str) -> str:
+    return _get_analyzer().analyze_news_sentiment(frame_from_json(news), symbol)
+
+
+def ai_overall_summary(symbol: str, analyses: Dict[str, str]) -> str:
+    return _get_analyzer().generate_overall_summary(symbol, analyses)
+
+
+OPERATIONS = {
+    'stock_price_history': {'fn': stock_price_history, 'pool': 'thread',
+                            'ttl': lambda params: 60 if is_intraday(params.get('interval', '1D')) else 300},
+    'stock_company_profile': {'fn': stock_company_profile, 'pool': 'thread', 'ttl': 24 * 3600},
+    'stock_financial_report': {'fn': stock_financial_report, 'pool': 'thread', 'ttl': 3600},
+    'stock_peer_comparison': {'fn': stock_peer_comparison, 'pool': 'thread', 'ttl': 3600},
+    'stock_related_news': {'fn': stock_related_news, 'pool': 'thread', 'ttl': 600},
+    'portfolio_prices': {'fn': portfolio_prices, 'pool': 'thread', 'ttl': 300},
+    'portfolio_monte_carlo': {'fn': portfolio_monte_carlo, 'pool': 'process', 'ttl': 300, 'prices': True},
+    'portfolio_hrp': {'fn': portfolio_hrp, 'pool': 'process', 'ttl': 300, 'prices': True},
+    'ai_technical': {'fn': ai_technical, 'pool': 'thread', 'ttl': 3600},
+    'ai_financial_report': {'fn': ai_financial_report, 'pool': 'thread', 'ttl': 3600},
+    'ai_news_sentiment': {'fn': ai_news_sentiment, 'pool': 'thread', 'ttl': 3600},
+    'ai_overall_summary': {'fn': ai_overall_summary, 'pool': 'thread', 'ttl': 3600},
+}
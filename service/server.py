@@ -0,0 +1,284 @@
+# goldenkey_project/service/server.py
+"""
+Dịch vụ tính toán dùng chung cho mọi phiên Streamlit (và nhiều tiến trình Streamlit).
+
+- Cache dùng chung theo (thao tác, tham số) với thời hạn riêng của từng thao tác, nên nhiều
+  người dùng xem cùng một mã hoặc cùng một danh mục chỉ tải/tính một lần.
+- Gộp yêu cầu (request coalescing): các yêu cầu giống hệt nhau đến khi kết quả đầu tiên
+  chưa xong sẽ chờ chung một Future thay vì tính lại.
+- Thao tác nặng CPU (Monte Carlo, HRP) chạy trong pool tiến trình worker nên không bị GIL
+  giới hạn và không làm chậm các phiên khác; thao tác chờ mạng chạy trong luồng xử lý yêu cầu.
+
+Giao thức: POST /call/<thao tác> với thân JSON chứa tham số, trả về kết quả dạng Parquet
+(DataFrame, Series) hoặc JSON, loại kết quả ghi trong header X-Goldenkey-Result; GET /health
+trả về thống kê dạng JSON. Không phía nào dùng pickle cho dữ liệu qua mạng. Dịch vụ mặc định
+chỉ lắng nghe trên localhost; muốn lắng nghe trên địa chỉ khác phải đặt GOLDENKEY_SERVICE_TOKEN
+(hoặc chủ động bỏ qua bằng --allow-unauthenticated).
+
+Chạy: python -m service.server --workers 4
+"""
+import argparse
+import hmac
+import inspect
+import ipaddress
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import SERVICE_HOST, SERVICE_PORT, SERVICE_TOKEN
+from service.operations import OPERATIONS, encode_result
+
+
+class InvalidParams(ValueError):
+    """Tham số của yêu cầu không khớp với chữ ký của thao tác."""
+
+
+def _is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class TTLCache:
+    """Cache kết quả có thời hạn, an toàn đa luồng; bỏ mục cũ nhất khi vượt `max_entries`."""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._data: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return False, None
+            return True, entry[1]
+
+    def set(self, key: str, value: Any, ttl: float):
+        if ttl <= 0:
+            return
+        with self._lock:
+            if len(self._data) >= self.max_entries and key not in self._data:
+                del self._data[min(self._data, key=lambda k: self._data[k][0])]
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ComputeService:
+    """Thực thi các thao tác trong OPERATIONS với cache dùng chung và gộp yêu cầu trùng."""
+
+    def __init__(self, workers: int = None, cache_entries: int = 2048):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self._pool = self._new_pool()
+        self.cache = TTLCache(cache_entries)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'cache_hits': 0, 'coalesced': 0, 'errors': 0}
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # 'spawn' để worker không kế thừa luồng/khóa của tiến trình dịch vụ
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    @staticmethod
+    def cache_key(op: str, params: Dict[str, Any]) -> str:
+        return op + ':' + json.dumps(params, sort_keys=True, default=str)
+
+    def call(self, op: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        if op not in OPERATIONS:
+            raise KeyError(f"Thao tác không được hỗ trợ: {op}")
+        params = params or {}
+        spec = OPERATIONS[op]
+        self._check_params(op, spec, params)
+        key = self.cache_key(op, params)
+
+        with self._lock:
+            self.stats['calls'] += 1
+            hit, value = self.cache.get(key)
+            if hit:
+                self.stats['cache_hits'] += 1
+                return value
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.stats['coalesced'] += 1
+        if not owner:
+            return future.result()
+
+        try:
+            value = self._execute(spec, params)
+            ttl = spec['ttl'](params) if callable(spec['ttl']) else spec['ttl']
+            self.cache.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            with self._lock:
+                self.stats['errors'] += 1
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    @staticmethod
+    def _check_params(op: str, spec: Dict[str, Any], params: Dict[str, Any]):
+        """Kiểm tra tham số theo chữ ký của hàm trước khi chạy (bảng giá do dịch vụ tự truyền vào)."""
+        injected = {'adj_close': None} if spec.get('prices') else {}
+        try:
+            inspect.signature(spec['fn']).bind(**params, **injected)
+        except TypeError as e:
+            raise InvalidParams(f"Tham số không hợp lệ cho {op}: {e}") from e
+
+    def _execute(self, spec: Dict[str, Any], params: Dict[str, Any]) -> Any:
+        kwargs = dict(params)
+        if spec.get('prices'):
+            price_params = {k: params[k] for k in ('symbols', 'benchmark', 'years') if k in params}
+            kwargs['adj_close'] = self.call('portfolio_prices', price_params)
+        if spec['pool'] == 'process':
+            pool = self._pool
+            try:
+                return pool.submit(spec['fn'], **kwargs).result()
+            except BrokenProcessPool:
+                # Một worker bị dừng đột ngột (ví dụ hết bộ nhớ): tạo lại pool cho các yêu cầu sau
+                with self._lock:
+                    if self._pool is pool:
+                        self._pool = self._new_pool()
+                raise
+        return spec['fn'](**kwargs)
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, workers=self.workers, cached=len(self.cache), inflight=len(self._inflight))
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service: ComputeService = None
+    token: str = ""
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Dict[str, str] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+    def _authorized(self) -> bool:
+        supplied = self.headers.get('X-Goldenkey-Token', '')
+        if self.token and not hmac.compare_digest(supplied.encode('utf-8'), self.token.encode('utf-8')):
+            self._send_json(403, {'error': "Sai hoặc thiếu token truy cập dịch vụ."})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == '/health':
+            self._send_json(200, self.service.health())
+        else:
+            self._send_json(404, {'error': f"Không tìm thấy: {self.path}"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if not self.path.startswith('/call/'):
+            self._send_json(404, {'error': f"Không tìm thấy: {self.path}"})
+            return
+        op = self.path[len('/call/'):]
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            params = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(params, dict):
+                raise ValueError("Tham số phải là một đối tượng JSON.")
+        except ValueError as e:
+            self._send_json(400, {'error': f"Yêu cầu không hợp lệ: {e}"})
+            return
+        if op not in OPERATIONS:
+            self._send_json(404, {'error': f"Thao tác không được hỗ trợ: {op}"})
+            return
+        try:
+            body, kind = encode_result(self.service.call(op, params))
+        except InvalidParams as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            print(f"Lỗi khi thực thi '{op}': {e}")
+            self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        content_type = 'application/json' if kind == 'json' else 'application/vnd.apache.parquet'
+        self._send(200, body, content_type, {'X-Goldenkey-Result': kind})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(host: str = SERVICE_HOST, port: int = SERVICE_PORT, workers: int = None,
+                  token: str = SERVICE_TOKEN, allow_unauthenticated: bool = False) -> Tuple[ThreadingHTTPServer, ComputeService]:
+    """
+    Tạo server HTTP (chưa chạy) cùng dịch vụ tính toán phía sau. Từ chối lắng nghe trên địa
+    chỉ không phải loopback khi không có token, trừ khi `allow_unauthenticated`.
+    """
+    if not token and not _is_loopback(host):
+        if not allow_unauthenticated:
+            raise ValueError(f"Không chạy dịch vụ trên {host or 'mọi địa chỉ'} khi chưa đặt GOLDENKEY_SERVICE_TOKEN.")
+        print(f"Cảnh báo: dịch vụ lắng nghe trên {host or 'mọi địa chỉ'} mà không kiểm tra token truy cập.")
+    service = ComputeService(workers=workers)
+    handler = type('GoldenkeyServiceHandler', (_Handler,), {'service': service, 'token': token})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server, service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dịch vụ tính toán dùng chung của Goldenkey.")
+    parser.add_argument('--host', default=SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình worker cho tác vụ nặng CPU.")
+    parser.add_argument('--allow-unauthenticated', action='store_true',
+                        help="Cho phép lắng nghe trên địa chỉ không phải loopback mà không cần token.")
+    args = parser.parse_args()
+
+    try:
+        server, service = create_server(args.host, args.port, args.workers,
+                                        allow_unauthenticated=args.allow_unauthenticated)
+    except ValueError as e:
+        print(f"Lỗi: {e}")
+        return 1
+    print(f"Dịch vụ Goldenkey đang chạy tại http://{args.host}:{args.port} ({service.workers} worker)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
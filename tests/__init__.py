@@ -0,0 +1,2 @@
+# goldenkey_project/tests/__init__.py
+# Kiểm thử offline (pytest) trên dữ liệu tổng hợp, không cần kết nối tới vnstock.
@@ -0,0 +1,27 @@
+# goldenkey_project/tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import core.data_provider as data_provider
+from benchmarks.synthetic import SyntheticProvider
+
+
+@pytest.fixture
+def use_provider():
+    """
+    Thay nguồn dữ liệu dùng chung trong phạm vi một test: `use_provider(provider)` cài
+    `provider` (mặc định SyntheticProvider()) và trả về nó; nguồn cũ được khôi phục sau test.
+    """
+    previous = data_provider._provider
+
+    def install(provider=None):
+        provider = provider if provider is not None else SyntheticProvider()
+        data_provider.set_data_provider(provider)
+        return provider
+
+    yield install
+    data_provider.set_data_provider(previous)
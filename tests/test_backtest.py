@@ -0,0 +1,67 @@
+# goldenkey_project/tests/test_backtest.py
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_adj_close, offline_portfolio
+from core.backtest import _RESYNC_EVERY, WalkForwardBacktester
+
+
+@pytest.fixture
+def adj_close():
+    return make_adj_close(n_symbols=4, n_bars=900, seed=5)
+
+
+def _backtester(adj_close, **kwargs) -> WalkForwardBacktester:
+    portfolio = offline_portfolio(adj_close)
+    portfolio.calculate_stats()
+    params = dict(lookback_days=60, rebalance='monthly', n_candidates=500, cash_weight=0.1)
+    params.update(kwargs)
+    return WalkForwardBacktester(portfolio, **params)
+
+
+def test_incremental_window_moments_match_full_recompute(adj_close):
+    backtester = _backtester(adj_close)
+    portfolio = backtester.portfolio
+    R = portfolio.returns[portfolio.symbols].values
+    positions = backtester._rebalance_positions(portfolio.returns.index)
+    assert len(positions) > _RESYNC_EVERY + 5  # Đi qua cả cập nhật tăng dần lẫn lần tính lại định kỳ
+
+    L = backtester.lookback_days
+    for t0, (mu, cov) in zip(positions, backtester._window_moments(R, positions)):
+        # Lợi suất dòng i ứng với giá dòng i + 1: cửa sổ R[t0 - L:t0] cần giá từ dòng t0 - L đến t0
+        window = offline_portfolio(adj_close.iloc[t0 - L:t0 + 1])
+        window.calculate_stats()
+        np.testing.assert_allclose(cov, window.cov_matrix.values, rtol=1e-8, atol=1e-12)
+        np.testing.assert_allclose(mu, window.returns[window.symbols].mean().values * 252, rtol=1e-8, atol=1e-12)
+
+
+def test_turnover_and_transaction_cost_accounting(adj_close):
+    np.random.seed(0)
+    free = _backtester(adj_close, transaction_cost=0.0).run()
+    np.random.seed(0)
+    costly = _backtester(adj_close, transaction_cost=0.01).run()
+
+    # Chi phí không ảnh hưởng việc chọn tỷ trọng, chỉ trừ vào giá trị tại mỗi kỳ
+    np.testing.assert_allclose(costly['weights'].values, free['weights'].values)
+    turnover = costly['turnover'].values
+    np.testing.assert_allclose(turnover, free['turnover'].values)
+    assert turnover[0] == pytest.approx(0.9)  # Từ 100% tiền mặt sang 90% cổ phiếu
+    ratio = costly['equity']['Danh mục'].iloc[-1] / free['equity']['Danh mục'].iloc[-1]
+    assert ratio == pytest.approx(np.prod(1 - 0.01 * turnover))
+
+    # Dựng lại tỷ lệ giao dịch bằng vòng lặp theo từng phiên
+    portfolio = offline_portfolio(adj_close)
+    portfolio.calculate_stats()
+    returns = portfolio.returns[portfolio.symbols]
+    daily_rf = 1.04 ** (1 / 252) - 1
+    weights = costly['weights']
+    dates = list(weights.index) + [None]
+    holdings = np.r_[np.zeros(4), 1.0]
+    for k, date in enumerate(weights.index):
+        target = weights.loc[date].values
+        drifted = holdings / holdings.sum()
+        assert turnover[k] == pytest.approx(np.abs(target[:-1] - drifted[:-1]).sum())
+        holdings = target.copy()
+        period = returns.loc[date:dates[k + 1]].iloc[:-1] if dates[k + 1] is not None else returns.loc[date:]
+        for _, row in period.iterrows():
+            holdings = holdings * np.r_[1 + row.values, 1 + daily_rf]
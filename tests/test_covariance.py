@@ -0,0 +1,52 @@
+# goldenkey_project/tests/test_covariance.py
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_adj_close
+from core.covariance import (CovarianceModel, estimate_covariance, factor_covariance,
+                             ledoit_wolf_covariance)
+
+
+@pytest.fixture
+def returns():
+    return make_adj_close(n_symbols=12, n_bars=120, seed=3).pct_change().dropna()
+
+
+def test_factor_model_operations_match_dense_matrix(returns):
+    model = factor_covariance(returns, n_factors=3)
+    dense = model.to_dense()
+    rng = np.random.default_rng(0)
+    weights = rng.dirichlet(np.ones(dense.shape[0]), size=5)
+
+    np.testing.assert_allclose(model.quad_form(weights), np.einsum('ij,jk,ik->i', weights, dense, weights))
+    np.testing.assert_allclose(model.variances(), np.diag(dense))
+
+    items = np.array([1, 4, 7, 10])
+    subset_weights = rng.dirichlet(np.ones(len(items)))
+    expected = subset_weights @ dense[np.ix_(items, items)] @ subset_weights
+    assert model.subset_quad_form(items, subset_weights) == pytest.approx(expected)
+
+
+def test_ledoit_wolf_shrinkage_matches_brute_force(returns):
+    X = returns.values - returns.values.mean(axis=0)
+    T, N = X.shape
+    S = X.T @ X / T
+    mu = np.trace(S) / N
+    d2 = ((S - mu * np.eye(N)) ** 2).sum() / N
+    # Σ‖xₜxₜᵀ - S‖² tính trực tiếp trên từng ma trận N x N
+    b2_bar = sum(((np.outer(x, x) - S) ** 2).sum() for x in X) / (T ** 2 * N)
+    expected = min(b2_bar / d2, 1.0)
+
+    model = ledoit_wolf_covariance(returns)
+    assert model.shrinkage == pytest.approx(expected)
+    np.testing.assert_allclose(model.to_dense(), (expected * mu * np.eye(N) + (1 - expected) * S) * 252)
+
+
+def test_estimate_covariance_rejects_unknown_method(returns):
+    with pytest.raises(ValueError):
+        estimate_covariance(returns, method='robust')
+
+
+def test_covariance_model_is_abstract():
+    with pytest.raises(TypeError):
+        CovarianceModel()
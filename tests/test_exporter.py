@@ -0,0 +1,39 @@
+# goldenkey_project/tests/test_exporter.py
+import io
+
+import numpy as np
+import pandas as pd
+
+import utils.exporter as exporter
+from benchmarks.synthetic import make_ohlcv
+
+
+def _history_with_gaps(symbol: str, years: int, interval: str) -> pd.DataFrame:
+    df = make_ohlcv(20, seed=len(symbol))
+    df.loc[3, ['open', 'volume']] = np.nan
+    return df
+
+
+def test_excel_export_writes_nan_as_blank_and_caps_symbol_sheets(monkeypatch):
+    monkeypatch.setattr(exporter, '_fetch_history', _history_with_gaps)
+    monkeypatch.setattr(exporter, 'EXCEL_MAX_SYMBOL_SHEETS', 2)
+    output = io.BytesIO()
+    summary = exporter.export_price_history(['A', 'BB', 'CCC', 'DDDD'], output, fmt='excel', max_workers=2)
+
+    assert summary['rows'].tolist() == [20] * 4
+    sheets = pd.read_excel(io.BytesIO(output.getvalue()), sheet_name=None)
+    assert len(sheets) == 4  # Tổng hợp + 2 sheet mã + sheet dạng dài
+    overflow = sheets[exporter._ExcelSink.OVERFLOW_SHEET]
+    assert len(overflow) == 40 and overflow['symbol'].nunique() == 2
+    symbol_sheet = next(df for name, df in sheets.items() if name in ('A', 'BB', 'CCC', 'DDDD'))
+    assert symbol_sheet.loc[3, ['open', 'volume']].isna().all()
+
+
+def test_csv_export_to_binary_file_object(monkeypatch):
+    monkeypatch.setattr(exporter, '_fetch_history', _history_with_gaps)
+    output = io.BytesIO()
+    exporter.export_price_history(['A', 'BB'], output, fmt='csv', max_workers=2)
+
+    assert not output.closed
+    df = pd.read_csv(io.BytesIO(output.getvalue()), encoding='utf-8-sig')
+    assert len(df) == 40 and set(df['symbol']) == {'A', 'BB'}
@@ -0,0 +1,78 @@
+# goldenkey_project/tests/test_fundamentals.py
+import os
+import zlib
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_financial_report
+import core.fundamentals as fundamentals
+from core.fundamentals import FundamentalsStore, normalize_report
+
+
+@pytest.fixture
+def fake_reports(monkeypatch):
+    """Báo cáo tổng hợp thay cho vnstock; mã trong `empty` không có báo cáo (bảng rỗng)."""
+    empty = {'NONE'}
+    calls = []
+
+    def fetch(symbol: str, report_type: str, period: str) -> pd.DataFrame:
+        calls.append(symbol)
+        report = pd.DataFrame() if symbol in empty else make_financial_report(seed=zlib.crc32(symbol.encode()) % 1000)
+        return normalize_report(report, symbol, period)
+
+    monkeypatch.setattr(FundamentalsStore, '_fetch_report', staticmethod(fetch))
+    return calls
+
+
+def test_update_skips_symbol_with_empty_report(tmp_path, fake_reports):
+    store = FundamentalsStore(base_dir=str(tmp_path))
+    added = store.update(['AAA', 'NONE', 'BBB'], ['income_statement'])
+
+    table = store.table('income_statement', 'quarter')
+    assert added['income_statement'] == len(table) > 0
+    assert set(table['symbol']) == {'AAA', 'BBB'}
+    entry = store._manifest['income_statement:quarter']['NONE']
+    assert (entry['year'], entry['quarter']) == (0, 0) and 'checked_at' in entry
+
+
+def test_single_symbol_miss_writes_delta_until_batch_update(tmp_path, fake_reports):
+    store = FundamentalsStore(base_dir=str(tmp_path))
+    store.update(['AAA', 'BBB'], ['ratio'])
+    main_path = store._table_path('ratio', 'quarter')
+    main_mtime = os.stat(main_path).st_mtime_ns
+
+    report = store.get('CCC', 'ratio', years=100)
+    assert not report.empty
+    assert os.stat(main_path).st_mtime_ns == main_mtime
+    assert len(store._delta_files('ratio', 'quarter')) == 1
+
+    # Tiến trình khác thấy cả bảng chính lẫn delta
+    reopened = FundamentalsStore(base_dir=str(tmp_path))
+    assert set(reopened.table('ratio', 'quarter')['symbol']) == {'AAA', 'BBB', 'CCC'}
+
+    store.update(['DDD'], ['ratio'])
+    assert store._delta_files('ratio', 'quarter') == []
+    compacted = pd.read_parquet(main_path)
+    assert set(compacted['symbol']) == {'AAA', 'BBB', 'CCC', 'DDD'}
+    assert not compacted.duplicated(['symbol', 'year', 'quarter']).any()
+
+
+def test_two_stores_sharing_a_directory_keep_each_others_rows(tmp_path, fake_reports, monkeypatch):
+    monkeypatch.setattr(fundamentals, 'MAX_DELTA_FILES', 2)
+    first = FundamentalsStore(base_dir=str(tmp_path))
+    first.update(['AAA'], ['ratio'])
+    assert set(first.table('ratio', 'quarter')['symbol']) == {'AAA'}
+
+    # Tiến trình thứ hai ghi vào cùng thư mục sau khi tiến trình đầu đã nạp bảng và manifest
+    second = FundamentalsStore(base_dir=str(tmp_path))
+    second.update(['BBB', 'CCC'], ['ratio'])
+
+    # Các lần tải bổ sung của tiến trình đầu ghi delta rồi gộp vào bảng chính
+    for symbol in ['DDD', 'EEE', 'FFF']:
+        first.get(symbol, 'ratio', years=100)
+    first.compact('ratio')
+
+    expected = {'AAA', 'BBB', 'CCC', 'DDD', 'EEE', 'FFF'}
+    assert set(pd.read_parquet(first._table_path('ratio', 'quarter'))['symbol']) == expected
+    assert set(FundamentalsStore(base_dir=str(tmp_path))._manifest['ratio:quarter']) == expected
@@ -0,0 +1,43 @@
+# goldenkey_project/tests/test_hrp.py
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_adj_close, offline_portfolio
+
+
+def _portfolio(n_symbols: int, cov_method: str = 'sample', seed: int = 0):
+    portfolio = offline_portfolio(make_adj_close(n_symbols=n_symbols, n_bars=500, seed=seed))
+    portfolio.calculate_stats(cov_method=cov_method)
+    return portfolio
+
+
+@pytest.mark.parametrize('n_symbols, min_weight, max_weight, cov_method', [
+    (5, 0.10, 0.40, 'sample'),
+    (20, 0.02, 0.08, 'sample'),
+    (320, 0.001, 0.01, 'ledoit_wolf'),
+    (320, 0.0, 0.005, 'factor'),
+])
+def test_weights_sum_to_one_within_bounds(n_symbols, min_weight, max_weight, cov_method):
+    portfolio = _portfolio(n_symbols, cov_method)
+    result = portfolio.run_hrp(min_weight=min_weight, max_weight=max_weight)
+    weights = result[portfolio.symbols].values
+
+    assert weights.sum() == pytest.approx(1.0)
+    assert weights.min() >= min_weight - 1e-12
+    assert weights.max() <= max_weight + 1e-12
+    assert np.isfinite(result[['return', 'volatility', 'sharpe']].values).all()
+
+
+def test_unconstrained_pair_is_inverse_variance():
+    portfolio = _portfolio(2)
+    weights = portfolio.run_hrp()[portfolio.symbols].values
+    inv_var = 1 / portfolio.cov_model.variances()
+    np.testing.assert_allclose(weights, inv_var / inv_var.sum())
+
+
+def test_infeasible_bounds_are_rejected():
+    portfolio = _portfolio(5)
+    with pytest.raises(ValueError):
+        portfolio.run_hrp(min_weight=0.25)
+    with pytest.raises(ValueError):
+        portfolio.run_hrp(max_weight=0.15)
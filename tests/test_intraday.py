@@ -0,0 +1,91 @@
+# goldenkey_project/tests/test_intraday.py
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.intraday import IntradayCache, chunk_date_ranges, compact_ohlcv, resample_ohlcv
+
+
+def _minute_bars(days: int = 2, start: str = '2024-06-03') -> pd.DataFrame:
+    """Dữ liệu 1 phút của phiên sáng (9:15-11:29) và phiên chiều (13:00-14:44) trong `days` ngày."""
+    times = []
+    for day in pd.bdate_range(start, periods=days):
+        times += list(pd.date_range(day + pd.Timedelta('9h15min'), day + pd.Timedelta('11h29min'), freq='1min'))
+        times += list(pd.date_range(day + pd.Timedelta('13h'), day + pd.Timedelta('14h44min'), freq='1min'))
+    rng = np.random.default_rng(0)
+    close = 50 + np.cumsum(rng.normal(0, 0.05, len(times)))
+    open_ = close + rng.normal(0, 0.02, len(times))
+    return compact_ohlcv(pd.DataFrame({
+        'time': times, 'open': open_, 'high': np.maximum(open_, close) + 0.05,
+        'low': np.minimum(open_, close) - 0.05, 'close': close,
+        'volume': rng.integers(100, 10_000, len(times)),
+    }))
+
+
+@pytest.mark.parametrize('days, chunk_days', [(1, 7), (7, 7), (30, 7), (45, 30), (365, 180)])
+def test_chunk_ranges_are_contiguous_and_bounded(days, chunk_days):
+    start = datetime(2024, 1, 1)
+    end = start + timedelta(days=days - 1)
+    ranges = chunk_date_ranges(start, end, chunk_days)
+
+    assert ranges[0][0] == start and ranges[-1][1] == end
+    assert len(ranges) == -(-days // chunk_days)
+    for (s, e), (next_start, _) in zip(ranges, ranges[1:] + [(end + timedelta(days=1), None)]):
+        assert s <= e and (e - s).days < chunk_days
+        assert next_start == e + timedelta(days=1)
+
+
+def test_resample_minutes_to_5m_and_1h():
+    minutes = _minute_bars()
+
+    five = resample_ohlcv(minutes, '5m')
+    first = minutes.iloc[:5]
+    assert five['time'].iloc[0] == pd.Timestamp('2024-06-03 09:15')
+    assert five[['open', 'high', 'low', 'close']].iloc[0].tolist() == [
+        first['open'].iloc[0], first['high'].max(), first['low'].min(), first['close'].iloc[-1]]
+    assert five['volume'].sum() == minutes['volume'].sum()
+    assert len(five) == 2 * (27 + 21)
+
+    hourly = resample_ohlcv(minutes, '1H')
+    # Không có nến cho giờ nghỉ trưa và ngoài phiên
+    assert set(hourly['time'].dt.hour) == {9, 10, 11, 13, 14}
+    assert hourly['volume'].sum() == minutes['volume'].sum()
+    morning = minutes[(minutes['time'] >= '2024-06-03 10:00') & (minutes['time'] < '2024-06-03 11:00')]
+    row = hourly[hourly['time'] == pd.Timestamp('2024-06-03 10:00')].iloc[0]
+    assert (row['open'], row['close']) == (morning['open'].iloc[0], morning['close'].iloc[-1])
+
+
+def test_cache_serves_coarser_intervals_from_finer_data_within_coverage():
+    cache = IntradayCache()
+    minutes = _minute_bars(days=5)
+    cache.put('FPT', '1m', datetime(2024, 6, 3), datetime(2024, 6, 7), minutes)
+
+    five = cache.get('FPT', '5m', datetime(2024, 6, 4), datetime(2024, 6, 5))
+    pd.testing.assert_frame_equal(
+        five, resample_ohlcv(minutes[(minutes['time'] >= '2024-06-04') & (minutes['time'] < '2024-06-06')], '5m'))
+    assert cache.get('FPT', '1m', datetime(2024, 6, 3), datetime(2024, 6, 7)) is not None
+
+    # Ngoài khoảng đã tải, hoặc khung 1 phút từ dữ liệu 5 phút: phải tải lại
+    assert cache.get('FPT', '5m', datetime(2024, 6, 1), datetime(2024, 6, 5)) is None
+    cache.put('HPG', '5m', datetime(2024, 6, 3), datetime(2024, 6, 7), resample_ohlcv(minutes, '5m'))
+    assert cache.get('HPG', '1m', datetime(2024, 6, 3), datetime(2024, 6, 7)) is None
+    assert cache.get('HPG', '15m', datetime(2024, 6, 3), datetime(2024, 6, 7)) is not None
+
+    # Bản 1 phút bao phủ cùng khoảng thay thế bản 5 phút (thô hơn, suy ra được)
+    cache.put('HPG', '1m', datetime(2024, 6, 3), datetime(2024, 6, 7), minutes)
+    assert set(cache._entries['HPG']) == {'1m'}
+
+
+def test_cache_evicts_least_recently_used_symbol():
+    cache = IntradayCache(max_symbols=2)
+    minutes = _minute_bars(days=1)
+    day = datetime(2024, 6, 3)
+    cache.put('AAA', '1m', day, day, minutes)
+    cache.put('BBB', '1m', day, day, minutes)
+    assert cache.get('AAA', '5m', day, day) is not None  # AAA trở thành mã dùng gần nhất
+
+    cache.put('CCC', '1m', day, day, minutes)
+    assert list(cache._entries) == ['AAA', 'CCC']
+    assert cache.get('BBB', '1m', day, day) is None
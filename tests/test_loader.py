@@ -0,0 +1,70 @@
+# goldenkey_project/tests/test_loader.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from core.loader import StockDataLoader
+
+
+class _FakeStock:
+    """Stock tối giản: báo cáo chỉ số chờ `ratio_ready` để giả lập một yêu cầu chậm."""
+
+    symbol = 'AAA'
+
+    def __init__(self):
+        self.ratio_ready = threading.Event()
+        self.ratio_done = threading.Event()
+        self.price_history = pd.DataFrame({'close': [1.0, 2.0]})
+
+    def fetch_price_history(self, years=3, interval='1D', days=None):
+        return self.price_history
+
+    def calculate_technical_indicators(self):
+        pass
+
+    def get_financial_report(self, report_type, period='quarter', years=3):
+        if report_type == 'ratio':
+            assert self.ratio_ready.wait(5)
+            self.ratio_done.set()
+        return pd.DataFrame({'year': [2024]})
+
+    def get_company_profile(self):
+        return pd.DataFrame({'name': ['AAA Corp']})
+
+    def get_related_news(self, page_size=10):
+        return pd.DataFrame()
+
+    def get_peer_comparison(self, period='quarter'):
+        # Chỉ chạy khi báo cáo chỉ số đã về
+        return pd.DataFrame({'value': [1.0]}) if self.ratio_done.is_set() else None
+
+
+def test_peers_waits_for_ratio_without_holding_a_worker():
+    stock = _FakeStock()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        loader = StockDataLoader(stock, report_types=['ratio'], executor=executor).start()
+        results = {}
+        for key, data in loader.as_completed(timeout=5):
+            results[key] = data
+            if key == 'news':
+                # Một luồng đang bận với báo cáo chỉ số; tác vụ gửi thêm vẫn phải chạy được
+                loader.submit('extra', lambda: 'ok')
+            elif key == 'extra':
+                stock.ratio_ready.set()
+
+    assert set(results) == {'price', 'report:ratio', 'profile', 'news', 'peers', 'extra'}
+    assert isinstance(results['peers'], pd.DataFrame) and not results['peers'].empty
+    assert 'peers' in loader.timings
+
+
+def test_cancel_while_ratio_is_loading_skips_peers():
+    stock = _FakeStock()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        loader = StockDataLoader(stock, report_types=['ratio'], executor=executor).start()
+        loader.cancel()
+        stock.ratio_ready.set()
+        keys = [key for key, _ in loader.as_completed(timeout=5)]
+
+    assert 'peers' not in keys
+    assert loader._futures['peers'].cancelled()
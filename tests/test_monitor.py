@@ -0,0 +1,26 @@
+# goldenkey_project/tests/test_monitor.py
+import pytest
+
+from core.monitor import PortfolioMonitor, SimulatedTickSource
+
+
+def test_positions_use_capital_in_dong_and_prices_in_thousand_dong():
+    monitor = PortfolioMonitor(SimulatedTickSource({'AAA': 50.0, 'BBB': 20.0}, seed=0))
+    monitor.add_portfolio('P', {'AAA': 0.5, 'BBB': 0.5}, cash_weight=0.2, capital=1e9)
+
+    positions = monitor.positions('P')
+    # 400 triệu đồng vào mỗi mã: 8.000 CP giá 50 nghìn đồng, 20.000 CP giá 20 nghìn đồng
+    assert positions.loc['AAA', 'shares'] == pytest.approx(8_000)
+    assert positions.loc['BBB', 'shares'] == pytest.approx(20_000)
+    assert monitor.summary().loc['P', 'value'] == pytest.approx(1e9)
+
+    monitor.apply_quotes({'AAA': 55.0})
+    summary = monitor.summary().loc['P']
+    assert summary['pnl'] == pytest.approx(8_000 * 5 * 1000)
+    assert summary['value'] == pytest.approx(1.04e9)
+
+    # Tỷ trọng thực tế sau giá mới: 8.000 x 55 nghìn đồng trên 1,04 tỷ đồng
+    positions = monitor.positions('P')
+    assert positions.loc['AAA', 'weight'] == pytest.approx(4.4e8 / 1.04e9)
+    assert positions.loc['AAA', 'drift'] == pytest.approx(4.4e8 / 1.04e9 - 0.4)
+    assert positions.loc['BBB', 'weight'] == pytest.approx(4e8 / 1.04e9)
@@ -0,0 +1,69 @@
+# goldenkey_project/tests/test_panel.py
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import core.portfolio as portfolio_module
+from benchmarks.synthetic import SyntheticProvider, make_ohlcv
+from core.panel import PricePanel, build_price_panel
+from core.portfolio import Portfolio
+
+
+class _RecentProvider(SyntheticProvider):
+    """Dữ liệu tổng hợp kết thúc hôm nay (để khớp khoảng ngày của bảng giá); mã trong `failing` luôn lỗi."""
+
+    def __init__(self, failing=(), seed: int = 0):
+        super().__init__(seed=seed)
+        self.failing = set(failing)
+
+    def price_history(self, symbol, start=None, end=None, interval='1D'):
+        if symbol in self.failing:
+            raise ConnectionError(f"lỗi tải {symbol}")
+        df = make_ohlcv(300, seed=self._seed(symbol))
+        df['time'] = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=len(df))
+        return df
+
+
+def test_build_skips_symbols_whose_fetch_failed(tmp_path, use_provider):
+    use_provider(_RecentProvider(failing={'BAD'}))
+    panel = build_price_panel(['AAA', 'BAD'], years=1, base_dir=str(tmp_path), max_workers=2)
+
+    assert 'AAA' in panel.symbols and 'BAD' not in panel.symbols
+    assert not panel.contains(['AAA', 'BAD', 'VNINDEX'])
+    assert panel.contains(['AAA', 'VNINDEX'])
+
+
+def test_fetch_data_falls_back_when_panel_column_is_all_nan(tmp_path, use_provider, monkeypatch):
+    provider = use_provider(_RecentProvider())
+    # Bảng tạo theo cách cũ: 'BAD' được đăng ký nhưng không có dữ liệu
+    calendar = pd.DatetimeIndex(provider.price_history('VNINDEX')['time'])
+    panel = PricePanel.create(['VNINDEX', 'AAA', 'BAD'], calendar, str(tmp_path))
+    panel.write_history('VNINDEX', provider.price_history('VNINDEX'))
+    panel.write_history('AAA', provider.price_history('AAA'))
+    panel.flush()
+    monkeypatch.setattr(portfolio_module, 'get_price_panel', lambda: PricePanel(str(tmp_path)))
+
+    portfolio = Portfolio(['AAA', 'BAD'], provider=provider)
+    assert portfolio.fetch_data(years=0.5)
+    assert not portfolio.adj_close.empty
+    assert portfolio.adj_close.notna().all().all()
+
+
+def test_rebuild_publishes_new_generation_without_touching_open_readers(tmp_path, use_provider):
+    use_provider(_RecentProvider(seed=1))
+    build_price_panel(['AAA'], years=1, base_dir=str(tmp_path), max_workers=1)
+    reader = PricePanel(str(tmp_path))
+    before = reader.frame(['AAA'], 'close').copy()
+
+    use_provider(_RecentProvider(seed=2))
+    build_price_panel(['AAA', 'BBB'], years=1, base_dir=str(tmp_path), max_workers=1)
+
+    # Tiến trình đang đọc vẫn thấy bảng cũ nguyên vẹn cho tới khi mở lại
+    pd.testing.assert_frame_equal(reader.frame(['AAA'], 'close'), before)
+    reader.reload_if_changed()
+    assert reader.contains(['BBB'])
+    assert not np.allclose(reader.frame(['AAA'], 'close').values, before.values)
+    generations = [d for d in os.listdir(tmp_path) if d.startswith('gen-')]
+    assert generations == [os.path.basename(reader.data_dir)]
@@ -0,0 +1,38 @@
+# goldenkey_project/tests/test_risk.py
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_adj_close, offline_portfolio
+from core.risk import RiskEngine
+
+
+@pytest.fixture
+def portfolio():
+    portfolio = offline_portfolio(make_adj_close(n_symbols=4, n_bars=300, seed=1))
+    portfolio.calculate_stats()
+    return portfolio
+
+
+@pytest.mark.parametrize('horizon_days', [1, 3, 12])
+def test_bootstrap_blocks_have_block_size_and_cover_horizon(portfolio, horizon_days):
+    engine = RiskEngine(portfolio, horizon_days=horizon_days, n_bootstrap=50, block_size=5, seed=0)
+    returns = engine.portfolio_returns(np.full(4, 0.25))
+    plan = engine._bootstrap_plan(len(returns), np.random.default_rng(0))
+    assert plan['block'] == 5
+
+    # Dựng lại từng mẫu: các khối 5 phiên đầy đủ rồi các phiên đầu của khối cuối
+    daily = returns[:, 0]
+    expected = []
+    for i in range(engine.n_bootstrap):
+        path = [daily[s:s + 5] for s in plan['starts'][i]]
+        if plan['remainder']:
+            start = plan['remainder_starts'][i]
+            path.append(daily[start:start + plan['remainder']])
+        path = np.concatenate(path)
+        assert len(path) == horizon_days
+        expected.append(np.prod(1 + path) - 1)
+
+    var, cvar = engine._bootstrap_var(returns, plan)
+    expected_var, expected_cvar = engine._tail(np.array(expected)[:, None])
+    assert var[0] == pytest.approx(expected_var[0])
+    assert cvar[0] == pytest.approx(expected_cvar[0])
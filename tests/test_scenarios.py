@@ -0,0 +1,85 @@
+# goldenkey_project/tests/test_scenarios.py
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import core.scenarios as scenarios
+from benchmarks.synthetic import make_adj_close, offline_portfolio
+from core.scenarios import ScenarioEngine
+
+
+@pytest.fixture(autouse=True)
+def no_shared_panel(monkeypatch):
+    monkeypatch.setattr(scenarios, 'get_price_panel', lambda: None)
+
+
+def _crash_prices() -> pd.DataFrame:
+    """AAA giảm đều 20% từ phiên 10 đến phiên 20 rồi vượt đỉnh cũ ở phiên 30; BBB đi ngang."""
+    dates = pd.bdate_range('2020-01-01', periods=80)
+    crash = np.full(80, 100.0)
+    crash[10:21] = np.linspace(100.0, 80.0, 11)
+    crash[21:30] = np.linspace(82.0, 98.0, 9)
+    crash[30:] = 101.0
+    rng = np.random.default_rng(3)
+    noisy = 50.0 * np.exp(np.cumsum(rng.normal(0, 0.02, 80)))
+    return pd.DataFrame({'AAA': crash, 'BBB': 50.0, 'CCC': noisy, 'VNINDEX': (crash + 100.0) * 5},
+                        index=pd.Index(dates, name='time'))
+
+
+def test_historical_window_matches_per_portfolio_replay():
+    prices = _crash_prices()
+    peak, trough = prices.index[10], prices.index[20]
+    portfolio = offline_portfolio(prices)
+    engine = ScenarioEngine(portfolio, historical={'Crash': (str(peak.date()), str(trough.date()))},
+                            hypothetical={}, recovery_days=40, max_chunk_elements=100)
+
+    rng = np.random.default_rng(0)
+    weights = np.vstack([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], rng.dirichlet(np.ones(3), 20)])
+    results = engine.evaluate(weights).set_index('portfolio')
+
+    # Toàn bộ vào AAA: lỗ đúng 20%, đáy ở phiên thứ 10 của cửa sổ, hồi phục sau 10 phiên
+    crash = results.loc[0]
+    assert crash['return'] == pytest.approx(-0.2)
+    assert crash['max_drawdown'] == pytest.approx(0.2)
+    assert crash['days_to_trough'] == 10
+    assert crash['recovery_days'] == 10
+    assert crash['benchmark_return'] == pytest.approx(900 / 1000 - 1)
+    flat = results.loc[1]
+    assert flat['return'] == pytest.approx(0.0) and flat['max_drawdown'] == 0 and flat['recovery_days'] == 0
+
+    # Mọi danh mục khớp với phát lại từng danh mục bằng vòng lặp
+    returns = prices[portfolio.symbols].pct_change().iloc[11:21].to_numpy()
+    for i, w in enumerate(weights):
+        wealth = np.cumprod(1 + returns @ w)
+        drawdown = wealth / np.maximum.accumulate(np.maximum(wealth, 1.0)) - 1
+        assert results.loc[i, 'return'] == pytest.approx(wealth[-1] - 1)
+        assert results.loc[i, 'max_drawdown'] == pytest.approx(-drawdown.min())
+
+
+def test_hypothetical_shock_matrix_priority_and_impact(monkeypatch):
+    portfolio = offline_portfolio(make_adj_close(n_symbols=3, n_bars=250, seed=2))
+    portfolio.calculate_stats()
+    first, second, third = portfolio.symbols
+    industries = {first: 'Ngân hàng', second: 'Bất động sản'}
+    monkeypatch.setattr(scenarios, 'get_universe',
+                        lambda: types.SimpleNamespace(industry=lambda s: industries.get(s, 'Khác')))
+
+    shocks = {
+        'Hỗn hợp': {'market': -0.10, 'sectors': {'Ngân hàng': -0.20, 'Bất động sản': -0.30}, 'symbols': {second: -0.50}},
+        'Sập mã': {'symbols': {first: -1.5}},
+    }
+    engine = ScenarioEngine(portfolio, historical={}, hypothetical=shocks)
+    matrix = engine._shock_matrix(shocks)
+
+    bench = portfolio.returns[portfolio.benchmark]
+    beta = portfolio.returns[third].cov(bench) / bench.var()
+    np.testing.assert_allclose(matrix[0], [-0.20, -0.50, -0.10 * beta])
+    np.testing.assert_allclose(matrix[1], [-1.0, 0.0, 0.0])
+
+    weights = np.array([[0.5, 0.3, 0.2], [0.0, 0.0, 1.0]])
+    results = engine.evaluate(weights, cash_weight=0.25)
+    impact = results.pivot(index='scenario', columns='portfolio', values='return')
+    np.testing.assert_allclose(impact.loc[list(shocks)].to_numpy(), matrix @ weights.T * 0.75)
+    assert (results['max_drawdown'] >= 0).all()
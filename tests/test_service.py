@@ -0,0 +1,85 @@
+# goldenkey_project/tests/test_service.py
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+import service.server as server_module
+from benchmarks.synthetic import make_adj_close
+from service.client import ServiceClient
+from service.server import ComputeService, InvalidParams, create_server
+
+
+def _broken(symbol: str) -> str:
+    raise TypeError("lỗi nội bộ")
+
+
+def _prices(symbol: str) -> pd.DataFrame:
+    return make_adj_close(n_symbols=2, n_bars=5)
+
+
+def _weights(symbol: str) -> pd.Series:
+    return pd.Series([0.25, 0.75], index=['FPT', symbol])
+
+
+def _text(symbol: str) -> str:
+    return f"Phân tích {symbol}"
+
+
+@pytest.fixture
+def running_server(monkeypatch):
+    operations = dict(server_module.OPERATIONS, **{
+        name: {'fn': fn, 'pool': 'thread', 'ttl': 0}
+        for name, fn in [('broken', _broken), ('prices', _prices), ('weights', _weights), ('text', _text)]
+    })
+    monkeypatch.setattr(server_module, 'OPERATIONS', operations)
+    server, service = create_server('127.0.0.1', 0, workers=1, token='s3cret')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+
+def _post(url: str, op: str, params: dict, token: str = 's3cret') -> int:
+    request = urllib.request.Request(f"{url}/call/{op}", data=json.dumps(params).encode('utf-8'),
+                                     headers={'X-Goldenkey-Token': token},
+                                     method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_only_argument_binding_errors_are_reported_as_400(running_server):
+    assert _post(running_server, 'broken', {'unknown': 1}) == 400
+    assert _post(running_server, 'broken', {'symbol': 'FPT'}) == 500
+    assert _post(running_server, 'broken', {'symbol': 'FPT'}, token='sai') == 403
+
+
+def test_results_round_trip_without_pickle(running_server):
+    client = ServiceClient([running_server], token='s3cret')
+    pd.testing.assert_frame_equal(client.call('prices', symbol='HPG'), _prices('HPG'), check_freq=False)
+    pd.testing.assert_series_equal(client.call('weights', symbol='HPG'), _weights('HPG'))
+    assert client.call('text', symbol='HPG') == "Phân tích HPG"
+
+
+def test_check_params_accounts_for_injected_prices():
+    service = ComputeService(workers=1)
+    try:
+        spec = server_module.OPERATIONS['portfolio_hrp']
+        service._check_params('portfolio_hrp', spec, {'symbols': ['FPT']})
+        with pytest.raises(InvalidParams):
+            service._check_params('portfolio_hrp', spec, {'symbols': ['FPT'], 'iterations': 10})
+    finally:
+        service.shutdown()
+
+
+def test_refuses_non_loopback_host_without_token():
+    with pytest.raises(ValueError):
+        create_server('0.0.0.0', 0, workers=1, token='')
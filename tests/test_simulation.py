@@ -0,0 +1,73 @@
+# goldenkey_project/tests/test_simulation.py
+import math
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_adj_close, offline_portfolio
+from core.simulation import ForwardSimulator
+
+
+@pytest.fixture
+def portfolio():
+    portfolio = offline_portfolio(make_adj_close(n_symbols=3, n_bars=500, seed=4))
+    portfolio.calculate_stats()
+    return portfolio
+
+
+WEIGHTS = np.array([0.5, 0.3, 0.2])
+
+
+def _normal_cdf(x: float) -> float:
+    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+
+def test_gbm_terminal_mean_matches_analytic(portfolio):
+    simulator = ForwardSimulator(portfolio, method='gbm', horizon_days=252, n_paths=200_000, seed=1)
+    result = simulator.simulate(WEIGHTS, cash_weight=0.2, risk_free_rate=0.04, initial_value=100.0)
+
+    mean_returns = portfolio.returns[portfolio.symbols].mean().values * 252
+    mu = (WEIGHTS @ mean_returns) * 0.8 + 0.04 * 0.2
+    sigma = math.sqrt(portfolio.cov_model.quad_form(WEIGHTS)[0]) * 0.8
+    summary = result['summary']
+    assert summary['expected_value'] == pytest.approx(100.0 * math.exp(mu), rel=0.005)
+    assert summary['terminal_p50'] == pytest.approx(100.0 * math.exp(mu - 0.5 * sigma ** 2), rel=0.005)
+    assert result['fan'].iloc[0].tolist() == pytest.approx([100.0] * 5)
+
+
+@pytest.mark.parametrize('method', ['gbm', 'bootstrap'])
+def test_results_do_not_depend_on_chunk_size(portfolio, method):
+    results = [
+        ForwardSimulator(portfolio, method=method, horizon_days=60, n_paths=2_000, seed=7,
+                         max_chunk_elements=chunk).simulate(WEIGHTS, loss_threshold=0.05, target_return=0.05)
+        for chunk in (10_000, 50_000, 10_000_000)
+    ]
+    for other in results[1:]:
+        np.testing.assert_allclose(other['fan'].values, results[0]['fan'].values, rtol=1e-10)
+        np.testing.assert_allclose(other['hit_probability'].values, results[0]['hit_probability'].values)
+        np.testing.assert_allclose(other['summary'].values, results[0]['summary'].values, rtol=1e-10)
+
+
+def test_deterministic_cash_hits_target_on_the_expected_day(portfolio):
+    simulator = ForwardSimulator(portfolio, method='gbm', horizon_days=252, n_paths=100, seed=0)
+    hits = simulator.simulate(WEIGHTS, cash_weight=1.0, risk_free_rate=0.04, target_return=0.02)['hit_probability']
+    # Giá trị log tăng 0.04/252 mỗi phiên: chạm +2% từ phiên đầu tiên có d * 0.04 / 252 >= log(1.02)
+    first_day = math.ceil(math.log(1.02) * 252 / 0.04)
+    assert (hits['target'].iloc[:first_day] == 0).all()
+    assert (hits['target'].iloc[first_day:] == 1).all()
+    assert (hits['loss'] == 0).all()
+
+
+def test_gbm_hit_probability_matches_first_passage_formula(portfolio):
+    simulator = ForwardSimulator(portfolio, method='gbm', horizon_days=252, n_paths=100_000, seed=3)
+    result = simulator.simulate(WEIGHTS, target_return=0.2, loss_threshold=0.2)
+    hits = result['hit_probability']
+    assert hits['target'].is_monotonic_increasing and hits['loss'].is_monotonic_increasing
+
+    # Xác suất chạm mức trên của chuyển động Brown có drift, hiệu chỉnh cho việc chỉ quan sát theo
+    # phiên bằng cách dời mức chạm thêm 0.5826 độ lệch chuẩn của một phiên (Broadie-Glasserman)
+    drift, step_sigma = simulator._gbm_parameters(WEIGHTS, 0.0, 0.04)
+    n = simulator.horizon_days
+    nu, sigma, b = drift * n, step_sigma * math.sqrt(n), math.log(1.2) + 0.5826 * step_sigma
+    expected = _normal_cdf((nu - b) / sigma) + math.exp(2 * drift * b / step_sigma ** 2) * _normal_cdf((-b - nu) / sigma)
+    assert hits['target'].iloc[-1] == pytest.approx(expected, abs=0.01)
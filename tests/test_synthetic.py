@@ -0,0 +1,37 @@
+# goldenkey_project/tests/test_synthetic.py
+import numpy as np
+
+from benchmarks import synthetic
+from core.portfolio import Portfolio
+from core.stock import Stock
+
+
+def test_generators_are_deterministic_and_shaped_like_vnstock():
+    ohlcv = synthetic.make_ohlcv(50, seed=7)
+    assert list(ohlcv.columns) == ['time', 'open', 'high', 'low', 'close', 'volume']
+    assert ohlcv.equals(synthetic.make_ohlcv(50, seed=7))
+    assert (ohlcv['high'] >= ohlcv[['open', 'close']].max(axis=1)).all()
+    assert (ohlcv['low'] <= ohlcv[['open', 'close']].min(axis=1)).all()
+
+    adj_close = synthetic.make_adj_close(3, 100)
+    assert list(adj_close.columns) == synthetic.synthetic_symbols(3) + ['VNINDEX']
+    assert len(adj_close) == 100 and np.isfinite(adj_close.values).all()
+
+
+def test_offline_portfolio_runs_stats_without_network():
+    portfolio = synthetic.offline_portfolio(synthetic.make_adj_close(4, 300))
+    portfolio.calculate_stats()
+    assert portfolio.cov_model is not None
+    assert portfolio.cov_matrix.shape == (4, 4)
+
+
+def test_offline_objects_have_every_init_attribute():
+    adj_close = synthetic.make_adj_close(3, 100)
+    portfolio = synthetic.offline_portfolio(adj_close)
+    reference = Portfolio(portfolio.symbols, provider=synthetic.SyntheticProvider())
+    assert set(vars(reference)) <= set(vars(portfolio))
+    assert isinstance(portfolio.provider, synthetic.SyntheticProvider)
+
+    stock = synthetic.offline_stock("S0001", synthetic.make_ohlcv(50))
+    assert set(vars(Stock("S0001", provider=synthetic.SyntheticProvider()))) <= set(vars(stock))
+    assert stock.provider.price_history("S0001").equals(stock.price_history)
@@ -0,0 +1,41 @@
+# goldenkey_project/tests/test_universe.py
+import core.universe as universe_module
+from core.universe import SymbolUniverse
+
+_COMPANIES = {
+    'VNM': 'Công ty Cổ phần Sữa Việt Nam (Vinamilk)',
+    'FPT': 'Công ty Cổ phần FPT',
+    'HPG': 'Công ty Cổ phần Tập đoàn Hòa Phát',
+    'MWG': 'Công ty Cổ phần Đầu tư Thế Giới Di Động',
+}
+
+
+def _listing(self):
+    return [{'symbol': symbol, 'name': name, 'exchange': 'HOSE', 'industry': 'Tổng hợp'}
+            for symbol, name in _COMPANIES.items()]
+
+
+def test_search_matches_misspelled_company_names(tmp_path, monkeypatch):
+    monkeypatch.setattr(SymbolUniverse, '_fetch_listing', _listing)
+    universe = SymbolUniverse(snapshot_path=str(tmp_path / 'universe.json')).load()
+    assert universe.search('vinamik')[0]['symbol'] == 'VNM'
+    assert universe.search('hoa fat')[0]['symbol'] == 'HPG'
+    assert universe.search('the gioi di dongg')[0]['symbol'] == 'MWG'
+
+
+def test_get_universe_loads_outside_module_lock(tmp_path, monkeypatch):
+    held = []
+    original_load = SymbolUniverse.load
+
+    def load(self):
+        held.append(universe_module._universe_lock.locked())
+        self.snapshot_path = str(tmp_path / 'universe.json')
+        return original_load(self)
+
+    monkeypatch.setattr(SymbolUniverse, '_fetch_listing', _listing)
+    monkeypatch.setattr(SymbolUniverse, 'load', load)
+    monkeypatch.setattr(universe_module, '_universe', None)
+    universe = universe_module.get_universe()
+
+    assert held == [False]
+    assert universe is universe_module.get_universe() and 'FPT' in universe
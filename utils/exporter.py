@@ -0,0 +1,208 @@
+# goldenkey_project/utils/exporter.py
+"""
+Xuất dữ liệu giá lịch sử của nhiều mã cổ phiếu ra Excel/CSV/Parquet theo kiểu streaming:
+dữ liệu được tải song song, và mỗi mã được ghi ra file ngay khi tải xong rồi giải phóng,
+nên bộ nhớ không tăng theo số lượng mã.
+"""
+import io
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from core.stock import Stock
+
+EXPORT_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+EXPORT_FORMATS = {
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('csv', 'text/csv'),
+    'parquet': ('parquet', 'application/octet-stream'),
+}
+# Ở chế độ constant_memory, xlsxwriter giữ mở một file tạm cho mỗi sheet đến khi đóng workbook;
+# các mã vượt quá số sheet này được ghi chung vào một sheet dạng dài để không chạm giới hạn file mở.
+EXCEL_MAX_SYMBOL_SHEETS = 200
+
+
+def _fetch_history(symbol: str, years: int, interval: str) -> pd.DataFrame:
+    df = Stock(symbol=symbol).fetch_price_history(years=years, interval=interval)
+    if df.empty:
+        return df
+    return df[[col for col in EXPORT_COLUMNS if col in df.columns]]
+
+
+def iter_price_histories(symbols: List[str], years: int = 3, interval: str = '1D',
+                         max_workers: int = 8) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Tải dữ liệu giá song song và trả về từng cặp (mã, DataFrame) ngay khi tải xong.
+    Số yêu cầu đang chờ được giới hạn ở 2 * max_workers để dữ liệu chưa được ghi
+    không dồn lại trong bộ nhớ.
+    """
+    pending_symbols = iter(symbols)
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_next() -> bool:
+            symbol = next(pending_symbols, None)
+            if symbol is None:
+                return False
+            in_flight[executor.submit(_fetch_history, symbol, years, interval)] = symbol
+            return True
+
+        for _ in range(2 * max_workers):
+            if not submit_next():
+                break
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                symbol = in_flight.pop(future)
+                try:
+                    df = future.result()
+                except Exception as e:
+                    print(f"Lỗi khi tải dữ liệu giá cho {symbol}: {e}")
+                    df = pd.DataFrame()
+                submit_next()
+                yield symbol, df
+
+
+class _ExcelSink:
+    """
+    Ghi mỗi mã vào một sheet riêng bằng chế độ constant_memory của xlsxwriter; từ mã thứ
+    `max_sheets + 1` trở đi, dữ liệu được nối vào sheet dạng dài 'Các mã khác' (có cột mã).
+    """
+
+    OVERFLOW_SHEET = 'Các mã khác'
+
+    def __init__(self, output, max_sheets: int = None):
+        import xlsxwriter
+        # Inf (nếu có) được ghi thành lỗi #NUM! thay vì làm dừng cả lần xuất; NaN được ghi thành ô trống
+        self.workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'nan_inf_to_errors': True})
+        self.date_format = self.workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm'})
+        self.summary = self.workbook.add_worksheet('Tổng hợp')
+        self.summary.write_row(0, 0, ['Mã', 'Số dòng', 'Từ ngày', 'Đến ngày', 'Sheet'])
+        self.summary_row = 1
+        self.max_sheets = EXCEL_MAX_SYMBOL_SHEETS if max_sheets is None else max_sheets
+        self.symbol_sheets = 0
+        self.overflow = None
+        self.overflow_row = 1
+
+    def _write_rows(self, sheet, first_row: int, df: pd.DataFrame, prefix: list):
+        times = pd.to_datetime(df['time']).tolist()
+        # Ô trống thay cho NaN (xlsxwriter bỏ qua ô None không định dạng)
+        values = df.drop(columns='time').astype(object)
+        values = values.where(values.notna(), None).to_numpy()
+        offset = len(prefix)
+        for i in range(len(df)):
+            if prefix:
+                sheet.write_row(first_row + i, 0, prefix)
+            if not pd.isna(times[i]):
+                sheet.write_datetime(first_row + i, offset, times[i], self.date_format)
+            sheet.write_row(first_row + i, offset + 1, values[i].tolist())
+
+    def write(self, symbol: str, df: pd.DataFrame):
+        if self.symbol_sheets < self.max_sheets:
+            sheet_name = symbol[:31]
+            sheet = self.workbook.add_worksheet(sheet_name)
+            sheet.write_row(0, 0, list(df.columns))
+            self._write_rows(sheet, 1, df, [])
+            self.symbol_sheets += 1
+        else:
+            sheet_name = self.OVERFLOW_SHEET
+            if self.overflow is None:
+                self.overflow = self.workbook.add_worksheet(sheet_name)
+                self.overflow.write_row(0, 0, ['symbol'] + list(df.columns))
+            self._write_rows(self.overflow, self.overflow_row, df, [symbol])
+            self.overflow_row += len(df)
+
+        times = pd.to_datetime(df['time'])
+        self.summary.write_row(self.summary_row, 0, [symbol, len(df)])
+        self.summary.write_datetime(self.summary_row, 2, times.min(), self.date_format)
+        self.summary.write_datetime(self.summary_row, 3, times.max(), self.date_format)
+        self.summary.write(self.summary_row, 4, sheet_name)
+        self.summary_row += 1
+
+    def close(self):
+        self.workbook.close()
+
+
+class _CsvSink:
+    """Ghi tất cả các mã vào một file CSV dạng dài (có cột symbol), nối thêm theo từng mã."""
+
+    def __init__(self, output):
+        self.owns_file = isinstance(output, str)
+        if self.owns_file:
+            self.file = open(output, 'w', encoding='utf-8-sig', newline='')
+        else:
+            # Đối tượng file nhị phân (như với Excel/Parquet): bọc lại để ghi văn bản
+            self.file = io.TextIOWrapper(output, encoding='utf-8-sig', newline='')
+        self.header_written = False
+
+    def write(self, symbol: str, df: pd.DataFrame):
+        df.insert(0, 'symbol', symbol)
+        df.to_csv(self.file, index=False, header=not self.header_written, chunksize=10_000)
+        self.header_written = True
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+        else:
+            # Giữ nguyên file của người gọi (ví dụ BytesIO để tải về), chỉ tách lớp bọc văn bản
+            self.file.flush()
+            self.file.detach()
+
+
+class _ParquetSink:
+    """Ghi dữ liệu dạng dài vào một file Parquet, mỗi mã là một row group."""
+
+    def __init__(self, output):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self.schema = pa.schema([
+            ('symbol', pa.string()), ('time', pa.timestamp('ns')),
+            ('open', pa.float64()), ('high', pa.float64()), ('low', pa.float64()),
+            ('close', pa.float64()), ('volume', pa.float64()),
+        ])
+        self.writer = pq.ParquetWriter(output, self.schema, compression='snappy')
+
+    def write(self, symbol: str, df: pd.DataFrame):
+        df.insert(0, 'symbol', symbol)
+        table = self._pa.Table.from_pandas(df, schema=self.schema, preserve_index=False, safe=False)
+        self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+
+
+_SINKS = {'excel': _ExcelSink, 'csv': _CsvSink, 'parquet': _ParquetSink}
+
+
+def export_price_history(symbols: List[str], output, fmt: str = 'excel', years: int = 3, interval: str = '1D',
+                         max_workers: int = 8, on_progress: Optional[Callable[[int, int, str, int], None]] = None) -> pd.DataFrame:
+    """
+    Tải và ghi dữ liệu giá của nhiều mã ra một file duy nhất theo kiểu streaming.
+
+    Args:
+        symbols (List[str]): Danh sách mã cổ phiếu.
+        output: Đường dẫn file (hoặc đối tượng file nhị phân) để ghi kết quả.
+        fmt (str): 'excel', 'csv' hoặc 'parquet'.
+        years (int): Số năm dữ liệu.
+        interval (str): Khung thời gian dữ liệu giá.
+        max_workers (int): Số luồng tải dữ liệu song song.
+        on_progress (Callable): Hàm được gọi sau mỗi mã với (số_mã_đã_xong, tổng_số_mã, mã, số_dòng).
+
+    Returns:
+        pd.DataFrame: Bảng tóm tắt số dòng đã ghi cho từng mã (0 nếu không tải được).
+    """
+    if fmt not in _SINKS:
+        raise ValueError(f"Định dạng không được hỗ trợ: {fmt}")
+    sink = _SINKS[fmt](output)
+    summary = []
+    try:
+        for done, (symbol, df) in enumerate(iter_price_histories(symbols, years, interval, max_workers), start=1):
+            if not df.empty:
+                sink.write(symbol, df)
+            summary.append({'symbol': symbol, 'rows': len(df)})
+            if on_progress:
+                on_progress(done, len(symbols), symbol, len(df))
+    finally:
+        sink.close()
+    return pd.DataFrame(summary, columns=['symbol', 'rows'])
@@ -1,23 +1,26 @@
 # goldenkey_project/utils/helpers.py
-import vnstock
+from core.universe import get_universe
 
 def validate_symbols(symbols: list) -> (list, list):
     """
-    Kiểm tra tính hợp lệ của danh sách các mã cổ phiếu.
+    Kiểm tra tính hợp lệ của danh sách các mã cổ phiếu dựa trên danh sách mã dùng chung
+    của tiến trình (không gọi mạng). Nếu danh sách mã chưa nạp được (chưa có snapshot và
+    không có mạng) thì coi mọi mã là hợp lệ để không chặn người dùng.
     
     Returns:
         tuple: (danh_sách_hợp_lệ, danh_sách_không_hợp_lệ)
     """
-    listing = vnstock.listing_companies(live=False)
-    all_symbols = set(listing['ticker'])
-    
-    valid = []
-    invalid = []
-    
-    for s in symbols:
-        if s in all_symbols:
-            valid.append(s)
-        else:
-            invalid.append(s)
-            
-    return valid, invalid
\ No newline at end of file
+    universe = get_universe()
+    if not universe.is_loaded:
+        return [str(s).upper().strip() for s in symbols], []
+    return universe.validate(symbols)
+
+
+def format_invalid_symbols(invalid: list) -> str:
+    """Thông báo các mã không hợp lệ kèm gợi ý mã gần giống (nếu có)."""
+    universe = get_universe()
+    parts = []
+    for symbol in invalid:
+        suggestions = universe.suggest(symbol)
+        parts.append(f"{symbol} (có phải: {', '.join(suggestions)}?)" if suggestions else symbol)
+    return "Mã không hợp lệ: " + "; ".join(parts)
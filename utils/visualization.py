@@ -1,7 +1,9 @@
 # goldenkey_project/utils/visualization.py
 
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
+import plotly.express as px
 from plotly.subplots import make_subplots
 import streamlit as st
 from typing import TYPE_CHECKING, List
@@ -43,13 +45,13 @@ def plot_stock_chart_plotly(stock_obj: 'Stock') -> go.Figure:
                                      line=dict(width=1.5)), row=1, col=1)
 
     # --- Ô 2: Khối lượng ---
-    volume_colors = ['#26A69A' if row['close'] >= row['open'] else '#EF5350' for _, row in df.iterrows()]
+    volume_colors = np.where(df['close'] >= df['open'], '#26A69A', '#EF5350')
     fig.add_trace(go.Bar(x=df['time'], y=df['volume'], name='Khối lượng',
                          marker_color=volume_colors), row=2, col=1)
 
     # --- Ô 3: MACD ---
     if 'MACD' in df.columns and 'MACD_hist' in df.columns and 'MACD_signal' in df.columns:
-        macd_colors = ['#26A69A' if val >= 0 else '#EF5350' for val in df['MACD_hist']]
+        macd_colors = np.where(df['MACD_hist'] >= 0, '#26A69A', '#EF5350')
         fig.add_trace(go.Bar(x=df['time'], y=df['MACD_hist'], name='MACD Hist', marker_color=macd_colors), row=3, col=1)
         fig.add_trace(go.Scatter(x=df['time'], y=df['MACD'], name='MACD', line=dict(color='blue', width=1.5)), row=3, col=1)
         fig.add_trace(go.Scatter(x=df['time'], y=df['MACD_signal'], name='Signal', line=dict(color='orange', width=1.5)), row=3, col=1)
@@ -77,6 +79,14 @@ def plot_stock_chart_plotly(stock_obj: 'Stock') -> go.Figure:
     fig.update_xaxes(showticklabels=False, row=2, col=1)
     fig.update_xaxes(showticklabels=False, row=3, col=1)
 
+    # Với dữ liệu trong phiên: ẩn cuối tuần, giờ nghỉ trưa và ngoài giờ giao dịch
+    if (df['time'].dt.normalize() != df['time']).any():
+        fig.update_xaxes(rangebreaks=[
+            dict(bounds=["sat", "mon"]),
+            dict(bounds=[15, 9], pattern="hour"),
+            dict(bounds=[11.5, 13], pattern="hour"),
+        ])
+
     return fig
 
 
@@ -119,8 +129,21 @@ def plot_portfolio_pie(weights_df: pd.DataFrame, title: str = 'Phân bổ Danh m
     return fig
 
 def prepare_echarts_sunburst_data(weights_df: pd.DataFrame) -> str:
-    # This function for ECharts is kept for the portfolio page
-    pass # Giữ nguyên code đầy đủ của bạn
+    """
+    Chuẩn bị dữ liệu cho biểu đồ 2 vòng của ECharts: vòng trong là tổng tỷ trọng theo ngành,
+    vòng ngoài là tỷ trọng từng cổ phiếu (sắp theo ngành). Ngành được tra từ danh sách mã
+    trong bộ nhớ, không gọi mạng.
+    """
+    from core.universe import get_universe
+    universe = get_universe()
+    df = weights_df[['Tỷ trọng']].copy()
+    df['Ngành'] = [universe.industry(symbol) for symbol in df.index]
+    df = df.sort_values(['Ngành', 'Tỷ trọng'], ascending=[True, False])
+    industry_totals = df.groupby('Ngành', sort=True)['Tỷ trọng'].sum()
+    return json.dumps({
+        'innerRingData': [{'name': name, 'value': float(value)} for name, value in industry_totals.items()],
+        'outerRingData': [{'name': symbol, 'value': float(row['Tỷ trọng'])} for symbol, row in df.iterrows()],
+    }, ensure_ascii=False)
 
 def plot_cumulative_returns(performance_df: pd.DataFrame, title: str) -> go.Figure:
     if performance_df.empty or len(performance_df.columns) < 2:
@@ -131,4 +154,62 @@ def plot_cumulative_returns(performance_df: pd.DataFrame, title: str) -> go.Figu
     )
     fig.update_layout(template="plotly_white", legend_title_text='', yaxis_tickformat=".2%", hovermode="x unified")
     fig.update_traces(hovertemplate='<b>%{x|%d-%m-%Y}</b><br>%{data.name}: %{y:.2%}<extra></extra>')
-    return fig
\ No newline at end of file
+    return fig
+
+
+def plot_stress_test(returns_df: pd.DataFrame, title: str = "Lợi suất theo Kịch bản") -> go.Figure:
+    """Biểu đồ cột nhóm: mỗi dòng của `returns_df` là một kịch bản, mỗi cột là một danh mục (hoặc benchmark)."""
+    if returns_df.empty:
+        return go.Figure().update_layout(title="Không có kết quả kịch bản để vẽ biểu đồ.")
+    fig = go.Figure()
+    for column in returns_df.columns:
+        fig.add_trace(go.Bar(
+            x=returns_df.index, y=returns_df[column], name=column,
+            hovertemplate=f"<b>{column}</b><br>%{{x}}: %{{y:.2%}}<extra></extra>"
+        ))
+    fig.update_layout(title=title, barmode='group', template="plotly_white", yaxis_tickformat=".2%",
+                      legend_title_text='', xaxis_title="Kịch bản", yaxis_title="Lợi suất")
+    return fig
+
+
+def plot_forward_simulation(fan_df: pd.DataFrame, hit_df: pd.DataFrame = None, loss_value: float = None,
+                            target_value: float = None, title: str = "Mô phỏng Giá trị Danh mục") -> go.Figure:
+    """
+    Biểu đồ quạt (fan chart) các phân vị của giá trị danh mục theo phiên. Các cột của `fan_df`
+    ('p5', 'p25', 'p50', ...) được ghép thành các dải đối xứng quanh trung vị; nếu có `hit_df`,
+    xác suất đã chạm mức lỗ/mục tiêu được vẽ ở biểu đồ con bên dưới.
+    """
+    if fan_df.empty:
+        return go.Figure().update_layout(title="Không có kết quả mô phỏng để vẽ biểu đồ.")
+    rows = 2 if hit_df is not None else 1
+    fig = make_subplots(rows=rows, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                        row_heights=[0.7, 0.3] if rows == 2 else None)
+    columns = list(fan_df.columns)
+    x = fan_df.index
+    for i in range(len(columns) // 2):
+        lower, upper = columns[i], columns[-1 - i]
+        fig.add_trace(go.Scatter(x=x, y=fan_df[upper], mode='lines', line=dict(width=0), showlegend=False,
+                                 hovertemplate=f"{upper}: %{{y:.3f}}<extra></extra>"), row=1, col=1)
+        fig.add_trace(go.Scatter(x=x, y=fan_df[lower], mode='lines', line=dict(width=0), fill='tonexty',
+                                 fillcolor=f"rgba(31, 119, 180, {0.15 + 0.15 * i:.2f})", name=f"{lower} - {upper}",
+                                 hovertemplate=f"{lower}: %{{y:.3f}}<extra></extra>"), row=1, col=1)
+    if len(columns) % 2:
+        median = columns[len(columns) // 2]
+        fig.add_trace(go.Scatter(x=x, y=fan_df[median], mode='lines', line=dict(color='#1f77b4', width=2),
+                                 name=f"Trung vị ({median})", hovertemplate="Trung vị: %{y:.3f}<extra></extra>"), row=1, col=1)
+    if loss_value is not None:
+        fig.add_hline(y=loss_value, line=dict(color='red', dash='dash'), annotation_text="Ngưỡng lỗ", row=1, col=1)
+    if target_value is not None:
+        fig.add_hline(y=target_value, line=dict(color='green', dash='dash'), annotation_text="Mục tiêu", row=1, col=1)
+
+    if hit_df is not None:
+        for column, label, color in [('loss', 'Đã chạm ngưỡng lỗ', 'red'), ('target', 'Đã chạm mục tiêu', 'green')]:
+            fig.add_trace(go.Scatter(x=hit_df.index, y=hit_df[column], mode='lines', name=label, line=dict(color=color),
+                                     hovertemplate=f"{label}: %{{y:.1%}}<extra></extra>"), row=2, col=1)
+        fig.update_yaxes(title_text="Xác suất", tickformat=".0%", range=[0, 1], row=2, col=1)
+
+    fig.update_yaxes(title_text="Giá trị danh mục", row=1, col=1)
+    fig.update_xaxes(title_text="Số phiên", row=rows, col=1)
+    fig.update_layout(title=title, template="plotly_white", hovermode="x unified", legend_title_text='',
+                      height=650 if rows == 2 else 450)
+    return fig